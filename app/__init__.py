@@ -37,6 +37,10 @@ def create_app(config_name="default"):
         app.config.get("REDIS_URL", "redis://localhost:6379/0")
     )
 
+    from app.utils.cache import init_cache
+
+    init_cache(app)
+
     from app.blueprints import register_blueprints
 
     register_blueprints(app)
@@ -45,15 +49,10 @@ def create_app(config_name="default"):
 
     register_error_handlers(app)
 
-    from app import models
+    from app.commands import register_commands
 
-    # Initialize social cache on startup
-    with app.app_context():
-        try:
-            from app.services.social_cache_service import initialize_social_cache
+    register_commands(app)
 
-            initialize_social_cache()
-        except Exception as e:
-            print(f"Could not initialize social cache: {e}")
+    from app import models
 
     return app
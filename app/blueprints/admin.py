@@ -1,9 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
 from app import db
-from app.models import User, Habit, HabitLog, RelapseEvent, Notification
-from app.services import AuthService
+from app.models import User, Habit, HabitLog, RelapseEvent
+from app.services import AuthService, CommunityService, LeaderboardService, NotificationService
 from wtforms import StringField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
@@ -20,6 +20,10 @@ class BroadcastNotificationForm(FlaskForm):
         ('update', 'Update'),
         ('maintenance', 'Maintenance')
     ], default='general')
+    delivery = SelectField('Delivery', choices=[
+        ('inbox', 'Copy into every inbox'),
+        ('shared', 'One shared announcement')
+    ], default='inbox')
     submit = SubmitField('Send Notification')
 
 
@@ -116,8 +120,13 @@ def delete_user(user_id):
         return redirect(url_for('admin.view_user', user_id=user_id))
     
     username = user.username
+    post_ids = [post.id for post in user.community_posts]
+    for post in user.community_posts:
+        db.session.delete(post)
     db.session.delete(user)
     db.session.commit()
+    CommunityService.unpublish_posts(post_ids)
+    LeaderboardService.remove_user(user_id)
     
     flash(f'User {username} has been deleted.', 'success')
     return redirect(url_for('admin.users'))
@@ -163,18 +172,33 @@ def notifications():
     form = BroadcastNotificationForm()
     
     if form.validate_on_submit():
-        users = User.query.filter_by(is_active=True).all()
-        
-        for user in users:
-            notification = Notification()
-            notification.user_id = user.id
-            notification.title = form.title.data
-            notification.message = form.message.data
-            notification.notification_type = form.notification_type.data
-            db.session.add(notification)
-        
-        db.session.commit()
-        flash(f'Notification sent to {len(users)} users!', 'success')
+        broadcast = NotificationService.start_broadcast(
+            title=form.title.data,
+            message=form.message.data,
+            notification_type=form.notification_type.data,
+            sender_id=current_user.id,
+            shared=form.delivery.data == 'shared'
+        )
+        flash(f'Notification queued for {broadcast.total} users!', 'success')
         return redirect(url_for('admin.notifications'))
     
-    return render_template('admin/notifications.html', form=form)
+    broadcasts = NotificationService.get_recent_broadcasts()
+    return render_template('admin/notifications.html', form=form, broadcasts=broadcasts)
+
+
+@admin_bp.route('/broadcasts')
+@login_required
+@admin_required
+def broadcasts():
+    broadcasts = NotificationService.get_recent_broadcasts()
+    if request.headers.get('HX-Request'):
+        return render_template('admin/_broadcasts.html', broadcasts=broadcasts)
+    return jsonify([broadcast.to_dict() for broadcast in broadcasts])
+
+
+@admin_bp.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    from app.utils.cache import cache_stats as worker_cache_stats
+    return jsonify(worker_cache_stats())
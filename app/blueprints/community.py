@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models import User
@@ -12,7 +12,11 @@ from datetime import datetime, timezone
 from wtforms import StringField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
-from app.utils.cache import cache_get, cache_set, delete_cache, LikeCache, CommentCache
+from app.services.community_service import CommunityService
+from app.services.like_service import LikeService
+from app.services.points_service import PointsService
+from app.services.social_cache_service import warm_posts
+from app.utils.cache import LikeCache, CommentCache
 
 community_bp = Blueprint("community", __name__, url_prefix="/community")
 
@@ -49,48 +53,52 @@ class ReportForm(FlaskForm):
     submit = SubmitField("Submit Report")
 
 
+def _liked_in_database(user_id, post_ids):
+    rows = db.session.query(CommunityPostLike.post_id).filter(
+        CommunityPostLike.user_id == user_id, CommunityPostLike.post_id.in_(post_ids)
+    )
+    return {post_id for (post_id,) in rows}
+
+
 @community_bp.route("/")
 @login_required
 def index():
-    page = request.args.get("page", 1, type=int)
-    per_page = 20
-    cache_key = f"community:posts:page:{page}"
-
-    posts = cache_get(cache_key)
-    if posts is None:
-        posts = (
-            CommunityPost.query.filter_by(is_approved=True)
-            .order_by(CommunityPost.created_at.desc())
-            .paginate(page=page, per_page=per_page, error_out=False)
-        )
-        cache_set(cache_key, posts, timeout=60)
-
-    # Build set of liked post IDs for fast lookup
-    liked_post_ids = set()
-
-    # Preload like counts and statuses from Redis for speed
-    for post in posts.items:
-        # Get cached like count
-        cached_count = LikeCache.get_count(post.id)
-        if cached_count:
-            post.likes_count = cached_count
-        else:
-            # Initialize cache with DB count
-            LikeCache.set_count(post.id, post.likes_count)
-
-        # Get cached comment count
-        cached_comments = CommentCache.get_count(post.id)
-        if cached_comments:
-            post.comments_count = cached_comments
+    cursor = request.args.get("cursor") or None
+    try:
+        posts, next_cursor = CommunityService.get_feed_page(cursor, viewer_id=current_user.id)
+    except ValueError:
+        abort(400)
+
+    # Like counts, comment counts and like statuses were read from Redis in
+    # the same pipeline as the posts; like sets are loaded from the database
+    # the first time a post is seen, which costs extra round-trips only then
+    post_ids = [post.id for post in posts]
+    warm_post_ids = warm_posts(post_ids)
+    like_counts = LikeCache.get_counts(post_ids)
+    comment_counts = CommentCache.get_counts(post_ids)
+    liked_post_ids = LikeCache.are_liked(current_user.id, warm_post_ids)
+    cold_post_ids = [post_id for post_id in post_ids if post_id not in warm_post_ids]
+    if cold_post_ids:
+        liked_post_ids.update(_liked_in_database(current_user.id, cold_post_ids))
+
+    missing_comment_counts = {}
+    for post in posts:
+        if post.id in warm_post_ids:
+            post.likes_count = like_counts[post.id]
+
+        if comment_counts.get(post.id) is not None:
+            post.comments_count = comment_counts[post.id]
         else:
-            CommentCache.set_count(post.id, post.comments_count)
+            missing_comment_counts[post.id] = post.comments_count or 0
+    CommentCache.set_counts(missing_comment_counts)
 
-        # Check if user liked this post (from Redis)
-        if LikeCache.is_liked(current_user.id, post.id):
-            liked_post_ids.add(post.id)
+    # "Load more" requests from HTMX only need the next batch of posts
+    template = "community/index.html"
+    if request.headers.get("HX-Request"):
+        template = "community/_feed_page.html"
 
     return render_template(
-        "community/index.html", posts=posts, liked_post_ids=liked_post_ids
+        template, posts=posts, next_cursor=next_cursor, liked_post_ids=liked_post_ids
     )
 
 
@@ -111,11 +119,12 @@ def create():
             post.is_approved = True
 
         db.session.add(post)
+        db.session.flush()
 
-        current_user.points = (current_user.points or 0) + 5
-        db.session.commit()
+        # Commits the post together with its ledger entry
+        PointsService.award(current_user.id, 5, "post", post.id)
 
-        delete_cache("community:posts:*")
+        CommunityService.publish_post(post)
 
         flash("Post shared! +5 points", "success")
         return redirect(url_for("community.index"))
@@ -126,43 +135,19 @@ def create():
 @community_bp.route("/post/<post_id>/like", methods=["POST"])
 @login_required
 def like(post_id):
-    # Check cache first (super fast O(1))
-    is_liked = LikeCache.is_liked(current_user.id, post_id)
-
-    # Get post for DB update (background)
-    post = CommunityPost.query.get_or_404(post_id)
-
-    if is_liked:
-        # Unlike - remove from both cache and DB
-        LikeCache.unlike(current_user.id, post_id)
-        existing_like = CommunityPostLike.query.filter_by(
-            post_id=post_id, user_id=current_user.id
-        ).first()
-        if existing_like:
-            db.session.delete(existing_like)
-        post.likes_count = max(0, post.likes_count - 1)
-        new_count = post.likes_count
-    else:
-        # Like - add to both cache and DB
-        LikeCache.like(current_user.id, post_id)
-        like = CommunityPostLike()
-        like.post_id = post_id
-        like.user_id = current_user.id
-        db.session.add(like)
-        post.likes_count += 1
-        new_count = post.likes_count
-
-    db.session.commit()
+    # One atomic Redis call; the database is updated by the like flusher
+    result = LikeService.toggle(current_user.id, post_id)
+    if result is None:
+        abort(404)
 
-    # Return cached count for instant response
-    cached_count = LikeCache.get_count(post_id)
-    return jsonify({"likes": cached_count if cached_count > 0 else new_count})
+    liked, count = result
+    return jsonify({"liked": liked, "likes": count})
 
 
 @community_bp.route("/post/<post_id>/comment", methods=["GET", "POST"])
 @login_required
 def comment(post_id):
-    post = CommunityPost.query.get_or_404(post_id)
+    post = CommunityService.get_post(post_id) or abort(404)
     form = CommentForm()
 
     if form.validate_on_submit():
@@ -171,56 +156,64 @@ def comment(post_id):
         comment.user_id = current_user.id
         comment.content = form.content.data
         db.session.add(comment)
+        db.session.flush()
 
-        post.comments_count += 1
-        current_user.points = (current_user.points or 0) + 2
-
-        # Update cache instantly
+        # Atomic in SQL, so concurrent comments can't overwrite each other
+        CommunityPost.query.filter_by(id=post_id).update(
+            {CommunityPost.comments_count: db.func.coalesce(CommunityPost.comments_count, 0) + 1},
+            synchronize_session=False,
+        )
+        PointsService.award(current_user.id, 2, "comment", comment.id)
         CommentCache.increment(post_id)
-
-        db.session.commit()
+        CommunityService.invalidate_posts([post_id])
 
         flash("Comment added! +2 points", "success")
         return redirect(url_for("community.post", post_id=post_id))
 
-    comments = (
-        CommunityComment.query.filter_by(post_id=post_id)
-        .order_by(CommunityComment.created_at.asc())
-        .all()
-    )
-
-    return render_template(
-        "community/post.html", post=post, form=form, comments=comments
-    )
+    return _render_post(post, form)
 
 
 @community_bp.route("/post/<post_id>")
 @login_required
 def post(post_id):
-    post = CommunityPost.query.get_or_404(post_id)
-    comments = (
-        CommunityComment.query.filter_by(post_id=post_id)
-        .order_by(CommunityComment.created_at.asc())
-        .all()
-    )
+    post = CommunityService.get_post(post_id) or abort(404)
+    return _render_post(post, CommentForm())
 
-    # Use Redis for instant like check
-    is_liked = LikeCache.is_liked(current_user.id, post_id)
 
-    # Get cached counts
-    cached_likes = LikeCache.get_count(post_id)
-    if cached_likes:
-        post.likes_count = cached_likes
+def _render_post(post, form):
+    try:
+        comments, next_cursor = CommunityService.get_comments_page(
+            post.id, request.args.get("cursor") or None
+        )
+    except ValueError:
+        abort(400)
+
+    # "Load more" requests from HTMX only need the next batch of comments
+    if request.headers.get("HX-Request"):
+        return render_template(
+            "community/_comments_page.html",
+            post=post,
+            comments=comments,
+            next_cursor=next_cursor,
+        )
 
-    cached_comments = CommentCache.get_count(post_id)
-    if cached_comments:
+    # Use Redis for instant like check once the post's like set is loaded
+    if post.id in warm_posts([post.id]):
+        is_liked = LikeCache.is_liked(current_user.id, post.id)
+        post.likes_count = LikeCache.get_count(post.id)
+    else:
+        is_liked = bool(_liked_in_database(current_user.id, [post.id]))
+
+    cached_comments = CommentCache.get_count(post.id)
+    if cached_comments is not None:
         post.comments_count = cached_comments
 
     return render_template(
         "community/post.html",
         post=post,
         comments=comments,
-        form=CommentForm(),
+        next_cursor=next_cursor,
+        form=form,
         is_liked=is_liked,
     )
 
@@ -289,5 +282,7 @@ def share_achievement(achievement_id):
     db.session.add(post)
     db.session.commit()
 
+    CommunityService.publish_post(post)
+
     flash("Achievement shared to community!", "success")
     return redirect(url_for("community.index"))
@@ -1,8 +1,6 @@
 from flask import Blueprint, render_template, redirect, url_for, jsonify
 from flask_login import login_required, current_user
-from app.services import HabitService, RelapseService, StreakService
-from app.models import HabitLog
-from datetime import datetime, timezone, timedelta
+from app.services import HabitService, RelapseService, StreakService, ActivityService
 import json
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -16,9 +14,10 @@ def index():
     
     habit_summaries = []
     total_streak = 0
+    streaks = StreakService.get_streak_info_bulk(habits)
     
     for habit in habits:
-        streak_info = StreakService.get_streak_info(habit)
+        streak_info = streaks[habit.id]
         habit_summaries.append({
             'id': habit.id,
             'name': habit.name,
@@ -45,21 +44,11 @@ def index():
 
 
 def get_weekly_progress(user_id):
-    from datetime import date
-    days = []
-    for i in range(6, -1, -1):
-        d = date.today() - timedelta(days=i)
-        count = HabitLog.query.filter(
-            HabitLog.user_id == user_id,
-            HabitLog.completed_at >= datetime(d.year, d.month, d.day),
-            HabitLog.completed_at < datetime(d.year, d.month, d.day) + timedelta(days=1)
-        ).count()
-        days.append({
-            'day': d.strftime('%a'),
-            'date': d.strftime('%m/%d'),
-            'count': count
-        })
-    return days
+    return [{
+        'day': d.strftime('%a'),
+        'date': d.strftime('%m/%d'),
+        'count': count
+    } for d, count in ActivityService.get_completion_histogram(user_id, days=7)]
 
 
 @dashboard_bp.route('/overview')
@@ -70,9 +59,10 @@ def overview():
     total_current_streak = 0
     total_longest_streak = 0
     habit_counts = {'daily': 0, 'weekly': 0, 'monthly': 0}
+    streaks = StreakService.get_streak_info_bulk(habits)
     
     for habit in habits:
-        streak_info = StreakService.get_streak_info(habit)
+        streak_info = streaks[habit.id]
         total_current_streak += streak_info['current']
         total_longest_streak += streak_info['longest']
         habit_counts[habit.frequency] = habit_counts.get(habit.frequency, 0) + 1
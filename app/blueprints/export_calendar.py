@@ -1,6 +1,6 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, abort, send_file, stream_with_context
 from flask_login import login_required, current_user
-from app.services import ExportService, HabitService, StreakService
+from app.services import ExportService, ExportJobService, CalendarService, HabitService, StreakService
 from datetime import date, timedelta
 import calendar
 
@@ -11,67 +11,82 @@ export_bp = Blueprint('export', __name__, url_prefix='/export')
 @login_required
 def index():
     stats = ExportService.get_stats_summary(current_user.id)
-    return render_template('export/index.html', stats=stats)
+    job = ExportJobService.get_latest(current_user.id)
+    return render_template('export/index.html', stats=stats, job=job)
+
+
+def _csv_response(chunks, name):
+    """Stream CSV chunks to the client as they are produced"""
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={name}_{date.today()}.csv'}
+    )
 
 
 @export_bp.route('/habits')
 @login_required
 def export_habits():
-    csv_data = ExportService.export_habits_csv(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=habits_{date.today()}.csv'
-    return response
+    return _csv_response(ExportService.iter_habits_csv(current_user.id), 'habits')
 
 
 @export_bp.route('/logs')
 @login_required
 def export_logs():
-    csv_data = ExportService.export_habit_logs_csv(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=habit_logs_{date.today()}.csv'
-    return response
+    return _csv_response(ExportService.iter_habit_logs_csv(current_user.id), 'habit_logs')
 
 
 @export_bp.route('/relapses')
 @login_required
 def export_relapses():
-    csv_data = ExportService.export_relapses_csv(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=relapses_{date.today()}.csv'
-    return response
+    return _csv_response(ExportService.iter_relapses_csv(current_user.id), 'relapses')
 
 
 @export_bp.route('/journal')
 @login_required
 def export_journal():
-    csv_data = ExportService.export_journal_csv(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=journal_{date.today()}.csv'
-    return response
+    return _csv_response(ExportService.iter_journal_csv(current_user.id), 'journal')
 
 
 @export_bp.route('/mood')
 @login_required
 def export_mood():
-    csv_data = ExportService.export_mood_csv(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=mood_{date.today()}.csv'
-    return response
+    return _csv_response(ExportService.iter_mood_csv(current_user.id), 'mood')
 
 
-@export_bp.route('/all')
+@export_bp.route('/all', methods=['POST'])
 @login_required
 def export_all():
-    csv_data = ExportService.export_all_data(current_user.id)
-    response = make_response(csv_data)
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=all_data_{date.today()}.csv'
-    return response
+    job = ExportJobService.start(current_user.id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202
+    flash('Your archive is being prepared. You can leave this page and come back.', 'info')
+    return redirect(url_for('export.index'))
+
+
+@export_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = ExportJobService.get_job(job_id, current_user.id) or abort(404)
+    if request.headers.get('HX-Request'):
+        return render_template('export/_job.html', job=job)
+    return jsonify(job.to_dict())
+
+
+@export_bp.route('/jobs/<job_id>/download')
+@login_required
+def download_job(job_id):
+    job = ExportJobService.get_job(job_id, current_user.id)
+    if job is None or job.status != 'done':
+        abort(404)
+    # conditional=True answers Range requests, so interrupted downloads resume.
+    return send_file(
+        ExportJobService.path_for(job),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f'sovereign_export_{job.created_at.date()}.zip',
+        conditional=True
+    )
 
 
 calendar_bp = Blueprint('calendar', __name__, url_prefix='/calendar')
@@ -82,33 +97,24 @@ calendar_bp = Blueprint('calendar', __name__, url_prefix='/calendar')
 def index():
     year = request.args.get('year', date.today().year, type=int)
     month = request.args.get('month', date.today().month, type=int)
+    if not (1 <= month <= 12 and 1 <= year <= 9999):
+        abort(404)
     
     habits = HabitService.get_user_habits(current_user.id)
-    
-    from datetime import datetime
-    start_date = datetime(year, month, 1).date()
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date()
-    else:
-        end_date = datetime(year, month + 1, 1).date()
+    matrix = CalendarService.get_month_matrix(current_user.id, year, month)
     
     habit_data = []
+    streaks = StreakService.get_streak_info_bulk(habits)
     for habit in habits:
-        logs = HabitService.get_completions_by_date_range(
-            current_user.id, habit.id, start_date, end_date
-        )
-        log_dates = {log.completed_at.date() for log in logs}
-        
-        streak_info = StreakService.get_streak_info(habit)
-        
+        counts = matrix.get(habit.id, ())
         habit_data.append({
             'id': habit.id,
             'name': habit.name,
-            'dates': log_dates,
-            'current_streak': streak_info['current']
+            'dates': {day for day, count in enumerate(counts, 1) if count},
+            'current_streak': streaks[habit.id]['current']
         })
     
-    month_calendar = calendar.Calendar().monthdayscalendar(year, month)
+    month_calendar = calendar.Calendar(calendar.SUNDAY).monthdayscalendar(year, month)
     month_name = calendar.month_name[month]
     
     prev_month = month - 1 if month > 1 else 12
@@ -11,8 +11,9 @@ habits_bp = Blueprint('habits', __name__, url_prefix='/habits')
 def index():
     habits = HabitService.get_user_habits(current_user.id)
     habit_data = []
+    streaks = StreakService.get_streak_info_bulk(habits)
     for habit in habits:
-        streak_info = StreakService.get_streak_info(habit)
+        streak_info = streaks[habit.id]
         habit_data.append({
             'habit': habit,
             'current_streak': streak_info['current'],
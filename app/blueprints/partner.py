@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models.partnership import Partnership, SharedGoal, SharedGoalProgress, GoalMilestone, PartnerMessage
-from app.models import Notification, User
+from app.models.partnership import Partnership, SharedGoal, SharedGoalProgress, GoalMilestone
+from app.models import User
+from app.services import ActivityService, NotificationService, ChatService
+from app.utils.cursor import decode_cursor
 from datetime import datetime, timezone, timedelta
 from wtforms import StringField, TextAreaField, DateField, SelectField, SubmitField
 from wtforms.validators import DataRequired
@@ -47,14 +49,7 @@ class MessageForm(FlaskForm):
 
 
 def create_notification(user_id, title, message, notification_type='general', link=None):
-    notification = Notification()
-    notification.user_id = user_id
-    notification.title = title
-    notification.message = message
-    notification.notification_type = notification_type
-    notification.link = link
-    db.session.add(notification)
-    return notification
+    return NotificationService.create(user_id, title, message, notification_type, link)
 
 
 @partner_bp.route('/')
@@ -75,9 +70,7 @@ def index():
         (Partnership.status == 'pending')
     ).all()
     
-    unread_notifications = Notification.query.filter_by(
-        user_id=current_user.id, is_read=False
-    ).count()
+    unread_notifications = NotificationService.unread_count(current_user.id)
     
     return render_template('partner/index.html',
                           partnerships=partnerships,
@@ -424,6 +417,13 @@ def complete_milestone(milestone_id):
     return redirect(url_for('partner.goals', partnership_id=partnership.id))
 
 
+def _chat_partnership(partnership_id):
+    partnership = Partnership.query.get_or_404(partnership_id)
+    if current_user.id not in [partnership.user1_id, partnership.user2_id]:
+        abort(403)
+    return partnership
+
+
 @partner_bp.route('/<partnership_id>/chat')
 @login_required
 def chat(partnership_id):
@@ -434,53 +434,87 @@ def chat(partnership_id):
         return redirect(url_for('partner.index'))
     
     partner = partnership.get_partner(current_user.id)
-    messages = PartnerMessage.query.filter_by(partnership_id=partnership_id)\
-        .order_by(PartnerMessage.created_at.asc()).all()
-    
-    PartnerMessage.query.filter(
-        PartnerMessage.partnership_id == partnership_id,
-        PartnerMessage.sender_id != current_user.id,
-        PartnerMessage.is_read == False
-    ).update({'is_read': True})
-    db.session.commit()
+    try:
+        messages, earlier_cursor = ChatService.get_before(partnership_id, request.args.get('before') or None)
+    except ValueError:
+        abort(400)
+    
+    # "Load earlier" requests from HTMX only need the previous page
+    if request.headers.get('HX-Request'):
+        return render_template('partner/_chat_page.html',
+                              partnership=partnership,
+                              partner=partner,
+                              messages=messages,
+                              earlier_cursor=earlier_cursor)
+    
+    ChatService.mark_read(partnership_id, current_user.id,
+                          ChatService.last_received(messages, current_user.id))
     
     return render_template('partner/chat.html',
                           partnership=partnership,
                           partner=partner,
-                          messages=messages)
+                          messages=messages,
+                          earlier_cursor=earlier_cursor,
+                          cursor=ChatService.to_dict(messages[-1])['cursor'] if messages else '')
+
+
+@partner_bp.route('/<partnership_id>/chat/messages')
+@login_required
+def chat_messages(partnership_id):
+    """JSON of the messages after ``since``, for clients catching up."""
+    _chat_partnership(partnership_id)
+    since = request.args.get('since') or None
+    try:
+        messages = ChatService.get_since(partnership_id, since)
+    except ValueError:
+        abort(400)
+    ChatService.mark_read(partnership_id, current_user.id,
+                          ChatService.last_received(messages, current_user.id))
+    
+    data = [ChatService.to_dict(message) for message in messages]
+    return jsonify({'messages': data, 'cursor': data[-1]['cursor'] if data else since})
+
+
+@partner_bp.route('/<partnership_id>/chat/stream')
+@login_required
+def chat_stream(partnership_id):
+    """Server-sent events with new messages and read receipts."""
+    _chat_partnership(partnership_id)
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since') or None
+    try:
+        if cursor:
+            decode_cursor(cursor, 'chat cursor')
+    except ValueError:
+        abort(400)
+    events = ChatService.stream(partnership_id, current_user.id, cursor)
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @partner_bp.route('/<partnership_id>/chat/send', methods=['POST'])
 @login_required
 def send_message(partnership_id):
     partnership = Partnership.query.get_or_404(partnership_id)
+    wants_json = request.accept_mimetypes.best == 'application/json'
     
     if current_user.id not in [partnership.user1_id, partnership.user2_id]:
+        if wants_json:
+            abort(403)
         flash('Invalid access.', 'danger')
         return redirect(url_for('partner.index'))
     
-    message_text = request.form.get('message')
+    message_text = (request.form.get('message') or '').strip()
     if not message_text:
+        if wants_json:
+            return jsonify({'error': 'Message cannot be empty.'}), 400
         flash('Message cannot be empty.', 'danger')
         return redirect(url_for('partner.chat', partnership_id=partnership_id))
     
-    message = PartnerMessage()
-    message.partnership_id = partnership_id
-    message.sender_id = current_user.id
-    message.message = message_text
-    db.session.add(message)
-    
-    partner = partnership.get_partner(current_user.id)
-    create_notification(
-        partner.id,
-        'New Message',
-        f'{current_user.username} sent you a message.',
-        'message',
-        url_for('partner.chat', partnership_id=partnership_id)
-    )
-    
-    db.session.commit()
+    message = ChatService.send(partnership, current_user, message_text,
+                               url_for('partner.chat', partnership_id=partnership_id))
     
+    if wants_json:
+        return jsonify(ChatService.to_dict(message)), 201
     flash('Message sent!', 'success')
     return redirect(url_for('partner.chat', partnership_id=partnership_id))
 
@@ -504,12 +538,7 @@ def partner_stats(partnership_id):
     partner_completions = HabitLog.query.filter(
         HabitLog.habit_id.in_(partner_habit_ids)
     ).count() if partner_habit_ids else 0
-    
-    last_7_days = datetime.now(timezone.utc) - timedelta(days=7)
-    partner_weekly = HabitLog.query.filter(
-        HabitLog.habit_id.in_(partner_habit_ids),
-        HabitLog.completed_at >= last_7_days
-    ).count() if partner_habit_ids else 0
+    partner_weekly = ActivityService.get_completion_total(partner.id, days=7)
     
     goals = SharedGoal.query.filter_by(partnership_id=partnership_id).all()
     completed_goals = sum(1 for g in goals if g.is_completed)
@@ -544,8 +573,7 @@ def calendar(partnership_id):
 @partner_bp.route('/notifications')
 @login_required
 def notifications():
-    notifs = Notification.query.filter_by(user_id=current_user.id)\
-        .order_by(Notification.created_at.desc()).limit(50).all()
+    notifs = NotificationService.get_inbox(current_user.id)
     
     return render_template('partner/notifications.html', notifications=notifs)
 
@@ -553,10 +581,7 @@ def notifications():
 @partner_bp.route('/notifications/mark-read/<notif_id>', methods=['POST'])
 @login_required
 def mark_notification_read(notif_id):
-    notif = Notification.query.filter_by(id=notif_id, user_id=current_user.id).first()
-    if notif:
-        notif.is_read = True
-        db.session.commit()
+    notif = NotificationService.mark_read(current_user.id, notif_id)
     
     if notif and notif.link:
         return redirect(notif.link)
@@ -566,9 +591,7 @@ def mark_notification_read(notif_id):
 @partner_bp.route('/notifications/mark-all-read', methods=['POST'])
 @login_required
 def mark_all_notifications_read():
-    Notification.query.filter_by(user_id=current_user.id, is_read=False)\
-        .update({'is_read': True})
-    db.session.commit()
+    NotificationService.mark_all_read(current_user.id)
     
     flash('All notifications marked as read.', 'success')
     return redirect(url_for('partner.notifications'))
@@ -577,5 +600,14 @@ def mark_all_notifications_read():
 @partner_bp.route('/notifications/count')
 @login_required
 def notification_count():
-    count = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
+    count = NotificationService.unread_count(current_user.id)
     return jsonify({'count': count})
+
+
+@partner_bp.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-sent events with the unread count, pushed whenever it changes."""
+    events = NotificationService.stream_unread(current_user.id)
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
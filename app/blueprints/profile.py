@@ -3,7 +3,7 @@ from flask_login import login_required, current_user
 from app import db, bcrypt
 from app.models import User, Habit, HABIT_TEMPLATES, HabitLog, MOOD_CHOICES, JournalEntry, MoodEntry
 from app.models.social import PreventionPlan, CommunityPost, CommunityComment, UserReport
-from app.services import AuthService
+from app.services import AuthService, ActivityService
 from datetime import datetime, timezone, timedelta, date
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, TimeField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, Optional
@@ -53,12 +53,7 @@ def index():
     total_completions = HabitLog.query.filter_by(user_id=current_user.id).count()
     total_journals = JournalEntry.query.filter_by(user_id=current_user.id).count()
     total_moods = MoodEntry.query.filter_by(user_id=current_user.id).count()
-    
-    last_7_days = datetime.now(timezone.utc) - timedelta(days=7)
-    weekly_completions = HabitLog.query.filter(
-        HabitLog.user_id == current_user.id,
-        HabitLog.completed_at >= last_7_days
-    ).count()
+    weekly_completions = ActivityService.get_completion_total(current_user.id, days=7)
     
     return render_template('profile/index.html',
                           total_habits=total_habits,
@@ -184,9 +179,8 @@ def use_streak_freeze():
 @profile_bp.route('/export-data')
 @login_required
 def export_data():
-    from app.services.export_service import ExportService
-    data = ExportService.export_all_user_data(current_user.id)
-    return jsonify(data)
+    # Full exports are built as background archives on the export page.
+    return redirect(url_for('export.index'))
 
 
 @profile_bp.route('/theme', methods=['POST'])
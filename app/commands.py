@@ -0,0 +1,146 @@
+import click
+
+
+def register_commands(app):
+
+    @app.cli.command('rebuild-streaks')
+    @click.option('--batch-size', default=500, show_default=True, help='Habits per batch.')
+    def rebuild_streaks(batch_size):
+        """Rebuild materialized habit streaks from habit_logs."""
+        from app.services.streak_service import StreakService
+        total = StreakService.rebuild_all_streaks(batch_size=batch_size)
+        click.echo(f'Rebuilt streaks for {total} habits.')
+
+    @app.cli.command('rebuild-leaderboards')
+    def rebuild_leaderboards():
+        """Recompute the Redis leaderboards from the database."""
+        from app.services.leaderboard_service import LeaderboardService
+        if LeaderboardService.rebuild():
+            click.echo('Rebuilt leaderboards.')
+        else:
+            click.echo('Skipped: Redis is unavailable or a rebuild is already running.')
+
+    @app.cli.command('flush-likes')
+    @click.option('--interval', default=0.0, show_default=True,
+                  help='Keep running, flushing every INTERVAL seconds.')
+    def flush_likes(interval):
+        """Write queued like toggles from Redis to the database."""
+        import time
+        from app.services.like_service import LikeService
+        while True:
+            applied = LikeService.flush_pending()
+            click.echo(f'Flushed {applied} like events.')
+            if not interval:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('warm-social-cache')
+    @click.option('--chunk-size', default=500, show_default=True, help='Posts per batch.')
+    @click.option('--force', is_flag=True, help='Run even if the cache was already warmed.')
+    def warm_social_cache(chunk_size, force):
+        """Load every post's likes and comment count into Redis."""
+        from app.services.social_cache_service import warm_all_posts
+        total = warm_all_posts(chunk_size=chunk_size, force=force)
+        if total is None:
+            click.echo('Skipped: already warmed, in progress elsewhere, or Redis is unavailable.')
+        else:
+            click.echo(f'Warmed {total} posts.')
+
+    @app.cli.command('reconcile-counters')
+    @click.option('--batch-size', default=500, show_default=True, help='Posts per batch.')
+    @click.option('--dry-run', is_flag=True, help='Report drift without repairing it.')
+    @click.option('--interval', default=0.0, show_default=True,
+                  help='Keep running, reconciling every INTERVAL seconds.')
+    def reconcile_counters(batch_size, dry_run, interval):
+        """Recount post likes/comments and repair drifted columns and Redis copies."""
+        import time
+        from app.services.counter_service import CounterService
+        while True:
+            report = CounterService.reconcile(batch_size=batch_size, repair=not dry_run)
+            if report is None:
+                click.echo('Skipped: a reconciliation is already running.')
+            else:
+                click.echo(' '.join(f'{key}={value}' for key, value in report.items()))
+            if not interval:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('deliver-broadcasts')
+    @click.option('--retry-failed', is_flag=True, help='Also retry broadcasts that failed.')
+    def deliver_broadcasts(retry_failed):
+        """Finish admin broadcasts that were interrupted before reaching every inbox."""
+        from app.services.notification_service import NotificationService
+        finished = NotificationService.resume_broadcasts(retry_failed=retry_failed)
+        click.echo(f'Delivered {finished} broadcasts.')
+
+    @app.cli.command('reconcile-notification-counts')
+    @click.option('--batch-size', default=500, show_default=True, help='Cached counts per batch.')
+    def reconcile_notification_counts(batch_size):
+        """Drop cached unread notification counts that disagree with the database."""
+        from app.services.notification_service import NotificationService
+        checked, drifted = NotificationService.reconcile_unread_counts(batch_size=batch_size)
+        click.echo(f'Checked {checked} unread counts, {drifted} drifted.')
+
+    @app.cli.command('flush-chat-receipts')
+    @click.option('--interval', default=0.0, show_default=True,
+                  help='Keep running, flushing every INTERVAL seconds.')
+    def flush_chat_receipts(interval):
+        """Apply queued chat read receipts to the database."""
+        import time
+        from app.services.chat_service import ChatService
+        while True:
+            processed = ChatService.flush_receipts()
+            click.echo(f'Applied {processed} read receipts.')
+            if not interval:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('run-exports')
+    @click.option('--retry-failed', is_flag=True, help='Also retry exports that failed.')
+    def run_exports(retry_failed):
+        """Build export archives that were interrupted before they finished."""
+        from app.services.export_job_service import ExportJobService
+        finished = ExportJobService.resume_jobs(retry_failed=retry_failed)
+        click.echo(f'Built {finished} export archives.')
+
+    @app.cli.command('expire-exports')
+    def expire_exports():
+        """Delete export archives past their expiry."""
+        from app.services.export_job_service import ExportJobService
+        expired = ExportJobService.expire_jobs()
+        click.echo(f'Expired {expired} export archives.')
+
+    @app.cli.command('import-data')
+    @click.argument('email')
+    @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--dry-run', is_flag=True, help='Validate everything, then roll back.')
+    def import_data(email, paths, dry_run):
+        """Restore an export (archive, user_data.json or CSVs) into EMAIL's account."""
+        import os
+        from app.models import User
+        from app.services.import_service import ImportService
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            raise click.ClickException(f'No user with email {email}.')
+        first = paths[0].lower()
+        try:
+            if first.endswith('.zip'):
+                with open(paths[0], 'rb') as fp:
+                    report = ImportService.import_archive(user.id, fp, dry_run=dry_run)
+            elif first.endswith('.json'):
+                with open(paths[0], encoding='utf-8') as fp:
+                    report = ImportService.import_json(user.id, fp, dry_run=dry_run)
+            else:
+                files = {os.path.basename(path): open(path, encoding='utf-8', newline='') for path in paths}
+                try:
+                    report = ImportService.import_csv(user.id, files, dry_run=dry_run)
+                finally:
+                    for fp in files.values():
+                        fp.close()
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for error in report['errors']:
+            click.echo(error, err=True)
+        click.echo(f"Imported {report['imported']}, skipped {report['skipped']}, "
+                   f"{report['error_count']} invalid rows in {report['seconds']}s"
+                   f"{' (dry run, nothing saved)' if dry_run else ''}.")
@@ -26,6 +26,37 @@ class Config:
     CACHE_REDIS_URL = os.environ.get("REDIS_URL") or "redis://localhost:6379/0"
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Per-worker in-process cache in front of Redis; 0 disables it.
+    CACHE_L1_MAXSIZE = int(os.environ.get("CACHE_L1_MAXSIZE", 1024))
+    CACHE_L1_TTL = int(os.environ.get("CACHE_L1_TTL", 30))
+    CACHE_L2_RETRY_SECONDS = 5
+    # Web workers listen for other workers' L1 invalidations; gunicorn.conf.py
+    # turns this on, so CLI commands and tests don't start the listener.
+    CACHE_INVALIDATION_SUBSCRIBER = os.environ.get("CACHE_INVALIDATION_SUBSCRIBER") == "1"
+
+    # Seconds between write-behind flushes of queued likes; 0 disables the
+    # in-process flusher (run `flask flush-likes` instead).
+    LIKE_FLUSH_INTERVAL = float(os.environ.get("LIKE_FLUSH_INTERVAL", 2))
+    # Same for queued chat read receipts (`flask flush-chat-receipts`).
+    CHAT_RECEIPT_FLUSH_INTERVAL = float(os.environ.get("CHAT_RECEIPT_FLUSH_INTERVAL", 2))
+
+    # Admin broadcasts are delivered by a background thread in the web
+    # process; `flask deliver-broadcasts` resumes any a restart interrupted.
+    BROADCAST_IN_BACKGROUND = True
+    BROADCAST_CHUNK_SIZE = int(os.environ.get("BROADCAST_CHUNK_SIZE", 1000))
+
+    # Leaderboard sorted sets are built by a background thread the first time
+    # they are read; `flask rebuild-leaderboards` must then run periodically
+    # (e.g. hourly from cron) to correct drift from missed incremental updates.
+    LEADERBOARD_BUILD_IN_BACKGROUND = True
+
+    # Full-account export archives are written by a background thread to
+    # EXPORT_STORAGE_DIR (default: <instance>/exports) and deleted after
+    # EXPORT_TTL by `flask expire-exports`.
+    EXPORT_IN_BACKGROUND = True
+    EXPORT_STORAGE_DIR = os.environ.get("EXPORT_STORAGE_DIR")
+    EXPORT_TTL = timedelta(hours=int(os.environ.get("EXPORT_TTL_HOURS", 24)))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -36,6 +67,12 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
+    CACHE_L1_MAXSIZE = 0
+    LIKE_FLUSH_INTERVAL = 0
+    CHAT_RECEIPT_FLUSH_INTERVAL = 0
+    BROADCAST_IN_BACKGROUND = False
+    LEADERBOARD_BUILD_IN_BACKGROUND = False
+    EXPORT_IN_BACKGROUND = False
 
 
 class ProductionConfig(Config):
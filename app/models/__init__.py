@@ -1,6 +1,7 @@
 from app.models.user import User
 from app.models.habit import Habit, HABIT_CATEGORIES, HABIT_TEMPLATES
 from app.models.habit_log import HabitLog
+from app.models.habit_streak import HabitStreak
 from app.models.relapse_event import RelapseEvent, TRIGGER_TYPES
 from app.models.journal_entry import JournalEntry
 from app.models.mood_entry import MoodEntry, MOOD_CHOICES
@@ -9,15 +10,19 @@ from app.models.achievement import Achievement, UserAchievement
 from app.models.consistency_builder import ConsistencyBuilder
 from app.models.addiction_killer import AddictionKiller, AddictionSession, CRAFTING_TECHNIQUES
 from app.models.partnership import Partnership, SharedGoal, SharedGoalProgress
-from app.models.notification import Notification
+from app.models.notification import Notification, Broadcast, BroadcastRead, BROADCAST_STATUSES
+from app.models.points import PointsLedgerEntry, POINT_REASONS
+from app.models.export_job import ExportJob, EXPORT_JOB_STATUSES
 from app.models.social import PreventionPlan, UserReport, CommunityPost, CommunityPostLike, CommunityComment
 
 __all__ = [
-    'User', 'Habit', 'HabitLog', 'RelapseEvent', 'TRIGGER_TYPES',
+    'User', 'Habit', 'HabitLog', 'HabitStreak', 'RelapseEvent', 'TRIGGER_TYPES',
     'JournalEntry', 'MoodEntry', 'MOOD_CHOICES', 'Trigger',
     'Achievement', 'UserAchievement', 'ConsistencyBuilder',
     'AddictionKiller', 'AddictionSession', 'CRAFTING_TECHNIQUES',
     'Partnership', 'SharedGoal', 'SharedGoalProgress', 'Notification',
+    'Broadcast', 'BroadcastRead', 'BROADCAST_STATUSES',
+    'PointsLedgerEntry', 'POINT_REASONS', 'ExportJob', 'EXPORT_JOB_STATUSES',
     'HABIT_CATEGORIES', 'HABIT_TEMPLATES',
     'PreventionPlan', 'UserReport', 'CommunityPost', 'CommunityPostLike', 'CommunityComment'
 ]
@@ -0,0 +1,57 @@
+import uuid
+from datetime import datetime, timezone
+from app import db
+
+
+EXPORT_JOB_STATUSES = ['pending', 'running', 'done', 'failed', 'expired']
+
+
+class ExportJob(db.Model):
+    """A full-account export written to a zip archive outside the request.
+
+    ``written`` counts the rows in the archive's finished files against
+    ``total``. ``filename`` is relative to EXPORT_STORAGE_DIR. The file is
+    deleted and the job marked expired once ``expires_at`` passes.
+    """
+    __tablename__ = 'export_jobs'
+    __table_args__ = (
+        db.Index('ix_export_jobs_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    written = db.Column(db.Integer, nullable=False, default=0)
+    current_file = db.Column(db.String(100), nullable=True)
+    filename = db.Column(db.String(100), nullable=True)
+    size = db.Column(db.BigInteger, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.status} {self.written}/{self.total}>'
+    
+    @property
+    def progress(self):
+        if self.status == 'done':
+            return 100
+        return 0 if not self.total else min(99, self.written * 100 // self.total)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total,
+            'written': self.written,
+            'progress': self.progress,
+            'current_file': self.current_file,
+            'size': self.size,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 from app import db
+from app.utils.codec import register_serializer
 
 HABIT_CATEGORIES = [
     ('health', 'Health'),
@@ -73,3 +74,8 @@ class Habit(db.Model):
     def longest_streak(self):
         from app.services.streak_service import StreakService
         return StreakService.calculate_longest_streak(self)
+
+
+register_serializer(Habit, version=1, fields=(
+    'id', 'user_id', 'name', 'description', 'frequency', 'category', 'is_active', 'created_at'
+))
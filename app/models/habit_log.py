@@ -1,10 +1,14 @@
 import uuid
 from datetime import datetime, timezone
 from app import db
+from app.utils.codec import register_serializer
 
 
 class HabitLog(db.Model):
     __tablename__ = 'habit_logs'
+    __table_args__ = (
+        db.Index('ix_habit_logs_user_completed', 'user_id', 'completed_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     habit_id = db.Column(db.String(36), db.ForeignKey('habits.id'), nullable=False, index=True)
@@ -26,3 +30,8 @@ class HabitLog(db.Model):
             'streak_count': self.streak_count,
             'notes': self.notes
         }
+
+
+register_serializer(HabitLog, version=1, fields=(
+    'id', 'habit_id', 'user_id', 'completed_at', 'streak_count', 'notes'
+))
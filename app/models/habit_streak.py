@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from app import db
+
+
+class HabitStreak(db.Model):
+    __tablename__ = 'habit_streaks'
+
+    habit_id = db.Column(db.String(36), db.ForeignKey('habits.id'), primary_key=True)
+    frequency = db.Column(db.String(20), nullable=False, default='daily')
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_completed_on = db.Column(db.Date, nullable=True)
+    last_period = db.Column(db.Integer, nullable=True)
+    is_stale = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc),
+                          onupdate=lambda: datetime.now(timezone.utc))
+
+    habit = db.relationship('Habit', backref=db.backref('streak_state', uselist=False,
+                                                        cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<HabitStreak habit_id={self.habit_id} current={self.current_streak}>'
+
+    def to_dict(self):
+        return {
+            'habit_id': self.habit_id,
+            'frequency': self.frequency,
+            'current_streak': self.current_streak,
+            'longest_streak': self.longest_streak,
+            'last_completed_on': self.last_completed_on.isoformat() if self.last_completed_on else None
+        }
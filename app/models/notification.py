@@ -13,6 +13,7 @@ class Notification(db.Model):
     notification_type = db.Column(db.String(50), nullable=False, default='general')
     is_read = db.Column(db.Boolean, default=False)
     link = db.Column(db.String(500), nullable=True)
+    broadcast_id = db.Column(db.String(36), db.ForeignKey('broadcasts.id'), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     
     user = db.relationship('User', backref='notifications')
@@ -31,3 +32,61 @@ class Notification(db.Model):
             'link': self.link,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+BROADCAST_STATUSES = ['pending', 'running', 'done', 'failed']
+
+
+class Broadcast(db.Model):
+    """An admin announcement to every active user.
+
+    Fanned-out broadcasts are copied into each inbox in chunks; ``last_user_id``
+    is the resume checkpoint. Shared broadcasts stay a single row that inboxes
+    read directly, with a BroadcastRead marker per user who has read it.
+    """
+    __tablename__ = 'broadcasts'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    sender_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    notification_type = db.Column(db.String(50), nullable=False, default='general')
+    link = db.Column(db.String(500), nullable=True)
+    shared = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    delivered = db.Column(db.Integer, nullable=False, default=0)
+    last_user_id = db.Column(db.String(36), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<Broadcast {self.id} {self.status} {self.delivered}/{self.total}>'
+    
+    @property
+    def progress(self):
+        return 100 if not self.total else min(100, self.delivered * 100 // self.total)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'shared': self.shared,
+            'status': self.status,
+            'total': self.total,
+            'delivered': self.delivered,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class BroadcastRead(db.Model):
+    __tablename__ = 'broadcast_reads'
+    
+    broadcast_id = db.Column(db.String(36), db.ForeignKey('broadcasts.id'), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True, index=True)
+    read_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
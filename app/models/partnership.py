@@ -90,9 +90,13 @@ class GoalMilestone(db.Model):
 
 class PartnerMessage(db.Model):
     __tablename__ = 'partner_messages'
+    __table_args__ = (
+        # Serves both the latest page and `since=` cursor reads of a thread.
+        db.Index('ix_partner_messages_thread', 'partnership_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    partnership_id = db.Column(db.String(36), db.ForeignKey('partnerships.id'), nullable=False, index=True)
+    partnership_id = db.Column(db.String(36), db.ForeignKey('partnerships.id'), nullable=False)
     sender_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime, timezone
+from app import db
+
+
+POINT_REASONS = [
+    ('post', 'Community Post'),
+    ('comment', 'Community Comment'),
+    ('achievement', 'Achievement'),
+    ('adjustment', 'Adjustment')
+]
+
+
+class PointsLedgerEntry(db.Model):
+    """Append-only record of every points change; users.points is its running total."""
+    __tablename__ = 'points_ledger'
+    __table_args__ = (
+        db.Index('ix_points_ledger_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(50), nullable=False)
+    source_id = db.Column(db.String(36), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f'<PointsLedgerEntry user_id={self.user_id} amount={self.amount} reason={self.reason}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'reason': self.reason,
+            'source_id': self.source_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
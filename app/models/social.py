@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 from app import db
+from app.utils.codec import register_serializer
 
 
 class PreventionPlan(db.Model):
@@ -45,6 +46,10 @@ class UserReport(db.Model):
 
 class CommunityPost(db.Model):
     __tablename__ = 'community_posts'
+    __table_args__ = (
+        # Backs the keyset-paginated feed: approved posts, newest first.
+        db.Index('ix_community_posts_feed', 'is_approved', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
@@ -79,6 +84,10 @@ class CommunityPostLike(db.Model):
 
 class CommunityComment(db.Model):
     __tablename__ = 'community_comments'
+    __table_args__ = (
+        # Backs cursor-paginated comment threads, oldest first.
+        db.Index('ix_community_comments_thread', 'post_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     post_id = db.Column(db.String(36), db.ForeignKey('community_posts.id'), nullable=False, index=True)
@@ -90,3 +99,9 @@ class CommunityComment(db.Model):
     
     def __repr__(self):
         return f'<CommunityComment {self.id}>'
+
+
+register_serializer(CommunityPost, version=1, fields=(
+    'id', 'user_id', 'content', 'is_anonymous', 'likes_count', 'comments_count',
+    'is_approved', 'created_at', 'user'
+))
@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime, timezone
 from flask_login import UserMixin
 from app import db, login_manager
+from app.utils.codec import register_serializer
 
 
 class User(UserMixin, db.Model):
@@ -29,6 +30,7 @@ class User(UserMixin, db.Model):
     mood_entries = db.relationship('MoodEntry', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     triggers = db.relationship('Trigger', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     user_achievements = db.relationship('UserAchievement', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    points_ledger = db.relationship('PointsLedgerEntry', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     consistency_builders = db.relationship('ConsistencyBuilder', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     addiction_killers = db.relationship('AddictionKiller', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     addiction_sessions = db.relationship('AddictionSession', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -47,6 +49,10 @@ class User(UserMixin, db.Model):
         }
 
 
+# Cached users only carry their public identity, never credentials.
+register_serializer(User, version=1, fields=('id', 'username'))
+
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(user_id)
@@ -9,9 +9,23 @@ from app.services.achievement_service import AchievementService
 from app.services.consistency_service import ConsistencyService
 from app.services.addiction_killer_service import AddictionKillerService
 from app.services.export_service import ExportService
+from app.services.export_job_service import ExportJobService
+from app.services.import_service import ImportService
+from app.services.activity_service import ActivityService
+from app.services.calendar_service import CalendarService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.community_service import CommunityService
+from app.services.like_service import LikeService
+from app.services.counter_service import CounterService
+from app.services.points_service import PointsService
+from app.services.notification_service import NotificationService
+from app.services.chat_service import ChatService
 
 __all__ = [
     'AuthService', 'HabitService', 'RelapseService', 'StreakService',
     'JournalService', 'MoodService', 'TriggerService', 'AchievementService',
-    'ConsistencyService', 'AddictionKillerService', 'ExportService'
+    'ConsistencyService', 'AddictionKillerService', 'ExportService', 'ExportJobService',
+    'ImportService', 'ActivityService', 'CalendarService', 'LeaderboardService',
+    'CommunityService', 'LikeService', 'CounterService', 'PointsService',
+    'NotificationService', 'ChatService'
 ]
@@ -84,8 +84,10 @@ class AchievementService:
     
     @staticmethod
     def get_user_points(user_id):
-        achievements = AchievementService.get_user_achievements(user_id)
-        return sum(ua.achievement.points for ua in achievements)
+        """Points from earned achievements, summed in one query"""
+        return db.session.query(db.func.coalesce(db.func.sum(Achievement.points), 0))\
+            .join(UserAchievement, UserAchievement.achievement_id == Achievement.id)\
+            .filter(UserAchievement.user_id == user_id).scalar()
     
     @staticmethod
     def initialize_default_achievements():
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timezone, timedelta
+from app import db
+from app.models import HabitLog
+from app.utils.cache import user_cached
+
+
+class ActivityService:
+
+    @staticmethod
+    def get_completion_histogram(user_id, days=7, end=None):
+        """(date, count) pairs for the ``days`` days ending on ``end``, oldest first."""
+        end = end or datetime.now(timezone.utc).date()
+        start = end - timedelta(days=days - 1)
+        counts = ActivityService._completion_counts(user_id, end.isoformat(), days)
+        return [(start + timedelta(days=i), count) for i, count in enumerate(counts)]
+
+    @staticmethod
+    def get_completion_total(user_id, days=7):
+        return sum(count for _, count in ActivityService.get_completion_histogram(user_id, days))
+
+    @staticmethod
+    @user_cached(timeout=86400, key_prefix="activity")
+    def _completion_counts(user_id, end, days):
+        # ``end`` is an ISO date so the cache key rolls over once per day.
+        end = date.fromisoformat(end)
+        start = end - timedelta(days=days - 1)
+        day = db.func.date(HabitLog.completed_at)
+
+        rows = db.session.query(day, db.func.count(HabitLog.id)).filter(
+            HabitLog.user_id == user_id,
+            HabitLog.completed_at >= datetime(start.year, start.month, start.day),
+            HabitLog.completed_at < datetime(end.year, end.month, end.day) + timedelta(days=1)
+        ).group_by(day).all()
+
+        # SQLite returns date() as text, PostgreSQL as a date.
+        by_day = {str(bucket)[:10]: count for bucket, count in rows}
+        return [
+            by_day.get((start + timedelta(days=i)).isoformat(), 0)
+            for i in range(days)
+        ]
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from app import db, bcrypt
 from app.models import User
+from app.services.leaderboard_service import LeaderboardService
 
 
 class AuthService:
@@ -69,4 +70,5 @@ class AuthService:
         user.is_active = not user.is_active
         user.updated_at = datetime.now(timezone.utc)
         db.session.commit()
+        LeaderboardService.sync_user(user)
         return user
@@ -0,0 +1,86 @@
+import calendar
+from datetime import date, datetime, timezone, timedelta
+from app import db
+from app.models import HabitLog
+from app.utils.cache import user_cached
+
+# Logs are only ever written for the current moment, so a finished month's
+# matrix can't change except through a habit deletion or an import, both
+# of which drop the "calendar" tag. The current month is also tagged
+# "habit", which every completion invalidates.
+PAST_MONTH_TTL = 365 * 86400
+CURRENT_MONTH_TTL = 300
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class CalendarService:
+
+    @staticmethod
+    def get_month_matrix(user_id, year, month, today=None):
+        """{habit_id: [completions on day 1, day 2, ...]} for one month.
+
+        Habits with no completions that month are left out.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        if (year, month) > (today.year, today.month):
+            return {}
+        if (year, month) < (today.year, today.month):
+            return CalendarService._past_month(user_id, year, month)
+        return CalendarService._current_month(user_id, year, month)
+
+    @staticmethod
+    def get_completion_matrix(user_id, start, end, today=None):
+        """{habit_id: [completions per day]} for ``start`` <= day < ``end``.
+
+        The range is assembled from the cached month matrices, so only months
+        that aren't cached yet are queried.
+        """
+        days = (end - start).days
+        matrix = {}
+        month = _month_start(start)
+        while month < end:
+            offset = (month - start).days
+            for habit_id, counts in CalendarService.get_month_matrix(
+                user_id, month.year, month.month, today
+            ).items():
+                row = matrix.setdefault(habit_id, [0] * days)
+                lo, hi = max(0, -offset), min(len(counts), days - offset)
+                row[offset + lo:offset + hi] = counts[lo:hi]
+            month = _next_month(month)
+        return {habit_id: row for habit_id, row in matrix.items() if any(row)}
+
+    @staticmethod
+    @user_cached(timeout=PAST_MONTH_TTL, key_prefix="calendar")
+    def _past_month(user_id, year, month):
+        return CalendarService._month_counts(user_id, year, month)
+
+    @staticmethod
+    @user_cached(timeout=CURRENT_MONTH_TTL, key_prefix="habit", tags=("calendar",))
+    def _current_month(user_id, year, month):
+        return CalendarService._month_counts(user_id, year, month)
+
+    @staticmethod
+    def _month_counts(user_id, year, month):
+        start = date(year, month, 1)
+        end = _next_month(start)
+        day = db.func.date(HabitLog.completed_at)
+
+        rows = db.session.query(HabitLog.habit_id, day, db.func.count(HabitLog.id)).filter(
+            HabitLog.user_id == user_id,
+            HabitLog.completed_at >= datetime(start.year, start.month, start.day),
+            HabitLog.completed_at < datetime(end.year, end.month, end.day)
+        ).group_by(HabitLog.habit_id, day).all()
+
+        # SQLite returns date() as text, PostgreSQL as a date.
+        days = calendar.monthrange(year, month)[1]
+        matrix = {}
+        for habit_id, bucket, count in rows:
+            matrix.setdefault(habit_id, [0] * days)[int(str(bucket)[8:10]) - 1] = count
+        return matrix
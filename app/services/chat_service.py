@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, bindparam
+from app import db
+from app.models.partnership import PartnerMessage
+from app.services.notification_service import NotificationService
+from app.utils.cache import CLAIM_BATCH, get_redis, report_redis_error
+from app.utils.cursor import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+CHAT_PAGE_SIZE = 50
+CHAT_SINCE_LIMIT = 200
+RECEIPT_QUEUE_KEY = "chat:receipts"
+RECEIPT_PROCESSING_KEY = "chat:receipts:processing"
+RECEIPT_FLUSH_LOCK_KEY = "chat:receipts:flush-lock"
+RECEIPT_FLUSH_LOCK_SECONDS = 60
+RECEIPT_BATCH_SIZE = 500
+# Each stream holds a gunicorn worker thread (gthread workers, see
+# gunicorn.conf.py) until it ends and EventSource reconnects.
+STREAM_SECONDS = 300
+STREAM_HEARTBEAT_SECONDS = 15
+# Without Redis the stream ends after the backlog and the browser
+# reconnects with Last-Event-ID on this delay, i.e. it long-polls.
+STREAM_FALLBACK_RETRY_MS = 3000
+
+_messages = PartnerMessage.__table__
+_flusher = {"pid": None}
+
+
+class ChatService:
+    """Partner chat read incrementally by (created_at, id) cursor.
+
+    New messages are published on ``chat:<partnership_id>`` after they commit
+    and relayed to open streams. Read receipts are queued in Redis and applied
+    in batches, one ``UPDATE ... WHERE created_at <= :up_to`` per reader and
+    partnership; a receipt covers everything before it, so batches can be
+    collapsed. A batch is moved to a processing list while it is applied, so
+    one that fails is retried by the next flush instead of lost.
+    """
+
+    @staticmethod
+    def channel(partnership_id):
+        return f"chat:{partnership_id}"
+
+    @staticmethod
+    def to_dict(message):
+        return {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "message": message.message,
+            "created_at": message.created_at.isoformat(),
+            "cursor": encode_cursor(message),
+        }
+
+    @staticmethod
+    def get_before(partnership_id, cursor=None, limit=CHAT_PAGE_SIZE):
+        """(messages, earlier_cursor): the ``limit`` messages before ``cursor``, oldest first.
+
+        Without a cursor this is the latest page. earlier_cursor is None once
+        the start of the thread is reached; raises ValueError for a bad cursor.
+        """
+        query = PartnerMessage.query.filter(PartnerMessage.partnership_id == partnership_id)
+        if cursor:
+            created_at, message_id = decode_cursor(cursor, 'chat cursor')
+            query = query.filter(db.or_(
+                PartnerMessage.created_at < created_at,
+                db.and_(PartnerMessage.created_at == created_at, PartnerMessage.id < message_id),
+            ))
+        messages = query.order_by(PartnerMessage.created_at.desc(), PartnerMessage.id.desc())\
+            .limit(limit + 1).all()
+        earlier_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+        return messages[:limit][::-1], earlier_cursor
+
+    @staticmethod
+    def get_since(partnership_id, cursor=None, limit=CHAT_SINCE_LIMIT):
+        """Messages after ``cursor``, oldest first; raises ValueError for a bad cursor"""
+        query = PartnerMessage.query.filter(PartnerMessage.partnership_id == partnership_id)
+        if cursor:
+            created_at, message_id = decode_cursor(cursor, 'chat cursor')
+            query = query.filter(db.or_(
+                PartnerMessage.created_at > created_at,
+                db.and_(PartnerMessage.created_at == created_at, PartnerMessage.id > message_id),
+            ))
+        return query.order_by(PartnerMessage.created_at.asc(), PartnerMessage.id.asc())\
+            .limit(limit).all()
+
+    @staticmethod
+    def send(partnership, sender, text, link=None):
+        """Store a message, notify the partner and publish it once committed"""
+        message = PartnerMessage(partnership_id=partnership.id, sender_id=sender.id, message=text)
+        db.session.add(message)
+        partner = partnership.get_partner(sender.id)
+        NotificationService.create(
+            partner.id, 'New Message', f'{sender.username} sent you a message.', 'message', link
+        )
+        db.session.commit()
+
+        client = get_redis()
+        if client is not None:
+            try:
+                client.publish(
+                    ChatService.channel(partnership.id),
+                    json.dumps({"type": "message", "message": ChatService.to_dict(message)}),
+                )
+            except Exception as e:
+                report_redis_error(e)
+        return message
+
+    # Read receipts
+
+    @staticmethod
+    def last_received(messages, reader_id):
+        """created_at of the newest message in ``messages`` sent to ``reader_id``, or None"""
+        return max(
+            (message.created_at for message in messages if message.sender_id != reader_id),
+            default=None,
+        )
+
+    @staticmethod
+    def mark_read(partnership_id, reader_id, up_to):
+        """Record that ``reader_id`` has seen their partner's messages up to ``up_to``"""
+        if up_to is None:
+            return
+        receipt = {"partnership": partnership_id, "reader": reader_id, "up_to": up_to.isoformat()}
+
+        client = get_redis()
+        if client is not None:
+            try:
+                client.rpush(RECEIPT_QUEUE_KEY, json.dumps(receipt))
+                ChatService._ensure_flusher()
+                return
+            except Exception as e:
+                report_redis_error(e)
+        ChatService._apply_receipts([receipt])
+
+    @staticmethod
+    def flush_receipts(batch_size=RECEIPT_BATCH_SIZE):
+        """Apply queued read receipts; returns the number of receipts processed"""
+        client = get_redis()
+        if client is None:
+            return 0
+        try:
+            if not client.set(RECEIPT_FLUSH_LOCK_KEY, 1, nx=True, ex=RECEIPT_FLUSH_LOCK_SECONDS):
+                return 0
+        except Exception as e:
+            report_redis_error(e)
+            return 0
+
+        processed = 0
+        try:
+            while True:
+                # A batch left behind by a failed flush goes first.
+                items = client.lrange(RECEIPT_PROCESSING_KEY, 0, -1)
+                if not items:
+                    items = client.eval(
+                        CLAIM_BATCH, 2, RECEIPT_QUEUE_KEY, RECEIPT_PROCESSING_KEY, batch_size
+                    )
+                if not items:
+                    return processed
+                ChatService._apply_receipts([json.loads(item) for item in items])
+                client.delete(RECEIPT_PROCESSING_KEY)
+                processed += len(items)
+                client.expire(RECEIPT_FLUSH_LOCK_KEY, RECEIPT_FLUSH_LOCK_SECONDS)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Read receipt flush failed, batch will be retried: %s", e)
+            return processed
+        finally:
+            try:
+                client.delete(RECEIPT_FLUSH_LOCK_KEY)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _apply_receipts(receipts):
+        latest = {}
+        for receipt in receipts:
+            key = (receipt["partnership"], receipt["reader"])
+            latest[key] = max(latest.get(key, receipt["up_to"]), receipt["up_to"])
+
+        db.session.execute(
+            _messages.update()
+            .where(and_(
+                _messages.c.partnership_id == bindparam("b_partnership"),
+                _messages.c.sender_id != bindparam("b_reader"),
+                _messages.c.is_read == False,
+                _messages.c.created_at <= bindparam("b_up_to"),
+            ))
+            .values(is_read=True),
+            [
+                {"b_partnership": partnership_id, "b_reader": reader_id,
+                 "b_up_to": datetime.fromisoformat(up_to)}
+                for (partnership_id, reader_id), up_to in latest.items()
+            ],
+        )
+        db.session.commit()
+
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for (partnership_id, reader_id), up_to in latest.items():
+                pipe.publish(
+                    ChatService.channel(partnership_id),
+                    json.dumps({"type": "read", "reader_id": reader_id, "up_to": up_to}),
+                )
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def _ensure_flusher():
+        """Start this process's background receipt flusher (once per pid)"""
+        from flask import current_app
+
+        interval = current_app.config.get("CHAT_RECEIPT_FLUSH_INTERVAL", 0)
+        pid = os.getpid()
+        if not interval or _flusher["pid"] == pid:
+            return
+        _flusher["pid"] = pid
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=ChatService._run_flusher, args=(app, interval),
+            name="chat-receipt-flusher", daemon=True,
+        ).start()
+
+    @staticmethod
+    def _run_flusher(app, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    ChatService.flush_receipts()
+            except Exception as e:
+                logger.warning("Read receipt flusher error: %s", e)
+
+    # Delivery
+
+    @staticmethod
+    def stream(partnership_id, viewer_id, cursor=None):
+        """Server-sent events: messages after ``cursor``, then live messages and receipts.
+
+        Each message event carries its cursor as the event id, so a browser
+        that reconnects resumes from Last-Event-ID without gaps.
+        """
+        client = get_redis()
+        pubsub = None
+        try:
+            if client is not None:
+                # Subscribe before reading the backlog so nothing falls between.
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(ChatService.channel(partnership_id))
+        except Exception as e:
+            report_redis_error(e)
+            pubsub = None
+
+        seen = set()
+        while True:
+            backlog = ChatService.get_since(partnership_id, cursor)
+            if not backlog:
+                break
+            ChatService.mark_read(partnership_id, viewer_id, ChatService.last_received(backlog, viewer_id))
+            for message in backlog:
+                seen.add(message.id)
+                yield ChatService._message_event(ChatService.to_dict(message))
+            cursor = encode_cursor(backlog[-1])
+        db.session.close()
+
+        if pubsub is None:
+            yield f"retry: {STREAM_FALLBACK_RETRY_MS}\n\n"
+            return
+
+        deadline = time.monotonic() + STREAM_SECONDS
+        last_write = time.monotonic()
+        try:
+            while time.monotonic() < deadline:
+                item = pubsub.get_message(timeout=STREAM_HEARTBEAT_SECONDS)
+                if item is None:
+                    if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                        last_write = time.monotonic()
+                        yield ": keep-alive\n\n"
+                    continue
+                last_write = time.monotonic()
+                event = json.loads(item["data"])
+                if event["type"] == "read":
+                    yield f"event: read\ndata: {json.dumps(event)}\n\n"
+                    continue
+                message = event["message"]
+                if message["id"] in seen:
+                    continue
+                if message["sender_id"] != viewer_id:
+                    up_to = datetime.fromisoformat(message["created_at"])
+                    ChatService.mark_read(partnership_id, viewer_id, up_to)
+                    db.session.close()
+                yield ChatService._message_event(message)
+        except Exception as e:
+            report_redis_error(e)
+        finally:
+            pubsub.close()
+
+    @staticmethod
+    def _message_event(message):
+        return f"id: {message['cursor']}\nevent: message\ndata: {json.dumps(message)}\n\n"
+
@@ -0,0 +1,303 @@
+import logging
+from datetime import timezone
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.models.social import CommunityPost, CommunityComment
+from app.services.social_cache_service import feed_reads
+from app.utils.cache import RequestCache, get_redis, report_redis_error
+from app.utils.codec import encode, decode
+from app.utils.cursor import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+FEED_PAGE_SIZE = 20
+COMMENTS_PAGE_SIZE = 50
+TIMELINE_KEY = "community:timeline"
+TIMELINE_READY_KEY = "community:timeline:ready"
+TIMELINE_LOCK_KEY = "community:timeline:lock"
+TIMELINE_LOCK_SECONDS = 60
+# Newest posts kept in the timeline; older pages are read from the database.
+TIMELINE_MAX = 1000
+POST_CACHE_TIMEOUT = 3600
+
+
+def _score(created_at):
+    # SQLite hands back naive datetimes; they are stored as UTC.
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+class CommunityService:
+    """Community feed, paginated by keyset on (created_at, id).
+
+    A cursor is the position of the last post on the previous page, so each
+    page is an index range scan with no OFFSET and no COUNT(*).
+
+    The newest TIMELINE_MAX approved post ids live in a Redis sorted set
+    scored by created_at. New posts are pushed into it, so pages are sliced
+    from the set and never invalidated; the posts themselves are hydrated
+    from a per-post object cache in one pipeline, and misses from one IN query.
+    Whatever changes a post's counters or deletes it must call
+    invalidate_posts() or unpublish_posts() after committing.
+    """
+
+    @staticmethod
+    def get_feed_page(cursor=None, limit=FEED_PAGE_SIZE, viewer_id=None):
+        """(posts, next_cursor) for the page after ``cursor``; next_cursor is None at the end.
+
+        With ``viewer_id`` the page's like and comment state is read in the
+        same pipeline as the posts (see feed_reads).
+        """
+        position = decode_cursor(cursor, 'feed cursor') if cursor else None
+
+        post_ids = CommunityService._timeline_slice(position, limit + 1)
+        if post_ids is None:
+            post_ids = CommunityService._query_feed_ids(position, limit + 1)
+
+        page_ids = post_ids[:limit]
+        extra = feed_reads(viewer_id, page_ids) if viewer_id is not None else ()
+        found = CommunityService._load_posts(page_ids, extra)
+        next_cursor = None
+        if len(post_ids) > limit and page_ids[-1] in found:
+            next_cursor = encode_cursor(found[page_ids[-1]])
+        return CommunityService._visible(page_ids, found), next_cursor
+
+    @staticmethod
+    def get_posts(post_ids):
+        """Approved posts for ``post_ids``, in the given order.
+
+        Cache hits are detached records; posts loaded from the database are
+        model instances.
+        """
+        return CommunityService._visible(post_ids, CommunityService._load_posts(post_ids))
+
+    @staticmethod
+    def _visible(post_ids, found):
+        return [
+            found[post_id] for post_id in post_ids
+            if post_id in found and found[post_id].is_approved
+        ]
+
+    @staticmethod
+    def _load_posts(post_ids, extra=()):
+        """{id: post} from one pipeline of the object cache plus one IN query for misses.
+
+        ``extra`` RequestCache commands are fetched in the same pipeline.
+        """
+        if not post_ids:
+            return {}
+
+        found = {}
+        try:
+            payloads = RequestCache.current().fetch(
+                [("get", CommunityService.post_key(post_id)) for post_id in post_ids] + list(extra)
+            )
+        except Exception:
+            payloads = []
+        for post_id, payload in zip(post_ids, payloads):
+            if not payload:
+                continue
+            try:
+                found[post_id] = decode(payload)
+            except ValueError:
+                # Outdated payloads are reloaded and overwritten below.
+                pass
+
+        missing = [post_id for post_id in post_ids if post_id not in found]
+        if missing:
+            loaded = (
+                CommunityPost.query.options(joinedload(CommunityPost.user))
+                .filter(CommunityPost.id.in_(missing))
+                .all()
+            )
+            found.update((post.id, post) for post in loaded)
+            CommunityService._cache_posts(loaded)
+        return found
+
+    @staticmethod
+    def get_post(post_id):
+        """A post with its author loaded in the same query, or None"""
+        return (
+            CommunityPost.query.options(joinedload(CommunityPost.user))
+            .filter(CommunityPost.id == post_id)
+            .first()
+        )
+
+    @staticmethod
+    def get_comments_page(post_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+        """(comments, next_cursor), oldest first, keyset-paginated like the feed.
+
+        Authors are loaded with one selectin query for the whole page.
+        """
+        query = CommunityComment.query.options(selectinload(CommunityComment.user)).filter(
+            CommunityComment.post_id == post_id
+        )
+        if cursor:
+            created_at, comment_id = decode_cursor(cursor, 'comment cursor')
+            query = query.filter(db.or_(
+                CommunityComment.created_at > created_at,
+                db.and_(CommunityComment.created_at == created_at, CommunityComment.id > comment_id),
+            ))
+        comments = query.order_by(
+            CommunityComment.created_at.asc(), CommunityComment.id.asc()
+        ).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor(comments[-1])
+        return comments, next_cursor
+
+    @staticmethod
+    def publish_post(post):
+        """Push a committed post onto the timeline and into the object cache"""
+        if not post.is_approved:
+            return
+        CommunityService._cache_posts([post])
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            if not client.exists(TIMELINE_READY_KEY):
+                # Nothing to append to; the next read rebuilds from the database.
+                return
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(TIMELINE_KEY, {post.id: _score(post.created_at)})
+            pipe.zremrangebyrank(TIMELINE_KEY, 0, -(TIMELINE_MAX + 1))
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def rebuild_timeline():
+        """Reload the newest TIMELINE_MAX post ids; returns False if skipped"""
+        client = get_redis()
+        if client is None:
+            return False
+        try:
+            if not client.set(TIMELINE_LOCK_KEY, 1, nx=True, ex=TIMELINE_LOCK_SECONDS):
+                return False
+        except Exception as e:
+            report_redis_error(e)
+            return False
+
+        try:
+            rows = (
+                db.session.query(CommunityPost.id, CommunityPost.created_at)
+                .filter(CommunityPost.is_approved == True)
+                .order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+                .limit(TIMELINE_MAX)
+                .all()
+            )
+            staging = f"{TIMELINE_KEY}:rebuild"
+            pipe = client.pipeline()
+            pipe.delete(staging)
+            if rows:
+                pipe.zadd(staging, {post_id: _score(created_at) for post_id, created_at in rows})
+                pipe.rename(staging, TIMELINE_KEY)
+            else:
+                pipe.delete(TIMELINE_KEY)
+            pipe.set(TIMELINE_READY_KEY, len(rows))
+            pipe.execute()
+            logger.info("Rebuilt community timeline (%d posts)", len(rows))
+            return True
+        except Exception as e:
+            report_redis_error(e)
+            return False
+        finally:
+            try:
+                client.delete(TIMELINE_LOCK_KEY)
+            except Exception:
+                pass
+
+    @staticmethod
+    def invalidate_posts(post_ids):
+        """Drop cached copies of posts whose counters or approval changed in the database"""
+        CommunityService._forget(post_ids)
+
+    @staticmethod
+    def unpublish_posts(post_ids):
+        """Remove deleted posts from the timeline as well as the object cache"""
+        CommunityService._forget(post_ids, timeline=True)
+
+    @staticmethod
+    def _forget(post_ids, timeline=False):
+        post_ids = list(post_ids)
+        client = get_redis()
+        if client is None or not post_ids:
+            return
+        keys = [CommunityService.post_key(post_id) for post_id in post_ids]
+        RequestCache.current().forget(*keys)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(*keys)
+            if timeline:
+                pipe.zrem(TIMELINE_KEY, *post_ids)
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def post_key(post_id):
+        return f"community:post:{post_id}"
+
+    @staticmethod
+    def _cache_posts(posts):
+        client = get_redis()
+        if client is None or not posts:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for post in posts:
+                pipe.setex(CommunityService.post_key(post.id), POST_CACHE_TIMEOUT, encode(post))
+            pipe.execute()
+            RequestCache.current().forget(*(CommunityService.post_key(post.id) for post in posts))
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def _timeline_slice(position, count):
+        """Up to ``count`` ids after ``position`` from Redis, or None to use the database"""
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            if not client.exists(TIMELINE_READY_KEY) and not CommunityService.rebuild_timeline():
+                return None
+
+            start = 0
+            if position is not None:
+                rank = client.zrevrank(TIMELINE_KEY, position[1])
+                if rank is None:
+                    # The cursor post has aged out of the capped timeline.
+                    return None
+                start = rank + 1
+
+            pipe = client.pipeline(transaction=False)
+            pipe.zrevrange(TIMELINE_KEY, start, start + count - 1)
+            pipe.zcard(TIMELINE_KEY)
+            post_ids, size = pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+            return None
+
+        post_ids = [post_id.decode() for post_id in post_ids]
+        if len(post_ids) < count and size >= TIMELINE_MAX:
+            # The page runs past the oldest post the timeline still holds.
+            return None
+        return post_ids
+
+    @staticmethod
+    def _query_feed_ids(position, count):
+        query = db.session.query(CommunityPost.id).filter(CommunityPost.is_approved == True)
+        if position is not None:
+            created_at, post_id = position
+            query = query.filter(db.or_(
+                CommunityPost.created_at < created_at,
+                db.and_(CommunityPost.created_at == created_at, CommunityPost.id < post_id),
+            ))
+        rows = query.order_by(
+            CommunityPost.created_at.desc(), CommunityPost.id.desc()
+        ).limit(count).all()
+        return [row.id for row in rows]
@@ -0,0 +1,204 @@
+import logging
+import time
+from sqlalchemy import select
+from app import db
+from app.models.social import CommunityPost, CommunityPostLike, CommunityComment
+from app.services.community_service import CommunityService
+from app.services.like_service import LIKE_PROCESSING_KEY, LikeService
+from app.utils.cache import LIKE_QUEUE_KEY, LikeCache, CommentCache, get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_BATCH_SIZE = 500
+RECONCILE_LOCK_KEY = "counters:reconcile-lock"
+RECONCILE_LOCK_SECONDS = 600
+COMMENT_COUNT_TTL = 3600
+
+# Drops a drifted like set so the next read re-warms it from the database,
+# but only while no toggles are waiting to be written behind; those would be
+# lost from the set and are newer than anything the database can tell us.
+_DROP_LIKES_IF_IDLE = """
+if redis.call('LLEN', KEYS[3]) > 0 or redis.call('LLEN', KEYS[4]) > 0 then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
+_likes = CommunityPostLike.__table__
+_comments = CommunityComment.__table__
+_posts = CommunityPost.__table__
+
+
+class CounterService:
+    """Reconciles the denormalized like/comment counters with their rows.
+
+    Posts are walked in id order, ``batch_size`` at a time. Each batch costs
+    two grouped COUNT queries and one Redis pipeline. Drifted columns are
+    recomputed with a correlated ``UPDATE``, so a like or comment committed
+    mid-run can't be overwritten. Drifted like sets are dropped and re-warmed
+    from the database on the next read; drifted comment counts are rewritten
+    with the true count. Either way the post's cached record is dropped too.
+    """
+
+    @staticmethod
+    def reconcile(batch_size=RECONCILE_BATCH_SIZE, repair=True):
+        """Check every post; returns a drift report dict, or None if another run holds the lock"""
+        client = get_redis()
+        if client is not None:
+            try:
+                if not client.set(RECONCILE_LOCK_KEY, 1, nx=True, ex=RECONCILE_LOCK_SECONDS):
+                    return None
+            except Exception as e:
+                report_redis_error(e)
+                client = None
+
+        report = {
+            "posts": 0,
+            "likes_count_drift": 0,
+            "comments_count_drift": 0,
+            "redis_likes_drift": 0,
+            "redis_comments_drift": 0,
+            "redis_skipped": 0,
+            "column_delta": 0,
+            "repaired": repair,
+            "seconds": 0.0,
+        }
+        started = time.monotonic()
+        last_id = None
+        try:
+            # Drain queued toggles so like sets and rows can be compared.
+            LikeService.flush_pending()
+            while True:
+                query = db.session.query(
+                    CommunityPost.id, CommunityPost.likes_count, CommunityPost.comments_count
+                )
+                if last_id is not None:
+                    query = query.filter(CommunityPost.id > last_id)
+                rows = query.order_by(CommunityPost.id).limit(batch_size).all()
+                if not rows:
+                    break
+                CounterService._reconcile_batch(rows, report, repair)
+                last_id = rows[-1][0]
+                if client is not None:
+                    try:
+                        client.expire(RECONCILE_LOCK_KEY, RECONCILE_LOCK_SECONDS)
+                    except Exception as e:
+                        report_redis_error(e)
+        finally:
+            if client is not None:
+                try:
+                    client.delete(RECONCILE_LOCK_KEY)
+                except Exception:
+                    pass
+
+        report["seconds"] = round(time.monotonic() - started, 3)
+        drift = sum(report[key] for key in report if key.endswith("_drift"))
+        log = logger.warning if drift else logger.info
+        log("Counter reconciliation: %s", report)
+        return report
+
+    @staticmethod
+    def _true_counts(table, post_ids):
+        rows = db.session.execute(
+            select(table.c.post_id, db.func.count())
+            .where(table.c.post_id.in_(post_ids))
+            .group_by(table.c.post_id)
+        )
+        return dict(rows.all())
+
+    @staticmethod
+    def _reconcile_batch(rows, report, repair):
+        post_ids = [post_id for post_id, _, _ in rows]
+        likes = CounterService._true_counts(_likes, post_ids)
+        comments = CounterService._true_counts(_comments, post_ids)
+        report["posts"] += len(rows)
+
+        like_drift, comment_drift = [], []
+        for post_id, likes_count, comments_count in rows:
+            true_likes, true_comments = likes.get(post_id, 0), comments.get(post_id, 0)
+            if (likes_count or 0) != true_likes:
+                like_drift.append(post_id)
+                report["column_delta"] += abs((likes_count or 0) - true_likes)
+            if (comments_count or 0) != true_comments:
+                comment_drift.append(post_id)
+                report["column_delta"] += abs((comments_count or 0) - true_comments)
+        report["likes_count_drift"] += len(like_drift)
+        report["comments_count_drift"] += len(comment_drift)
+
+        if repair and (like_drift or comment_drift):
+            CounterService._repair_columns(like_drift, comment_drift)
+        CounterService._reconcile_redis(post_ids, likes, comments, report, repair)
+
+    @staticmethod
+    def _repair_columns(like_drift, comment_drift):
+        for table, column, post_ids in (
+            (_likes, _posts.c.likes_count, like_drift),
+            (_comments, _posts.c.comments_count, comment_drift),
+        ):
+            if not post_ids:
+                continue
+            true_count = (
+                select(db.func.count())
+                .where(table.c.post_id == _posts.c.id)
+                .scalar_subquery()
+            )
+            db.session.execute(
+                _posts.update().where(_posts.c.id.in_(post_ids)).values({column: true_count})
+            )
+        db.session.commit()
+        CommunityService.invalidate_posts(set(like_drift) | set(comment_drift))
+
+    @staticmethod
+    def _reconcile_redis(post_ids, likes, comments, report, repair):
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.llen(LIKE_QUEUE_KEY)
+            pipe.llen(LIKE_PROCESSING_KEY)
+            for post_id in post_ids:
+                pipe.exists(LikeCache.get_warm_key(post_id))
+                pipe.scard(LikeCache.get_like_key(post_id))
+                pipe.get(CommentCache.get_key(post_id))
+            results = pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+            return
+
+        # Like sets run ahead of the database while toggles are queued, so
+        # they are only comparable once the write-behind queue has drained.
+        pending = results[0] + results[1]
+        stale_likes, stale_comments = [], []
+        for i, post_id in enumerate(post_ids):
+            warm, cached_likes, cached_comments = results[2 + 3 * i:5 + 3 * i]
+            if warm and cached_likes != likes.get(post_id, 0):
+                if pending:
+                    report["redis_skipped"] += 1
+                else:
+                    stale_likes.append(post_id)
+            if cached_comments is not None and int(cached_comments) != comments.get(post_id, 0):
+                stale_comments.append(post_id)
+        report["redis_likes_drift"] += len(stale_likes)
+        report["redis_comments_drift"] += len(stale_comments)
+
+        if not repair or not (stale_likes or stale_comments):
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for post_id in stale_likes:
+                pipe.eval(
+                    _DROP_LIKES_IF_IDLE, 4,
+                    LikeCache.get_like_key(post_id), LikeCache.get_warm_key(post_id),
+                    LIKE_QUEUE_KEY, LIKE_PROCESSING_KEY,
+                )
+            # Rewritten rather than dropped: a missing count is re-seeded by the
+            # feed from the post's cached record, which may hold the old value.
+            for post_id in stale_comments:
+                pipe.setex(CommentCache.get_key(post_id), COMMENT_COUNT_TTL, comments.get(post_id, 0))
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+            return
+        CommunityService.invalidate_posts(set(stale_likes) | set(stale_comments))
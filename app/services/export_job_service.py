@@ -0,0 +1,234 @@
+import logging
+import os
+import threading
+import zipfile
+from datetime import datetime, timezone, timedelta
+from app import db
+from app.models import ExportJob
+from app.services.export_service import ExportService
+
+logger = logging.getLogger(__name__)
+
+# A running job whose worker hasn't checkpointed for this long is presumed
+# dead and may be claimed by another.
+EXPORT_LEASE = timedelta(minutes=10)
+# Chunks (EXPORT_BATCH_SIZE rows each for CSV) written between lease renewals
+# and progress updates inside one archive member.
+CHECKPOINT_CHUNKS = 50
+DEFAULT_EXPORT_TTL = timedelta(hours=24)
+
+# Archive members and the streaming exports that write them, with the stats
+# key that counts their rows for progress (the JSON repeats those rows).
+ARCHIVE_MEMBERS = (
+    ('habits.csv', ExportService.iter_habits_csv, 'total_habits'),
+    ('habit_logs.csv', ExportService.iter_habit_logs_csv, 'total_completions'),
+    ('relapses.csv', ExportService.iter_relapses_csv, 'total_relapses'),
+    ('journal_entries.csv', ExportService.iter_journal_csv, 'total_journal_entries'),
+    ('mood_entries.csv', ExportService.iter_mood_csv, 'total_mood_entries'),
+    ('user_data.json', ExportService.iter_user_data_json, None),
+)
+
+_jobs = ExportJob.__table__
+
+
+class ExportJobService:
+    """Full-account exports built by a worker instead of inside the request.
+
+    The worker streams each entity into its own deflated member of a zip
+    archive. It renews its lease and records progress at every member and
+    every CHECKPOINT_CHUNKS chunks within one. The archive is
+    written under a temporary name and renamed when complete, so a download
+    never sees a partial file. Downloads go through ``send_file``, which
+    answers Range requests, so an interrupted download can be resumed.
+    """
+
+    @staticmethod
+    def storage_dir():
+        from flask import current_app
+
+        path = current_app.config.get('EXPORT_STORAGE_DIR') or \
+            os.path.join(current_app.instance_path, 'exports')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def path_for(job):
+        return os.path.join(ExportJobService.storage_dir(), job.filename)
+
+    @staticmethod
+    def start(user_id):
+        """Queue an export for ``user_id``; returns the job, reusing one already in progress.
+
+        A reused job that no worker is building (its thread died with a restart
+        or deploy) is dispatched again; _claim keeps a live one from being
+        built twice.
+        """
+        active = ExportJob.query.filter(
+            ExportJob.user_id == user_id, ExportJob.status.in_(['pending', 'running'])
+        ).order_by(ExportJob.created_at.desc()).first()
+        if active is not None:
+            if active.status == 'pending' or ExportJobService._abandoned(active):
+                ExportJobService._dispatch(active.id)
+            return active
+
+        stats = ExportService.get_stats_summary(user_id)
+        job = ExportJob(user_id=user_id, total=sum(stats[key] for _, _, key in ARCHIVE_MEMBERS if key))
+        db.session.add(job)
+        db.session.commit()
+
+        ExportJobService._dispatch(job.id)
+        return job
+
+    @staticmethod
+    def _abandoned(job):
+        """Whether a running job's lease has lapsed, as _claim decides it"""
+        claimed_at = job.claimed_at
+        if claimed_at is None:
+            return False
+        if claimed_at.tzinfo is None:
+            claimed_at = claimed_at.replace(tzinfo=timezone.utc)
+        return claimed_at < datetime.now(timezone.utc) - EXPORT_LEASE
+
+    @staticmethod
+    def _dispatch(job_id):
+        from flask import current_app
+
+        if not current_app.config.get('EXPORT_IN_BACKGROUND'):
+            ExportJobService.build(job_id)
+            return
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=ExportJobService._run_build, args=(app, job_id),
+            name=f'export-{job_id}', daemon=True,
+        ).start()
+
+    @staticmethod
+    def _run_build(app, job_id):
+        with app.app_context():
+            try:
+                ExportJobService.build(job_id)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _claim(job_id):
+        """Atomically take ownership of a pending or abandoned job"""
+        now = datetime.now(timezone.utc)
+        claimed = db.session.execute(
+            _jobs.update()
+            .where(
+                _jobs.c.id == job_id,
+                db.or_(
+                    _jobs.c.status == 'pending',
+                    db.and_(_jobs.c.status == 'running', _jobs.c.claimed_at < now - EXPORT_LEASE),
+                ),
+            )
+            .values(status='running', claimed_at=now, written=0, current_file=None)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    @staticmethod
+    def build(job_id):
+        """Write the job's archive; returns False if another worker owns it or it failed"""
+        from flask import current_app
+
+        if not ExportJobService._claim(job_id):
+            return False
+
+        job = db.session.get(ExportJob, job_id)
+        filename = f'{job.id}.zip'
+        path = os.path.join(ExportJobService.storage_dir(), filename)
+        partial = f'{path}.part'
+        try:
+            stats = ExportService.get_stats_summary(job.user_id)
+            with zipfile.ZipFile(partial, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for name, iter_member, key in ARCHIVE_MEMBERS:
+                    ExportJobService._checkpoint(job, name)
+                    rows = stats[key] if key else 0
+                    done = 0
+                    with archive.open(name, 'w', force_zip64=True) as member:
+                        for i, chunk in enumerate(iter_member(job.user_id), 1):
+                            member.write(chunk.encode('utf-8'))
+                            # Lines over-count rows with multi-line notes, hence the cap.
+                            done = min(rows, done + chunk.count('\n'))
+                            if i % CHECKPOINT_CHUNKS == 0:
+                                ExportJobService._heartbeat(job.id, job.written + done)
+                    job.written += rows
+            os.replace(partial, path)
+
+            now = datetime.now(timezone.utc)
+            job.status = 'done'
+            job.filename = filename
+            job.size = os.path.getsize(path)
+            job.current_file = None
+            job.finished_at = now
+            job.expires_at = now + current_app.config.get('EXPORT_TTL', DEFAULT_EXPORT_TTL)
+            db.session.commit()
+            logger.info('Export %s written: %d rows, %d bytes', job.id, job.written, job.size)
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Export %s failed in %s', job_id, job.current_file)
+            if os.path.exists(partial):
+                os.remove(partial)
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            return False
+
+    @staticmethod
+    def _checkpoint(job, current_file):
+        job.current_file = current_file
+        job.claimed_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    @staticmethod
+    def _heartbeat(job_id, written):
+        """Renew the lease mid-member on its own connection.
+
+        The session is still streaming the member's rows, so it can't commit.
+        """
+        with db.engine.begin() as connection:
+            connection.execute(
+                _jobs.update()
+                .where(_jobs.c.id == job_id)
+                .values(claimed_at=datetime.now(timezone.utc), written=written)
+            )
+
+    @staticmethod
+    def resume_jobs(retry_failed=False):
+        """Build every job left pending or abandoned; returns how many finished"""
+        if retry_failed:
+            ExportJob.query.filter_by(status='failed').update({'status': 'pending', 'error': None})
+            db.session.commit()
+        ids = [
+            job_id for (job_id,) in
+            db.session.query(ExportJob.id)
+            .filter(ExportJob.status.in_(['pending', 'running']))
+            .order_by(ExportJob.created_at)
+        ]
+        return sum(1 for job_id in ids if ExportJobService.build(job_id))
+
+    @staticmethod
+    def expire_jobs(now=None):
+        """Delete archives past their expiry; returns how many jobs expired"""
+        now = now or datetime.now(timezone.utc)
+        jobs = ExportJob.query.filter(ExportJob.status == 'done', ExportJob.expires_at < now).all()
+        for job in jobs:
+            try:
+                os.remove(ExportJobService.path_for(job))
+            except FileNotFoundError:
+                pass
+            job.status = 'expired'
+        db.session.commit()
+        return len(jobs)
+
+    @staticmethod
+    def get_job(job_id, user_id):
+        return ExportJob.query.filter_by(id=job_id, user_id=user_id).first()
+
+    @staticmethod
+    def get_latest(user_id):
+        return ExportJob.query.filter_by(user_id=user_id)\
+            .order_by(ExportJob.created_at.desc()).first()
@@ -2,122 +2,158 @@ import csv
 import io
 import json
 from datetime import datetime
+from sqlalchemy import select
+from app import db
 from app.models import Habit, HabitLog, RelapseEvent, JournalEntry, MoodEntry, Trigger, UserAchievement
 from app.models.social import PreventionPlan, CommunityPost
 from app.models import Partnership, SharedGoal
 
+# Rows fetched per round-trip and written per yielded chunk. Rows are
+# streamed from a server-side cursor where the driver supports one.
+EXPORT_BATCH_SIZE = 1000
+
+
+def _iso(value):
+    return value.isoformat() if value else ''
+
+
+def _iso_or_none(value):
+    return value.isoformat() if value else None
+
+
+def _stream_batches(statement, convert, batch_size=EXPORT_BATCH_SIZE):
+    """Yield ``convert(row)`` for each row of ``statement``, a list per fetched batch.
+
+    Core rows rather than ORM objects, so nothing accumulates in the
+    session's identity map and memory stays flat however many rows there are.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield [convert(row) for row in rows]
+    finally:
+        # A client that disconnects mid-download must not leave the cursor open.
+        result.close()
+
+
+def _stream_csv(header, statement, row_to_csv, batch_size=EXPORT_BATCH_SIZE):
+    """Yield CSV text for ``statement`` a batch at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    for rows in _stream_batches(statement, row_to_csv, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+_encode = json.JSONEncoder().encode
+
+
+def _json_items(rows):
+    # Each row laid out as json.dumps(..., indent=2) nests it in a top-level
+    # list. Encoding the scalar values one by one keeps the C encoder, which
+    # json.dumps gives up as soon as indent is set.
+    return (
+        '\n    {'
+        + ','.join(f'\n      {_encode(key)}: {_encode(value)}' for key, value in row.items())
+        + '\n    }'
+        for row in rows
+    )
+
 
 class ExportService:
+    """CSV exports are generators (``iter_*``) so responses can stream them.
+
+    The ``export_*_csv`` functions join the same chunks for callers that want
+    the whole file as a string.
+    """
+    
+    @staticmethod
+    def iter_habits_csv(user_id):
+        statement = select(
+            Habit.id, Habit.name, Habit.description, Habit.frequency,
+            Habit.is_active, Habit.created_at
+        ).where(Habit.user_id == user_id)
+        return _stream_csv(
+            ['ID', 'Name', 'Description', 'Frequency', 'Active', 'Created At'],
+            statement,
+            lambda row: [row.id, row.name, row.description or '', row.frequency,
+                         'Yes' if row.is_active else 'No', _iso(row.created_at)]
+        )
+    
+    @staticmethod
+    def iter_habit_logs_csv(user_id):
+        statement = select(
+            HabitLog.id, HabitLog.habit_id, HabitLog.completed_at,
+            HabitLog.streak_count, HabitLog.notes
+        ).where(HabitLog.user_id == user_id).order_by(HabitLog.completed_at.desc())
+        return _stream_csv(
+            ['ID', 'Habit ID', 'Completed At', 'Streak Count', 'Notes'],
+            statement,
+            lambda row: [row.id, row.habit_id, _iso(row.completed_at),
+                         row.streak_count, row.notes or '']
+        )
+    
+    @staticmethod
+    def iter_relapses_csv(user_id):
+        statement = select(
+            RelapseEvent.id, RelapseEvent.occurred_at, RelapseEvent.trigger_type,
+            RelapseEvent.severity, RelapseEvent.notes
+        ).where(RelapseEvent.user_id == user_id).order_by(RelapseEvent.occurred_at.desc())
+        return _stream_csv(
+            ['ID', 'Occurred At', 'Trigger Type', 'Severity', 'Notes'],
+            statement,
+            lambda row: [row.id, _iso(row.occurred_at), row.trigger_type,
+                         row.severity, row.notes or '']
+        )
+    
+    @staticmethod
+    def iter_journal_csv(user_id):
+        statement = select(
+            JournalEntry.id, JournalEntry.date, JournalEntry.content,
+            JournalEntry.mood, JournalEntry.tags
+        ).where(JournalEntry.user_id == user_id).order_by(JournalEntry.date.desc())
+        return _stream_csv(
+            ['ID', 'Date', 'Content', 'Mood', 'Tags'],
+            statement,
+            lambda row: [row.id, _iso(row.date), row.content.replace('\n', ' '),
+                         row.mood or '', row.tags or '']
+        )
+    
+    @staticmethod
+    def iter_mood_csv(user_id):
+        statement = select(
+            MoodEntry.id, MoodEntry.date, MoodEntry.mood, MoodEntry.notes, MoodEntry.triggers
+        ).where(MoodEntry.user_id == user_id).order_by(MoodEntry.date.desc())
+        return _stream_csv(
+            ['ID', 'Date', 'Mood', 'Notes', 'Triggers'],
+            statement,
+            lambda row: [row.id, _iso(row.date), row.mood, row.notes or '', row.triggers or '']
+        )
     
     @staticmethod
     def export_habits_csv(user_id):
-        habits = Habit.query.filter_by(user_id=user_id).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Name', 'Description', 'Frequency', 'Active', 'Created At'])
-        
-        for habit in habits:
-            writer.writerow([
-                habit.id,
-                habit.name,
-                habit.description or '',
-                habit.frequency,
-                'Yes' if habit.is_active else 'No',
-                habit.created_at.isoformat() if habit.created_at else ''
-            ])
-        
-        return output.getvalue()
+        return ''.join(ExportService.iter_habits_csv(user_id))
     
     @staticmethod
     def export_habit_logs_csv(user_id):
-        logs = HabitLog.query.filter_by(user_id=user_id)\
-            .order_by(HabitLog.completed_at.desc()).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Habit ID', 'Completed At', 'Streak Count', 'Notes'])
-        
-        for log in logs:
-            writer.writerow([
-                log.id,
-                log.habit_id,
-                log.completed_at.isoformat() if log.completed_at else '',
-                log.streak_count,
-                log.notes or ''
-            ])
-        
-        return output.getvalue()
+        return ''.join(ExportService.iter_habit_logs_csv(user_id))
     
     @staticmethod
     def export_relapses_csv(user_id):
-        relapses = RelapseEvent.query.filter_by(user_id=user_id)\
-            .order_by(RelapseEvent.occurred_at.desc()).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Occurred At', 'Trigger Type', 'Severity', 'Notes'])
-        
-        for relapse in relapses:
-            writer.writerow([
-                relapse.id,
-                relapse.occurred_at.isoformat() if relapse.occurred_at else '',
-                relapse.trigger_type,
-                relapse.severity,
-                relapse.notes or ''
-            ])
-        
-        return output.getvalue()
+        return ''.join(ExportService.iter_relapses_csv(user_id))
     
     @staticmethod
     def export_journal_csv(user_id):
-        entries = JournalEntry.query.filter_by(user_id=user_id)\
-            .order_by(JournalEntry.date.desc()).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Date', 'Content', 'Mood', 'Tags'])
-        
-        for entry in entries:
-            writer.writerow([
-                entry.id,
-                entry.date.isoformat() if entry.date else '',
-                entry.content.replace('\n', ' '),
-                entry.mood or '',
-                entry.tags or ''
-            ])
-        
-        return output.getvalue()
+        return ''.join(ExportService.iter_journal_csv(user_id))
     
     @staticmethod
     def export_mood_csv(user_id):
-        entries = MoodEntry.query.filter_by(user_id=user_id)\
-            .order_by(MoodEntry.date.desc()).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Date', 'Mood', 'Notes', 'Triggers'])
-        
-        for entry in entries:
-            writer.writerow([
-                entry.id,
-                entry.date.isoformat() if entry.date else '',
-                entry.mood,
-                entry.notes or '',
-                entry.triggers or ''
-            ])
-        
-        return output.getvalue()
-    
-    @staticmethod
-    def export_all_data(user_id):
-        output = io.StringIO()
-        output.write("=== HABITS ===\n")
-        output.write(ExportService.export_habits_csv(user_id))
-        output.write("\n=== HABIT LOGS ===\n")
-        output.write(ExportService.export_habit_logs_csv(user_id))
-        output.write("\n=== RELAPSES ===\n")
-        output.write(ExportService.export_relapses_csv(user_id))
-        output.write("\n=== JOURNAL ENTRIES ===\n")
-        output.write(ExportService.export_journal_csv(user_id))
-        output.write("\n=== MOOD ENTRIES ===\n")
-        output.write(ExportService.export_mood_csv(user_id))
-        return output.getvalue()
+        return ''.join(ExportService.iter_mood_csv(user_id))
     
     @staticmethod
     def get_stats_summary(user_id):
@@ -135,117 +171,168 @@ class ExportService:
             'total_mood_entries': moods
         }
     
+    @staticmethod
+    def _user_data_sections(user_id):
+        """(key, batches) for each list in the full-account export, in output order.
+
+        Every section is a single column-only query, streamed in batches.
+        """
+        # Goals for all of the user's partnerships in one IN query.
+        partnership_ids = select(Partnership.id).where(
+            (Partnership.user1_id == user_id) | (Partnership.user2_id == user_id)
+        )
+        return [
+            ('habits', _stream_batches(
+                select(Habit.id, Habit.name, Habit.description, Habit.frequency,
+                       Habit.category, Habit.is_active, Habit.created_at)
+                .where(Habit.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'name': row.name,
+                    'description': row.description,
+                    'frequency': row.frequency,
+                    'category': row.category,
+                    'is_active': row.is_active,
+                    'created_at': _iso_or_none(row.created_at)
+                }
+            )),
+            ('habit_logs', _stream_batches(
+                select(HabitLog.id, HabitLog.habit_id, HabitLog.completed_at,
+                       HabitLog.streak_count, HabitLog.notes)
+                .where(HabitLog.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'habit_id': row.habit_id,
+                    'completed_at': _iso_or_none(row.completed_at),
+                    'streak_count': row.streak_count,
+                    'notes': row.notes
+                }
+            )),
+            ('relapses', _stream_batches(
+                select(RelapseEvent.id, RelapseEvent.occurred_at, RelapseEvent.trigger_type,
+                       RelapseEvent.severity, RelapseEvent.notes)
+                .where(RelapseEvent.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'occurred_at': _iso_or_none(row.occurred_at),
+                    'trigger_type': row.trigger_type,
+                    'severity': row.severity,
+                    'notes': row.notes
+                }
+            )),
+            ('journal_entries', _stream_batches(
+                select(JournalEntry.id, JournalEntry.date, JournalEntry.content,
+                       JournalEntry.mood, JournalEntry.tags)
+                .where(JournalEntry.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'date': _iso_or_none(row.date),
+                    'content': row.content,
+                    'mood': row.mood,
+                    'tags': row.tags
+                }
+            )),
+            ('mood_entries', _stream_batches(
+                select(MoodEntry.id, MoodEntry.date, MoodEntry.mood, MoodEntry.notes, MoodEntry.triggers)
+                .where(MoodEntry.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'date': _iso_or_none(row.date),
+                    'mood': row.mood,
+                    'notes': row.notes,
+                    'triggers': row.triggers
+                }
+            )),
+            ('triggers', _stream_batches(
+                select(Trigger.id, Trigger.name, Trigger.category, Trigger.description, Trigger.is_active)
+                .where(Trigger.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'name': row.name,
+                    'category': row.category,
+                    'description': row.description,
+                    'is_active': row.is_active
+                }
+            )),
+            ('achievements', _stream_batches(
+                select(UserAchievement.achievement_id, UserAchievement.earned_at)
+                .where(UserAchievement.user_id == user_id),
+                lambda row: {
+                    'achievement_id': row.achievement_id,
+                    'earned_at': _iso_or_none(row.earned_at)
+                }
+            )),
+            ('prevention_plans', _stream_batches(
+                select(PreventionPlan.id, PreventionPlan.title, PreventionPlan.warning_signs,
+                       PreventionPlan.coping_strategies, PreventionPlan.support_people,
+                       PreventionPlan.activities, PreventionPlan.is_active)
+                .where(PreventionPlan.user_id == user_id),
+                lambda row: {
+                    'id': row.id,
+                    'title': row.title,
+                    'warning_signs': row.warning_signs,
+                    'coping_strategies': row.coping_strategies,
+                    'support_people': row.support_people,
+                    'activities': row.activities,
+                    'is_active': row.is_active
+                }
+            )),
+            ('partnerships', _stream_batches(
+                select(Partnership.id, Partnership.user1_id, Partnership.user2_id,
+                       Partnership.status, Partnership.created_at)
+                .where((Partnership.user1_id == user_id) | (Partnership.user2_id == user_id)),
+                lambda row: {
+                    'id': row.id,
+                    'partner_id': row.user2_id if row.user1_id == user_id else row.user1_id,
+                    'status': row.status,
+                    'created_at': _iso_or_none(row.created_at)
+                }
+            )),
+            ('shared_goals', _stream_batches(
+                select(SharedGoal.id, SharedGoal.partnership_id, SharedGoal.title,
+                       SharedGoal.description, SharedGoal.frequency, SharedGoal.category,
+                       SharedGoal.is_completed, SharedGoal.created_at)
+                .where(SharedGoal.partnership_id.in_(partnership_ids)),
+                lambda row: {
+                    'id': row.id,
+                    'partnership_id': row.partnership_id,
+                    'title': row.title,
+                    'description': row.description,
+                    'frequency': row.frequency,
+                    'category': row.category,
+                    'is_completed': row.is_completed,
+                    'created_at': _iso_or_none(row.created_at)
+                }
+            )),
+        ]
+    
+    @staticmethod
+    def iter_user_data_json(user_id):
+        """The full-account export as JSON text, written a batch at a time.
+
+        The text is exactly ``json.dumps(export_all_user_data(user_id), indent=2)``.
+        """
+        sections = ExportService._user_data_sections(user_id)
+        yield '{\n'
+        yield f'  "exported_at": {json.dumps(datetime.now().isoformat())},\n'
+        yield f'  "user_id": {json.dumps(user_id)},\n'
+        for i, (key, batches) in enumerate(sections):
+            yield f'  {json.dumps(key)}: ['
+            separator = ''
+            for rows in batches:
+                if rows:
+                    yield separator + ','.join(_json_items(rows))
+                    separator = ','
+            closing = '\n  ]' if separator else ']'
+            yield closing + (',\n' if i < len(sections) - 1 else '\n')
+        yield '}'
+    
     @staticmethod
     def export_all_user_data(user_id):
         data = {
             'exported_at': datetime.now().isoformat(),
-            'user_id': user_id,
-            'habits': [],
-            'habit_logs': [],
-            'relapses': [],
-            'journal_entries': [],
-            'mood_entries': [],
-            'triggers': [],
-            'achievements': [],
-            'prevention_plans': [],
-            'partnerships': [],
-            'shared_goals': []
+            'user_id': user_id
         }
-        
-        for habit in Habit.query.filter_by(user_id=user_id).all():
-            data['habits'].append({
-                'id': habit.id,
-                'name': habit.name,
-                'description': habit.description,
-                'frequency': habit.frequency,
-                'category': habit.category,
-                'is_active': habit.is_active,
-                'created_at': habit.created_at.isoformat() if habit.created_at else None
-            })
-        
-        for log in HabitLog.query.filter_by(user_id=user_id).all():
-            data['habit_logs'].append({
-                'id': log.id,
-                'habit_id': log.habit_id,
-                'completed_at': log.completed_at.isoformat() if log.completed_at else None,
-                'streak_count': log.streak_count,
-                'notes': log.notes
-            })
-        
-        for relapse in RelapseEvent.query.filter_by(user_id=user_id).all():
-            data['relapses'].append({
-                'id': relapse.id,
-                'occurred_at': relapse.occurred_at.isoformat() if relapse.occurred_at else None,
-                'trigger_type': relapse.trigger_type,
-                'severity': relapse.severity,
-                'notes': relapse.notes
-            })
-        
-        for entry in JournalEntry.query.filter_by(user_id=user_id).all():
-            data['journal_entries'].append({
-                'id': entry.id,
-                'date': entry.date.isoformat() if entry.date else None,
-                'content': entry.content,
-                'mood': entry.mood,
-                'tags': entry.tags
-            })
-        
-        for entry in MoodEntry.query.filter_by(user_id=user_id).all():
-            data['mood_entries'].append({
-                'id': entry.id,
-                'date': entry.date.isoformat() if entry.date else None,
-                'mood': entry.mood,
-                'notes': entry.notes,
-                'triggers': entry.triggers
-            })
-        
-        for trigger in Trigger.query.filter_by(user_id=user_id).all():
-            data['triggers'].append({
-                'id': trigger.id,
-                'name': trigger.name,
-                'category': trigger.category,
-                'description': trigger.description,
-                'is_active': trigger.is_active
-            })
-        
-        for ua in UserAchievement.query.filter_by(user_id=user_id).all():
-            data['achievements'].append({
-                'achievement_id': ua.achievement_id,
-                'earned_at': ua.earned_at.isoformat() if ua.earned_at else None
-            })
-        
-        for plan in PreventionPlan.query.filter_by(user_id=user_id).all():
-            data['prevention_plans'].append({
-                'id': plan.id,
-                'title': plan.title,
-                'warning_signs': plan.warning_signs,
-                'coping_strategies': plan.coping_strategies,
-                'support_people': plan.support_people,
-                'activities': plan.activities,
-                'is_active': plan.is_active
-            })
-        
-        for p in Partnership.query.filter(
-            (Partnership.user1_id == user_id) | (Partnership.user2_id == user_id)
-        ).all():
-            partner_id = p.user2_id if p.user1_id == user_id else p.user1_id
-            data['partnerships'].append({
-                'id': p.id,
-                'partner_id': partner_id,
-                'status': p.status,
-                'created_at': p.created_at.isoformat() if p.created_at else None
-            })
-            
-            for goal in SharedGoal.query.filter_by(partnership_id=p.id).all():
-                data['shared_goals'].append({
-                    'id': goal.id,
-                    'partnership_id': goal.partnership_id,
-                    'title': goal.title,
-                    'description': goal.description,
-                    'frequency': goal.frequency,
-                    'category': goal.category,
-                    'is_completed': goal.is_completed,
-                    'created_at': goal.created_at.isoformat() if goal.created_at else None
-                })
-        
+        for key, batches in ExportService._user_data_sections(user_id):
+            data[key] = [row for rows in batches for row in rows]
         return data
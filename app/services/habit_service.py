@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from app import db
-from app.models import Habit, HabitLog
+from app.models import Habit, HabitLog, User
+from app.services.leaderboard_service import LeaderboardService
 from app.utils.cache import user_cached, delete_user_cache
 
 
@@ -14,8 +15,7 @@ class HabitService:
         db.session.add(habit)
         db.session.commit()
 
-        delete_user_cache(user_id, "habit")
-        delete_user_cache(user_id, "dashboard")
+        delete_user_cache(user_id, "habit", "dashboard")
 
         return habit
 
@@ -47,8 +47,7 @@ class HabitService:
         habit.updated_at = datetime.now(timezone.utc)
         db.session.commit()
 
-        delete_user_cache(user_id, "habit")
-        delete_user_cache(user_id, "dashboard")
+        delete_user_cache(user_id, "habit", "dashboard")
 
         return habit
 
@@ -63,8 +62,8 @@ class HabitService:
         db.session.delete(habit)
         db.session.commit()
 
-        delete_user_cache(user_id, "habit")
-        delete_user_cache(user_id, "dashboard")
+        delete_user_cache(user_id, "habit", "dashboard", "activity", "calendar")
+        LeaderboardService.sync_user(db.session.get(User, user_id))
 
         return True
 
@@ -76,12 +75,13 @@ class HabitService:
 
         from app.services.streak_service import StreakService
 
-        streak_count = StreakService.calculate_current_streak(habit) + 1
+        completed_at = datetime.now(timezone.utc)
+        streak_count = StreakService.streak_after_completion(habit, completed_at)
 
         log = HabitLog(
             habit_id=habit_id,
             user_id=user_id,
-            completed_at=datetime.now(timezone.utc),
+            completed_at=completed_at,
             streak_count=streak_count,
             notes=notes,
         )
@@ -89,50 +89,8 @@ class HabitService:
         db.session.add(log)
         db.session.commit()
 
-        return log
-
-    @staticmethod
-    def get_habit_logs(habit_id, limit=None):
-        query = HabitLog.query.filter_by(habit_id=habit_id).order_by(
-            HabitLog.completed_at.desc()
-        )
-        if limit:
-            query = query.limit(limit)
-        return query.all()
-
-    @staticmethod
-    def get_user_completions_today(user_id):
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        return HabitLog.query.filter(
-            HabitLog.user_id == user_id, HabitLog.completed_at >= today_start
-        ).all()
-
-    @staticmethod
-    def complete_habit(habit_id, user_id, notes=None):
-        habit = Habit.query.get(habit_id)
-        if not habit or habit.user_id != user_id:
-            return None
-
-        from app.services.streak_service import StreakService
-
-        streak_count = StreakService.calculate_current_streak(habit) + 1
-
-        log = HabitLog(
-            habit_id=habit_id,
-            user_id=user_id,
-            completed_at=datetime.now(timezone.utc),
-            streak_count=streak_count,
-            notes=notes,
-        )
-
-        db.session.add(log)
-        db.session.commit()
-
-        delete_user_cache(user_id, "habit")
-        delete_user_cache(user_id, "dashboard")
-        delete_user_cache(user_id, "streak")
+        delete_user_cache(user_id, "habit", "dashboard", "activity")
+        LeaderboardService.record_completion(user_id, completed_at)
 
         return log
 
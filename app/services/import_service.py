@@ -0,0 +1,558 @@
+import csv
+import io
+import json
+import logging
+import re
+import time
+import uuid
+import zipfile
+from collections.abc import Iterator
+from datetime import date, datetime, timezone
+from app import db
+from app.models import (
+    User, Habit, HabitLog, RelapseEvent, JournalEntry, MoodEntry, Trigger,
+    Achievement, UserAchievement, MOOD_CHOICES,
+)
+from app.models.social import PreventionPlan
+from app.services.leaderboard_service import LeaderboardService
+from app.services.streak_service import StreakService, REBUILD_BATCH_SIZE
+from app.utils.cache import delete_user_cache
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+JSON_READ_SIZE = 1 << 16
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+MOODS = {value for value, _ in MOOD_CHOICES}
+
+# Per-entity CSV files as written by ExportService, mapped to the keys the
+# JSON export uses for the same fields.
+CSV_COLUMNS = {
+    'habits.csv': ('habits', {
+        'ID': 'id', 'Name': 'name', 'Description': 'description',
+        'Frequency': 'frequency', 'Active': 'is_active', 'Created At': 'created_at',
+    }),
+    'habit_logs.csv': ('habit_logs', {
+        'ID': 'id', 'Habit ID': 'habit_id', 'Completed At': 'completed_at',
+        'Streak Count': 'streak_count', 'Notes': 'notes',
+    }),
+    'relapses.csv': ('relapses', {
+        'ID': 'id', 'Occurred At': 'occurred_at', 'Trigger Type': 'trigger_type',
+        'Severity': 'severity', 'Notes': 'notes',
+    }),
+    'journal_entries.csv': ('journal_entries', {
+        'ID': 'id', 'Date': 'date', 'Content': 'content', 'Mood': 'mood', 'Tags': 'tags',
+    }),
+    'mood_entries.csv': ('mood_entries', {
+        'ID': 'id', 'Date': 'date', 'Mood': 'mood', 'Notes': 'notes', 'Triggers': 'triggers',
+    }),
+}
+# /export/* downloads are named e.g. journal_2024-01-31.csv.
+CSV_ALIASES = {'journal.csv': 'journal_entries.csv', 'mood.csv': 'mood_entries.csv'}
+_download_date = re.compile(r'_\d{4}-\d{2}-\d{2}(?=\.csv$)')
+
+_whitespace = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+
+class _JsonReader:
+    """Walks the export's top-level object, yielding array elements one at a time.
+
+    Only the current element is ever decoded, so memory does not depend on
+    the size of the file. Each section's iterator must be exhausted before
+    the next key is read.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self):
+        data = self.fp.read(JSON_READ_SIZE)
+        if not data:
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f'Malformed JSON: expected {char!r}')
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise ValueError('Malformed JSON: truncated value')
+                continue
+            # A number that ends the buffer may continue in the next read.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _array(self):
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def sections(self):
+        """(key, value) pairs; list values come back as iterators"""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                self.pos += 1
+                yield key, self._array()
+            else:
+                yield key, self._value()
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect('}')
+            return
+
+
+def _text(row, key, limit=None, required=False):
+    value = row.get(key)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{key} is required')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{key} must be text')
+    if limit and len(value) > limit:
+        raise ValueError(f'{key} is longer than {limit} characters')
+    return value
+
+
+def _datetime(row, key, required=False):
+    value = _text(row, key, required=required)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{key} is not an ISO timestamp')
+
+
+def _date(row, key):
+    value = _text(row, key, required=True)
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise ValueError(f'{key} is not an ISO date')
+
+
+def _int(row, key, default=None, low=None, high=None):
+    value = row.get(key)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f'{key} is required')
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a whole number')
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f'{key} must be between {low} and {high}')
+    return value
+
+
+def _bool(row, key, default=True):
+    value = row.get(key)
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    if value in ('Yes', 'No'):
+        return value == 'Yes'
+    raise ValueError(f'{key} must be true or false')
+
+
+def _csv_member(name):
+    name = _download_date.sub('', name.rsplit('/', 1)[-1])
+    return CSV_ALIASES.get(name, name)
+
+
+def _sqlite_datetime(value):
+    # SQLAlchemy's SQLite DateTime format; it drops any offset without converting.
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return value.isoformat(' ', 'microseconds')
+
+
+def _sqlite_value(column_type):
+    if isinstance(column_type, db.DateTime):
+        return _sqlite_datetime
+    if isinstance(column_type, db.Date):
+        return date.isoformat
+    if isinstance(column_type, db.Boolean):
+        return int
+    return None
+
+
+def _copy_text(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _ImportRun:
+    """State for one import: id remapping, pending chunks and the report"""
+
+    def __init__(self, user_id, chunk_size):
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.now = datetime.now(timezone.utc)
+        self.dialect = db.session.get_bind().dialect.name
+        # Old habit id -> new id. Ids of the account's own habits map to
+        # themselves, so logs can be imported into existing habits.
+        self.habit_ids = {
+            habit_id: habit_id for (habit_id,) in
+            db.session.query(Habit.id).filter(Habit.user_id == user_id)
+        }
+        self.achievement_ids = {achievement_id for (achievement_id,) in db.session.query(Achievement.id)}
+        self.earned = {
+            achievement_id for (achievement_id,) in
+            db.session.query(UserAchievement.achievement_id).filter(UserAchievement.user_id == user_id)
+        }
+        self.new_habits = []
+        self.pending = {}
+        self.report = {'imported': {}, 'skipped': {}, 'errors': [], 'error_count': 0}
+
+    def error(self, section, index, message):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append(f'{section}[{index}]: {message}')
+
+    def skip(self, section, count=1):
+        if count:
+            self.report['skipped'][section] = self.report['skipped'].get(section, 0) + count
+
+    def add(self, section, table, row):
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        self.report['imported'][section] = self.report['imported'].get(section, 0) + 1
+        if len(rows) >= self.chunk_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        for pending_table in [table] if table is not None else list(self.pending):
+            rows = self.pending.pop(pending_table, None)
+            if not rows:
+                continue
+            if self.dialect == 'postgresql':
+                self._copy(pending_table, rows)
+            elif self.dialect == 'sqlite':
+                self._executemany_sqlite(pending_table, rows)
+            else:
+                db.session.execute(pending_table.insert(), rows)
+
+    def _executemany_sqlite(self, table, rows):
+        # SQLAlchemy's per-row bind processing costs more than the insert
+        # itself, so values go to the driver already in the form SQLAlchemy
+        # stores them in.
+        columns = list(rows[0])
+        converters = [_sqlite_value(table.c[column].type) for column in columns]
+        values = [
+            tuple(value if convert is None or value is None else convert(value)
+                  for convert, value in zip(converters, map(row.__getitem__, columns)))
+            for row in rows
+        ]
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.executemany(
+                f'INSERT INTO {table.name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                values,
+            )
+        finally:
+            cursor.close()
+
+    def _copy(self, table, rows):
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_text(row[column]) for column in columns))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN', buffer)
+        finally:
+            cursor.close()
+
+
+def _import_habit(run, row):
+    habit_id = str(uuid.uuid4())
+    values = {
+        'id': habit_id, 'user_id': run.user_id,
+        'name': _text(row, 'name', 100, required=True),
+        'description': _text(row, 'description'),
+        'frequency': _text(row, 'frequency') or 'daily',
+        'category': _text(row, 'category', 50),
+        'reminder_time': None,
+        'is_active': _bool(row, 'is_active'),
+        'created_at': _datetime(row, 'created_at') or run.now,
+        'updated_at': run.now,
+    }
+    if values['frequency'] not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    if row.get('id'):
+        run.habit_ids[row['id']] = habit_id
+    run.new_habits.append(habit_id)
+    return values
+
+
+def _import_habit_log(run, row):
+    habit_id = run.habit_ids.get(row.get('habit_id'))
+    if habit_id is None:
+        raise ValueError('habit_id does not match an imported habit')
+    return {
+        'id': str(uuid.uuid4()), 'habit_id': habit_id, 'user_id': run.user_id,
+        'completed_at': _datetime(row, 'completed_at', required=True),
+        'streak_count': _int(row, 'streak_count', default=0, low=0),
+        'notes': _text(row, 'notes'),
+        'created_at': run.now,
+    }
+
+
+def _import_relapse(run, row):
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'occurred_at': _datetime(row, 'occurred_at', required=True),
+        'trigger_type': _text(row, 'trigger_type', 50, required=True),
+        'severity': _int(row, 'severity', low=1, high=10),
+        'notes': _text(row, 'notes'),
+        'created_at': run.now,
+    }
+
+
+def _import_journal_entry(run, row):
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'date': _date(row, 'date'),
+        'content': _text(row, 'content', required=True),
+        'mood': _text(row, 'mood', 20),
+        'tags': _text(row, 'tags', 255),
+        'created_at': run.now, 'updated_at': run.now,
+    }
+
+
+def _import_mood_entry(run, row):
+    mood = _text(row, 'mood', required=True)
+    if mood not in MOODS:
+        raise ValueError(f"mood must be one of {', '.join(sorted(MOODS))}")
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'date': _date(row, 'date'), 'mood': mood,
+        'notes': _text(row, 'notes'),
+        'triggers': _text(row, 'triggers', 255),
+        'created_at': run.now,
+    }
+
+
+def _import_trigger(run, row):
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'name': _text(row, 'name', 100, required=True),
+        'description': _text(row, 'description'),
+        'category': _text(row, 'category', 50),
+        'is_active': _bool(row, 'is_active'),
+        'times_encountered': 0, 'times_overcome': 0,
+        'created_at': run.now, 'updated_at': run.now,
+    }
+
+
+def _import_achievement(run, row):
+    achievement_id = row.get('achievement_id')
+    # Achievements are defined per instance; only ones that exist here carry over.
+    if achievement_id not in run.achievement_ids or achievement_id in run.earned:
+        return None
+    run.earned.add(achievement_id)
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'achievement_id': achievement_id,
+        'earned_at': _datetime(row, 'earned_at') or run.now,
+    }
+
+
+def _import_prevention_plan(run, row):
+    return {
+        'id': str(uuid.uuid4()), 'user_id': run.user_id,
+        'title': _text(row, 'title', 200, required=True),
+        'warning_signs': _text(row, 'warning_signs'),
+        'coping_strategies': _text(row, 'coping_strategies'),
+        'support_people': _text(row, 'support_people'),
+        'activities': _text(row, 'activities'),
+        'is_active': _bool(row, 'is_active'),
+        'created_at': run.now, 'updated_at': run.now,
+    }
+
+
+# In dependency order; the exports write sections in this order too.
+SECTIONS = {
+    'habits': (Habit.__table__, _import_habit),
+    'habit_logs': (HabitLog.__table__, _import_habit_log),
+    'relapses': (RelapseEvent.__table__, _import_relapse),
+    'journal_entries': (JournalEntry.__table__, _import_journal_entry),
+    'mood_entries': (MoodEntry.__table__, _import_mood_entry),
+    'triggers': (Trigger.__table__, _import_trigger),
+    'achievements': (UserAchievement.__table__, _import_achievement),
+    'prevention_plans': (PreventionPlan.__table__, _import_prevention_plan),
+}
+
+
+class ImportService:
+    """Restores the JSON or CSV exports into an existing account.
+
+    Input is read and validated a row at a time. Every row gets a new id;
+    habit ids are remapped so logs follow their habit. Valid rows are
+    inserted with Core executemany (COPY on PostgreSQL) in chunks of
+    ``chunk_size``, bypassing ORM events, and everything commits together.
+    Invalid rows are skipped and reported. Streaks, the leaderboards and
+    the user's caches are rebuilt once, after the commit.
+    """
+
+    @staticmethod
+    def import_json(user_id, fp, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        """Import a ``user_data.json`` export from a text file object; returns a report dict"""
+        def rows():
+            for key, value in _JsonReader(fp).sections():
+                if isinstance(value, Iterator):
+                    yield key, value
+
+        return ImportService._run(user_id, rows(), dry_run, chunk_size)
+
+    @staticmethod
+    def import_csv(user_id, files, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        """Import per-entity CSV exports given as {filename: text file object}"""
+        files = {_csv_member(name): fp for name, fp in files.items()}
+        unknown = set(files) - set(CSV_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unrecognised CSV files: {', '.join(sorted(unknown))}")
+
+        def rows():
+            # Habits first, whatever order the files were given in.
+            for name, (key, columns) in CSV_COLUMNS.items():
+                if name in files:
+                    yield key, ImportService._csv_rows(files[name], columns)
+
+        return ImportService._run(user_id, rows(), dry_run, chunk_size)
+
+    @staticmethod
+    def import_archive(user_id, fp, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        """Import an export archive; its user_data.json if present, otherwise its CSVs"""
+        with zipfile.ZipFile(fp) as archive:
+            names = archive.namelist()
+            if 'user_data.json' in names:
+                with archive.open('user_data.json') as member:
+                    text = io.TextIOWrapper(member, encoding='utf-8')
+                    return ImportService.import_json(user_id, text, dry_run, chunk_size)
+            members = [name for name in names if _csv_member(name) in CSV_COLUMNS]
+            if not members:
+                raise ValueError('The archive contains no exported data')
+            opened = {name: io.TextIOWrapper(archive.open(name), encoding='utf-8', newline='')
+                      for name in members}
+            try:
+                return ImportService.import_csv(user_id, opened, dry_run, chunk_size)
+            finally:
+                for text in opened.values():
+                    text.close()
+
+    @staticmethod
+    def _csv_rows(fp, columns):
+        reader = csv.reader(fp)
+        header = next(reader, None)
+        if header is None:
+            return
+        missing = set(columns) - set(header)
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+        keys = [columns.get(name) for name in header]
+        for values in reader:
+            yield {key: value for key, value in zip(keys, values) if key}
+
+    @staticmethod
+    def _run(user_id, sections, dry_run, chunk_size):
+        if db.session.get(User, user_id) is None:
+            raise ValueError('No such user')
+        started = time.monotonic()
+        run = _ImportRun(user_id, chunk_size)
+        try:
+            for key, rows in sections:
+                if key not in SECTIONS:
+                    # Partnerships and shared goals name accounts on the
+                    # instance the export came from, so they don't carry over.
+                    run.skip(key, sum(1 for _ in rows))
+                    continue
+                table, convert = SECTIONS[key]
+                for index, row in enumerate(rows):
+                    if not isinstance(row, dict):
+                        run.error(key, index, 'expected an object')
+                        continue
+                    try:
+                        values = convert(run, row)
+                    except ValueError as e:
+                        run.error(key, index, str(e))
+                        continue
+                    if values is None:
+                        run.skip(key)
+                    else:
+                        run.add(key, table, values)
+                run.flush(table)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        report = run.report
+        report['dry_run'] = dry_run
+        if not dry_run:
+            ImportService._rebuild_derived(user_id, run.new_habits, report)
+        report['seconds'] = round(time.monotonic() - started, 3)
+        logger.info('Import for %s: %s', user_id, {k: v for k, v in report.items() if k != 'errors'})
+        return report
+
+    @staticmethod
+    def _rebuild_derived(user_id, habit_ids, report):
+        """Streaks for every habit that gained logs, then leaderboards and caches"""
+        if report['imported'].get('habit_logs'):
+            # Logs may also have gone into existing habits.
+            habit_ids = [habit_id for (habit_id,) in db.session.query(Habit.id).filter(Habit.user_id == user_id)]
+        for i in range(0, len(habit_ids), REBUILD_BATCH_SIZE):
+            StreakService.rebuild_streaks(
+                Habit.query.filter(Habit.id.in_(habit_ids[i:i + REBUILD_BATCH_SIZE])).all()
+            )
+        delete_user_cache(user_id, 'habit', 'dashboard', 'activity', 'calendar')
+        LeaderboardService.sync_user(db.session.get(User, user_id))
@@ -0,0 +1,422 @@
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from app import db
+from app.models import User, HabitLog, RelapseEvent
+from app.utils.cache import RequestCache, get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+BOARDS = ("completions", "sobriety", "points")
+TIMEFRAMES = ("all", "week", "month")
+BOARD_TIMEFRAMES = tuple(
+    (board, timeframe)
+    for board in BOARDS
+    for timeframe in (TIMEFRAMES if board == "completions" else ("all",))
+)
+# Boards whose best entry has the lowest score (earliest last relapse).
+ASCENDING_BOARDS = ("sobriety",)
+BUILT_KEY = "leaderboard:built"
+REBUILD_LOCK_KEY = "leaderboard:rebuild-lock"
+REBUILD_LOCK_SECONDS = 300
+ZADD_CHUNK_SIZE = 1000
+
+
+def _utc(value):
+    # SQLite hands back naive datetimes; they are stored as UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class LeaderboardService:
+    """Leaderboards kept as Redis sorted sets of user id -> score.
+
+    Completions are bucketed per calendar week and month, so writes are a
+    ZINCRBY per bucket and reads are O(log N) ZREVRANK / ZREVRANGE calls.
+    Incremental updates can be lost while Redis is down; rebuild() recomputes
+    every board from the database and is run periodically to correct drift.
+    The first read that finds the boards missing starts a build under the
+    rebuild lock. Until it finishes, or while Redis is unavailable, the same
+    numbers are answered from SQL.
+    """
+
+    @staticmethod
+    def _bucket(timeframe, day):
+        if timeframe == "week":
+            year, week, _ = day.isocalendar()
+            return f"{year}-W{week:02d}", day + timedelta(days=8 - day.isoweekday())
+        if timeframe == "month":
+            next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            return f"{day.year}-{day.month:02d}", next_month
+        return None, None
+
+    @staticmethod
+    def _period_start(timeframe, day):
+        if timeframe == "week":
+            return day - timedelta(days=day.isoweekday() - 1)
+        if timeframe == "month":
+            return day.replace(day=1)
+        return None
+
+    @staticmethod
+    def board_key(board, timeframe="all", day=None):
+        if board != "completions" or timeframe == "all":
+            return f"leaderboard:{board}"
+        day = day or datetime.now(timezone.utc).date()
+        bucket, _ = LeaderboardService._bucket(timeframe, day)
+        return f"leaderboard:{board}:{timeframe}:{bucket}"
+
+    @staticmethod
+    def _bucket_expiry(timeframe, day):
+        """Unix time a week/month bucket can be dropped: a day after it closes"""
+        _, ends = LeaderboardService._bucket(timeframe, day)
+        closes = datetime(ends.year, ends.month, ends.day, tzinfo=timezone.utc)
+        return int((closes + timedelta(days=1)).timestamp())
+
+    # Incremental updates
+
+    @staticmethod
+    def record_completion(user_id, completed_at):
+        day = _utc(completed_at).date()
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zincrby(LeaderboardService.board_key("completions"), 1, user_id)
+            for timeframe in ("week", "month"):
+                key = LeaderboardService.board_key("completions", timeframe, day)
+                pipe.zincrby(key, 1, user_id)
+                pipe.expireat(key, LeaderboardService._bucket_expiry(timeframe, day))
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def record_relapse(user_id, occurred_at):
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            # GT: a back-dated relapse never moves the last relapse backwards.
+            client.zadd(
+                LeaderboardService.board_key("sobriety"),
+                {user_id: _utc(occurred_at).timestamp()},
+                gt=True,
+            )
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def increment_points(amounts):
+        """ZINCRBY {user_id: amount} into the points board in one pipeline.
+
+        Increments commute, so concurrent awards can mirror in any order.
+        """
+        client = get_redis()
+        if client is None or not amounts:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for user_id, amount in amounts.items():
+                pipe.zincrby(LeaderboardService.board_key("points"), amount, user_id)
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def sync_user(user):
+        """Recompute one user's entries, dropping them if the account is inactive"""
+        client = get_redis()
+        if client is None:
+            return
+        today = datetime.now(timezone.utc).date()
+        try:
+            pipe = client.pipeline(transaction=False)
+            for board, timeframe in BOARD_TIMEFRAMES:
+                key = LeaderboardService.board_key(board, timeframe, today)
+                score = None
+                if user.is_active:
+                    row = (
+                        LeaderboardService._score_query(board, timeframe, today)
+                        .filter(User.id == user.id)
+                        .first()
+                    )
+                    score = row[1] if row else None
+                if score is None:
+                    pipe.zrem(key, user.id)
+                else:
+                    pipe.zadd(key, {user.id: LeaderboardService._redis_score(board, score)})
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    @staticmethod
+    def remove_user(user_id):
+        """Drop a deleted account from every board; past week/month buckets just expire"""
+        client = get_redis()
+        if client is None:
+            return
+        today = datetime.now(timezone.utc).date()
+        try:
+            pipe = client.pipeline(transaction=False)
+            for board, timeframe in BOARD_TIMEFRAMES:
+                pipe.zrem(LeaderboardService.board_key(board, timeframe, today), user_id)
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+
+    # Reads
+
+    @staticmethod
+    def top(board, timeframe="all", limit=20):
+        """Best ``limit`` entries as dicts with user_id, username, score and rank"""
+        rows = LeaderboardService._top_from_redis(board, timeframe, limit)
+        if rows is None:
+            rows = LeaderboardService._top_from_db(board, timeframe, limit)
+
+        users = {
+            user.id: user
+            for user in User.query.filter(
+                User.id.in_([user_id for user_id, _ in rows]), User.is_active == True
+            )
+        }
+        entries = []
+        for user_id, score in rows:
+            user = users.get(user_id)
+            if user is not None:
+                entries.append({
+                    "user_id": user_id,
+                    "username": user.username,
+                    "score": LeaderboardService._display_score(board, score),
+                    "rank": len(entries) + 1,
+                })
+        return entries
+
+    @staticmethod
+    def rank(board, user_id, timeframe="all"):
+        """1-based rank of ``user_id`` on a board, or None if they are not on it"""
+        client = LeaderboardService._ready_client()
+        if client is not None:
+            key = LeaderboardService.board_key(board, timeframe)
+            try:
+                if board in ASCENDING_BOARDS:
+                    rank = client.zrank(key, user_id)
+                else:
+                    rank = client.zrevrank(key, user_id)
+                return None if rank is None else rank + 1
+            except Exception as e:
+                report_redis_error(e)
+        return LeaderboardService._rank_from_db(board, timeframe, user_id)
+
+    @staticmethod
+    def _ready_client():
+        """Redis client once the boards are built, else None (building them if nobody is)"""
+        client = get_redis()
+        if client is None:
+            return None
+        request_cache = RequestCache.current()
+        try:
+            built, = request_cache.fetch([("exists", BUILT_KEY)])
+        except Exception:
+            return None
+        if built:
+            return client
+        if LeaderboardService._build_on_first_use(client):
+            request_cache.forget(BUILT_KEY)
+            return client
+        return None
+
+    @staticmethod
+    def _build_on_first_use(client):
+        """Take the rebuild lock and build the boards; True if they were built inline.
+
+        With LEADERBOARD_BUILD_IN_BACKGROUND the build runs in a thread and
+        reads stay on SQL until it sets BUILT_KEY.
+        """
+        from flask import current_app
+
+        try:
+            if not client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_SECONDS):
+                return False
+        except Exception as e:
+            report_redis_error(e)
+            return False
+        if not current_app.config.get("LEADERBOARD_BUILD_IN_BACKGROUND"):
+            return LeaderboardService._rebuild_locked(client)
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=LeaderboardService._run_build, args=(app, client),
+            name="leaderboard-build", daemon=True,
+        ).start()
+        return False
+
+    @staticmethod
+    def _run_build(app, client):
+        with app.app_context():
+            try:
+                LeaderboardService._rebuild_locked(client)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _top_from_redis(board, timeframe, limit):
+        client = LeaderboardService._ready_client()
+        if client is None:
+            return None
+        key = LeaderboardService.board_key(board, timeframe)
+        try:
+            if board in ASCENDING_BOARDS:
+                rows = client.zrange(key, 0, limit - 1, withscores=True)
+            else:
+                rows = client.zrevrange(key, 0, limit - 1, withscores=True)
+        except Exception as e:
+            report_redis_error(e)
+            return None
+        return [(member.decode(), score) for member, score in rows]
+
+    # Database side: rebuilds and the fallback when Redis is down
+
+    @staticmethod
+    def _score_query(board, timeframe="all", today=None):
+        """(user_id, score) rows for active users on ``board``"""
+        if board == "points":
+            return db.session.query(
+                User.id, db.func.coalesce(User.points, 0).label("score")
+            ).filter(User.is_active == True)
+
+        if board == "sobriety":
+            return (
+                db.session.query(User.id, db.func.max(RelapseEvent.occurred_at).label("score"))
+                .join(RelapseEvent, User.id == RelapseEvent.user_id)
+                .filter(User.is_active == True)
+                .group_by(User.id)
+            )
+
+        query = (
+            db.session.query(User.id, db.func.count(HabitLog.id).label("score"))
+            .join(HabitLog, User.id == HabitLog.user_id)
+            .filter(User.is_active == True)
+            .group_by(User.id)
+        )
+        start = LeaderboardService._period_start(
+            timeframe, today or datetime.now(timezone.utc).date()
+        )
+        if start is not None:
+            query = query.filter(
+                HabitLog.completed_at >= datetime(start.year, start.month, start.day)
+            )
+        return query
+
+    @staticmethod
+    def _redis_score(board, score):
+        if board == "sobriety":
+            return _utc(score).timestamp()
+        return score or 0
+
+    @staticmethod
+    def _display_score(board, score):
+        if board == "sobriety":
+            last_relapse = datetime.fromtimestamp(score, timezone.utc)
+            return (datetime.now(timezone.utc) - last_relapse).days
+        return int(score)
+
+    @staticmethod
+    def _db_scores(board, timeframe):
+        return [
+            (user_id, LeaderboardService._redis_score(board, score))
+            for user_id, score in LeaderboardService._score_query(board, timeframe)
+        ]
+
+    @staticmethod
+    def _ranked(board, timeframe):
+        """The board's score subquery and its ORDER BY, matching the sorted set's order"""
+        scores = LeaderboardService._score_query(board, timeframe).subquery()
+        if board in ASCENDING_BOARDS:
+            return scores, (scores.c.score.asc(), scores.c.id.asc())
+        # ZREVRANGE breaks ties by member, reversed.
+        return scores, (scores.c.score.desc(), scores.c.id.desc())
+
+    @staticmethod
+    def _top_from_db(board, timeframe, limit):
+        scores, order = LeaderboardService._ranked(board, timeframe)
+        rows = db.session.execute(
+            db.select(scores.c.id, scores.c.score).order_by(*order).limit(limit)
+        )
+        return [
+            (user_id, LeaderboardService._redis_score(board, score))
+            for user_id, score in rows
+        ]
+
+    @staticmethod
+    def _rank_from_db(board, timeframe, user_id):
+        scores, _ = LeaderboardService._ranked(board, timeframe)
+        mine = db.select(scores.c.score).where(scores.c.id == user_id)
+        if db.session.execute(mine).first() is None:
+            return None
+
+        mine = mine.scalar_subquery()
+        if board in ASCENDING_BOARDS:
+            ahead = db.or_(scores.c.score < mine, db.and_(scores.c.score == mine, scores.c.id < user_id))
+        else:
+            ahead = db.or_(scores.c.score > mine, db.and_(scores.c.score == mine, scores.c.id > user_id))
+        return db.session.execute(
+            db.select(db.func.count()).select_from(scores).where(ahead)
+        ).scalar() + 1
+
+    @staticmethod
+    def rebuild():
+        """Recompute every board from the database; returns False if skipped"""
+        client = get_redis()
+        if client is None:
+            return False
+        try:
+            if not client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_SECONDS):
+                return False
+        except Exception as e:
+            report_redis_error(e)
+            return False
+        return LeaderboardService._rebuild_locked(client)
+
+    @staticmethod
+    def _rebuild_locked(client):
+        """Recompute every board while holding REBUILD_LOCK_KEY, then release it"""
+        today = datetime.now(timezone.utc).date()
+        try:
+            for board, timeframe in BOARD_TIMEFRAMES:
+                LeaderboardService._replace_board(client, board, timeframe, today)
+            client.set(BUILT_KEY, datetime.now(timezone.utc).isoformat())
+            return True
+        except Exception as e:
+            report_redis_error(e)
+            return False
+        finally:
+            try:
+                client.delete(REBUILD_LOCK_KEY)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _replace_board(client, board, timeframe, today):
+        key = LeaderboardService.board_key(board, timeframe, today)
+        staging = f"{key}:rebuild"
+        scores = dict(LeaderboardService._db_scores(board, timeframe))
+
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(staging)
+        members = list(scores.items())
+        for i in range(0, len(members), ZADD_CHUNK_SIZE):
+            pipe.zadd(staging, dict(members[i:i + ZADD_CHUNK_SIZE]))
+        pipe.execute()
+
+        pipe = client.pipeline()
+        if scores:
+            # RENAME swaps the finished board in atomically.
+            pipe.rename(staging, key)
+        else:
+            pipe.delete(key)
+        if timeframe != "all":
+            pipe.expireat(key, LeaderboardService._bucket_expiry(timeframe, today))
+        pipe.execute()
+        logger.info("Rebuilt %s (%d entries)", key, len(scores))
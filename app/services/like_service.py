@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import and_, bindparam
+from app import db
+from app.models import User
+from app.models.social import CommunityPost, CommunityPostLike
+from app.services.community_service import CommunityService
+from app.services.social_cache_service import warm_posts
+from app.utils.cache import CLAIM_BATCH, LIKE_QUEUE_KEY, LikeCache, get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+LIKE_PROCESSING_KEY = "community:likes:processing"
+FLUSH_LOCK_KEY = "community:likes:flush-lock"
+FLUSH_LOCK_SECONDS = 60
+FLUSH_BATCH_SIZE = 500
+
+_likes = CommunityPostLike.__table__
+_posts = CommunityPost.__table__
+_flusher = {"pid": None}
+
+
+class LikeService:
+    """Likes are toggled in Redis and written to the database behind it.
+
+    toggle() is a single Lua call that flips membership in the post's like
+    set and queues the change. flush_pending() drains the queue in batches:
+    toggles are collapsed to each (post, user) pair's final state, like rows
+    are inserted/deleted with executemany, and counters move by their net
+    delta with ``likes_count = likes_count + :delta``.
+    """
+
+    @staticmethod
+    def toggle(user_id, post_id):
+        """(liked, count) after flipping ``user_id``'s like; None if the post does not exist"""
+        try:
+            result = LikeCache.toggle(user_id, post_id)
+            if result is None:
+                # Cold like set: load it from the database once, then retry.
+                if post_id not in warm_posts([post_id]):
+                    if get_redis() is None:
+                        raise ConnectionError("Redis unavailable")
+                    return None
+                result = LikeCache.toggle(user_id, post_id)
+            if result is not None:
+                LikeService._ensure_flusher()
+            return result
+        except Exception:
+            return LikeService._toggle_in_database(user_id, post_id)
+
+    @staticmethod
+    def _toggle_in_database(user_id, post_id):
+        """Synchronous fallback while Redis is unavailable"""
+        post = db.session.get(CommunityPost, post_id)
+        if post is None or not post.is_approved:
+            return None
+
+        existing = CommunityPostLike.query.filter_by(post_id=post_id, user_id=user_id).first()
+        if existing:
+            db.session.delete(existing)
+            counter = _posts.update().where(_posts.c.id == post_id, _posts.c.likes_count > 0)
+            db.session.execute(counter.values(likes_count=_posts.c.likes_count - 1))
+        else:
+            db.session.add(CommunityPostLike(post_id=post_id, user_id=user_id))
+            counter = _posts.update().where(_posts.c.id == post_id)
+            db.session.execute(counter.values(likes_count=_posts.c.likes_count + 1))
+        db.session.commit()
+        CommunityService.invalidate_posts([post_id])
+        db.session.refresh(post)
+        return existing is None, post.likes_count
+
+    @staticmethod
+    def flush_pending(batch_size=FLUSH_BATCH_SIZE):
+        """Write queued toggles to the database; returns the number of events applied"""
+        client = get_redis()
+        if client is None:
+            return 0
+        try:
+            if not client.set(FLUSH_LOCK_KEY, 1, nx=True, ex=FLUSH_LOCK_SECONDS):
+                return 0
+        except Exception as e:
+            report_redis_error(e)
+            return 0
+
+        applied = 0
+        try:
+            while True:
+                # A batch left behind by a failed flush goes first.
+                items = client.lrange(LIKE_PROCESSING_KEY, 0, -1)
+                if not items:
+                    items = client.eval(
+                        CLAIM_BATCH, 2, LIKE_QUEUE_KEY, LIKE_PROCESSING_KEY, batch_size
+                    )
+                if not items:
+                    return applied
+                LikeService._apply([json.loads(item) for item in items])
+                client.delete(LIKE_PROCESSING_KEY)
+                applied += len(items)
+                client.expire(FLUSH_LOCK_KEY, FLUSH_LOCK_SECONDS)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Like flush failed, batch will be retried: %s", e)
+            return applied
+        finally:
+            try:
+                client.delete(FLUSH_LOCK_KEY)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _apply(events):
+        final = {}
+        for event in events:
+            # Later toggles win; the queue preserves order.
+            final[(event["post"], event["user"])] = bool(event["liked"])
+
+        post_ids = {post_id for post_id, _ in final}
+        user_ids = {user_id for _, user_id in final}
+        existing = set(
+            db.session.query(CommunityPostLike.post_id, CommunityPostLike.user_id)
+            .filter(CommunityPostLike.post_id.in_(post_ids), CommunityPostLike.user_id.in_(user_ids))
+        )
+        live_posts = {
+            post_id for (post_id,) in
+            db.session.query(CommunityPost.id).filter(CommunityPost.id.in_(post_ids))
+        }
+        # Either side may have been deleted since the toggle; inserting its
+        # like would break a foreign key and stall the queue on every retry.
+        live_users = {
+            user_id for (user_id,) in
+            db.session.query(User.id).filter(User.id.in_(user_ids))
+        }
+
+        now = datetime.now(timezone.utc)
+        inserts, deletes, deltas = [], [], {}
+        for (post_id, user_id), liked in final.items():
+            if post_id not in live_posts or user_id not in live_users or liked == ((post_id, user_id) in existing):
+                continue
+            if liked:
+                inserts.append({
+                    "id": str(uuid.uuid4()), "post_id": post_id,
+                    "user_id": user_id, "created_at": now,
+                })
+            else:
+                deletes.append({"b_post_id": post_id, "b_user_id": user_id})
+            deltas[post_id] = deltas.get(post_id, 0) + (1 if liked else -1)
+
+        if inserts:
+            db.session.execute(_likes.insert(), inserts)
+        if deletes:
+            db.session.execute(
+                _likes.delete().where(and_(
+                    _likes.c.post_id == bindparam("b_post_id"),
+                    _likes.c.user_id == bindparam("b_user_id"),
+                )),
+                deletes,
+            )
+        deltas = [{"b_id": post_id, "b_delta": delta} for post_id, delta in deltas.items() if delta]
+        if deltas:
+            db.session.execute(
+                _posts.update()
+                .where(_posts.c.id == bindparam("b_id"))
+                .values(likes_count=_posts.c.likes_count + bindparam("b_delta")),
+                deltas,
+            )
+        db.session.commit()
+        CommunityService.invalidate_posts(delta["b_id"] for delta in deltas)
+
+    @staticmethod
+    def _ensure_flusher():
+        """Start this process's background flusher (once per pid, so after fork too)"""
+        from flask import current_app
+
+        interval = current_app.config.get("LIKE_FLUSH_INTERVAL", 0)
+        pid = os.getpid()
+        if not interval or _flusher["pid"] == pid:
+            return
+        _flusher["pid"] = pid
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=LikeService._run_flusher, args=(app, interval),
+            name="like-flusher", daemon=True,
+        ).start()
+
+    @staticmethod
+    def _run_flusher(app, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    LikeService.flush_pending()
+            except Exception as e:
+                logger.warning("Like flusher error: %s", e)
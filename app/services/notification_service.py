@@ -0,0 +1,473 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import event, select, literal
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Notification, Broadcast, BroadcastRead
+from app.utils.cache import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+UNREAD_TTL = 3600
+UNREAD_RECONCILE_BATCH = 500
+# Each stream holds a gunicorn worker thread (gthread workers, see
+# gunicorn.conf.py), so streams end after a while; EventSource reconnects.
+STREAM_SECONDS = 300
+STREAM_HEARTBEAT_SECONDS = 15
+# Without Redis there is nothing to push, so clients reconnect on this delay.
+STREAM_FALLBACK_RETRY_MS = 30000
+SHARED_EPOCH_KEY = "notifications:shared-epoch"
+SHARED_CHANNEL = "notifications:broadcast"
+# Applies a committed change to a cached unread count and tells the user's
+# open streams. A missing count stays missing (the next read fills it), and
+# one that would go negative has drifted and is dropped.
+_ADJUST_UNREAD = """
+local count = nil
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    if ARGV[1] == 'reset' then
+        redis.call('HSET', KEYS[1], 'count', 0)
+        count = 0
+    else
+        count = redis.call('HINCRBY', KEYS[1], 'count', ARGV[1])
+        if count < 0 then
+            redis.call('DEL', KEYS[1])
+            count = nil
+        end
+    end
+end
+redis.call('PUBLISH', KEYS[2], count or '')
+return count
+"""
+BROADCAST_CHUNK_SIZE = 1000
+# A running broadcast whose worker hasn't checkpointed for this long is
+# presumed dead and may be claimed by another.
+BROADCAST_LEASE = timedelta(minutes=5)
+INBOX_LIMIT = 50
+
+_notifications = Notification.__table__
+_broadcasts = Broadcast.__table__
+_reads = BroadcastRead.__table__
+
+
+class NotificationService:
+
+    # Admin broadcasts
+
+    @staticmethod
+    def start_broadcast(title, message, notification_type='general', sender_id=None,
+                        shared=False, link=None):
+        """Record a broadcast and hand it to a worker; returns the Broadcast.
+
+        Shared broadcasts are complete as soon as the row exists.
+        """
+        broadcast = Broadcast(
+            title=title, message=message, notification_type=notification_type,
+            sender_id=sender_id, shared=shared, link=link,
+        )
+        db.session.add(broadcast)
+        db.session.flush()
+        broadcast.total = NotificationService._audience(broadcast).count()
+        if shared:
+            broadcast.status = 'done'
+            broadcast.delivered = broadcast.total
+            broadcast.finished_at = datetime.now(timezone.utc)
+            # One epoch bump invalidates every cached count at once.
+            db.session.info['unread_shared'] = True
+        db.session.commit()
+
+        if not shared:
+            NotificationService._dispatch(broadcast.id)
+        return broadcast
+
+    @staticmethod
+    def _audience(broadcast):
+        # Fixed at send time, so a resumed run doesn't pick up new sign-ups.
+        return db.session.query(User.id).filter(
+            User.is_active == True, User.created_at <= broadcast.created_at
+        )
+
+    @staticmethod
+    def _dispatch(broadcast_id):
+        from flask import current_app
+
+        if not current_app.config.get('BROADCAST_IN_BACKGROUND'):
+            NotificationService.deliver(broadcast_id)
+            return
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=NotificationService._run_delivery, args=(app, broadcast_id),
+            name=f'broadcast-{broadcast_id}', daemon=True,
+        ).start()
+
+    @staticmethod
+    def _run_delivery(app, broadcast_id):
+        with app.app_context():
+            try:
+                NotificationService.deliver(broadcast_id)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _claim(broadcast_id):
+        """Atomically take ownership of a pending or abandoned broadcast"""
+        now = datetime.now(timezone.utc)
+        claimed = db.session.execute(
+            _broadcasts.update()
+            .where(
+                _broadcasts.c.id == broadcast_id,
+                _broadcasts.c.shared == False,
+                db.or_(
+                    _broadcasts.c.status == 'pending',
+                    db.and_(
+                        _broadcasts.c.status == 'running',
+                        _broadcasts.c.claimed_at < now - BROADCAST_LEASE,
+                    ),
+                ),
+            )
+            .values(status='running', claimed_at=now)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    @staticmethod
+    def deliver(broadcast_id, chunk_size=None):
+        """Copy a broadcast into every inbox; returns False if another worker owns it.
+
+        Users are walked in id order, ``chunk_size`` ids at a time. Each chunk
+        is one executemany insert committed together with the checkpoint, so
+        an interrupted run resumes exactly where it stopped.
+        """
+        from flask import current_app
+
+        chunk_size = chunk_size or current_app.config.get('BROADCAST_CHUNK_SIZE', BROADCAST_CHUNK_SIZE)
+        if not NotificationService._claim(broadcast_id):
+            return False
+
+        broadcast = db.session.get(Broadcast, broadcast_id)
+        try:
+            while True:
+                query = NotificationService._audience(broadcast)
+                if broadcast.last_user_id is not None:
+                    query = query.filter(User.id > broadcast.last_user_id)
+                user_ids = [user_id for (user_id,) in query.order_by(User.id).limit(chunk_size)]
+                if not user_ids:
+                    break
+
+                now = datetime.now(timezone.utc)
+                db.session.execute(_notifications.insert(), [
+                    {
+                        'id': str(uuid.uuid4()), 'user_id': user_id,
+                        'title': broadcast.title, 'message': broadcast.message,
+                        'notification_type': broadcast.notification_type,
+                        'link': broadcast.link, 'is_read': False,
+                        'broadcast_id': broadcast.id, 'created_at': now,
+                    }
+                    for user_id in user_ids
+                ])
+                broadcast.delivered += len(user_ids)
+                broadcast.last_user_id = user_ids[-1]
+                broadcast.claimed_at = now
+                NotificationService._queue_unread({user_id: 1 for user_id in user_ids})
+                db.session.commit()
+
+            broadcast.status = 'done'
+            broadcast.finished_at = datetime.now(timezone.utc)
+            db.session.commit()
+            logger.info('Broadcast %s delivered to %d users', broadcast.id, broadcast.delivered)
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Broadcast %s failed after %d users', broadcast_id, broadcast.delivered)
+            broadcast.status = 'failed'
+            broadcast.error = str(e)
+            db.session.commit()
+            return False
+
+    @staticmethod
+    def resume_broadcasts(retry_failed=False):
+        """Deliver every broadcast left pending or abandoned; returns how many finished"""
+        if retry_failed:
+            Broadcast.query.filter_by(status='failed', shared=False).update({'status': 'pending'})
+            db.session.commit()
+        ids = [
+            broadcast_id for (broadcast_id,) in
+            db.session.query(Broadcast.id)
+            .filter(Broadcast.status.in_(['pending', 'running']), Broadcast.shared == False)
+            .order_by(Broadcast.created_at)
+        ]
+        return sum(1 for broadcast_id in ids if NotificationService.deliver(broadcast_id))
+
+    @staticmethod
+    def get_recent_broadcasts(limit=10):
+        return Broadcast.query.order_by(Broadcast.created_at.desc()).limit(limit).all()
+
+    # Inboxes: the user's own notifications plus shared broadcasts
+
+    @staticmethod
+    def _shared_for(user_id):
+        """Shared broadcasts sent since the user signed up"""
+        joined = select(User.created_at).where(User.id == user_id).scalar_subquery()
+        return Broadcast.query.filter(Broadcast.shared == True, Broadcast.created_at >= joined)
+
+    @staticmethod
+    def get_inbox(user_id, limit=INBOX_LIMIT):
+        """Newest notifications first; shared broadcasts carry an ``is_read`` flag"""
+        notifications = Notification.query.filter_by(user_id=user_id)\
+            .order_by(Notification.created_at.desc()).limit(limit).all()
+
+        rows = NotificationService._shared_for(user_id)\
+            .outerjoin(BroadcastRead, db.and_(
+                BroadcastRead.broadcast_id == Broadcast.id, BroadcastRead.user_id == user_id
+            ))\
+            .add_columns(BroadcastRead.read_at)\
+            .order_by(Broadcast.created_at.desc()).limit(limit).all()
+        shared = []
+        for broadcast, read_at in rows:
+            broadcast.is_read = read_at is not None
+            shared.append(broadcast)
+
+        inbox = sorted(notifications + shared, key=lambda item: item.created_at, reverse=True)
+        return inbox[:limit]
+
+    @staticmethod
+    def create(user_id, title, message, notification_type='general', link=None):
+        """Add a notification to the session; the caller commits"""
+        notification = Notification(
+            user_id=user_id, title=title, message=message,
+            notification_type=notification_type, link=link,
+        )
+        db.session.add(notification)
+        NotificationService._queue_unread({user_id: 1})
+        return notification
+
+    @staticmethod
+    def mark_read(user_id, notification_id):
+        """Mark one notification or shared broadcast read; returns it, or None"""
+        notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
+        if notification is not None:
+            if not notification.is_read:
+                notification.is_read = True
+                NotificationService._queue_unread({user_id: -1})
+                db.session.commit()
+            return notification
+
+        broadcast = NotificationService._shared_for(user_id)\
+            .filter(Broadcast.id == notification_id).first()
+        if broadcast is None:
+            return None
+        if db.session.get(BroadcastRead, (broadcast.id, user_id)) is None:
+            db.session.add(BroadcastRead(broadcast_id=broadcast.id, user_id=user_id))
+            NotificationService._queue_unread({user_id: -1})
+            db.session.commit()
+        return broadcast
+
+    @staticmethod
+    def mark_all_read(user_id):
+        Notification.query.filter_by(user_id=user_id, is_read=False)\
+            .update({'is_read': True})
+
+        read = select(_reads.c.broadcast_id).where(_reads.c.user_id == user_id)
+        unread = NotificationService._shared_for(user_id)\
+            .filter(Broadcast.id.not_in(read))\
+            .with_entities(Broadcast.id, literal(user_id), literal(datetime.now(timezone.utc)))
+        db.session.execute(
+            _reads.insert().from_select(['broadcast_id', 'user_id', 'read_at'], unread.statement)
+        )
+        NotificationService._queue_unread({user_id: None})
+        db.session.commit()
+
+    # Unread counts: a Redis hash per user of {count, epoch}, kept current by
+    # deltas applied after each commit. Shared broadcasts bump one global
+    # epoch instead of touching every user; a count from an older epoch is
+    # recomputed on its next read.
+
+    @staticmethod
+    def unread_key(user_id):
+        return f"notifications:unread:{user_id}"
+
+    @staticmethod
+    def user_channel(user_id):
+        return f"notifications:user:{user_id}"
+
+    @staticmethod
+    def unread_count(user_id):
+        client = get_redis()
+        if client is None:
+            return NotificationService._db_unread_counts([user_id])[user_id]
+        key = NotificationService.unread_key(user_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hmget(key, 'count', 'epoch')
+            pipe.get(SHARED_EPOCH_KEY)
+            (count, epoch), current_epoch = pipe.execute()
+            if count is not None and epoch == (current_epoch or b'0'):
+                return int(count)
+        except Exception as e:
+            report_redis_error(e)
+            return NotificationService._db_unread_counts([user_id])[user_id]
+
+        count = NotificationService._db_unread_counts([user_id])[user_id]
+        try:
+            pipe = client.pipeline()
+            pipe.hset(key, mapping={'count': count, 'epoch': current_epoch or 0})
+            pipe.expire(key, UNREAD_TTL)
+            pipe.execute()
+        except Exception as e:
+            report_redis_error(e)
+        return count
+
+    @staticmethod
+    def stream_unread(user_id):
+        """Server-sent event lines: the current count, then each change to it"""
+        count = NotificationService.unread_count(user_id)
+        db.session.close()
+        yield NotificationService._unread_event(count)
+
+        client = get_redis()
+        pubsub = None
+        try:
+            if client is not None:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(NotificationService.user_channel(user_id), SHARED_CHANNEL)
+        except Exception as e:
+            report_redis_error(e)
+            pubsub = None
+        if pubsub is None:
+            yield f'retry: {STREAM_FALLBACK_RETRY_MS}\n\n'
+            return
+
+        deadline = time.monotonic() + STREAM_SECONDS
+        last_write = time.monotonic()
+        try:
+            while time.monotonic() < deadline:
+                # None also covers the (ignored) subscribe confirmations.
+                if pubsub.get_message(timeout=STREAM_HEARTBEAT_SECONDS) is None:
+                    if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                        last_write = time.monotonic()
+                        yield ': keep-alive\n\n'
+                    continue
+                latest = NotificationService.unread_count(user_id)
+                db.session.close()
+                if latest != count:
+                    count = latest
+                    last_write = time.monotonic()
+                    yield NotificationService._unread_event(count)
+        except Exception as e:
+            report_redis_error(e)
+        finally:
+            pubsub.close()
+
+    @staticmethod
+    def _unread_event(count):
+        return f'event: unread\ndata: {json.dumps({"count": count})}\n\n'
+
+    @staticmethod
+    def _db_unread_counts(user_ids):
+        """{user_id: unread notifications + unread shared broadcasts} in two grouped queries"""
+        counts = dict.fromkeys(user_ids, 0)
+        own = db.session.query(Notification.user_id, db.func.count(Notification.id))\
+            .filter(Notification.user_id.in_(user_ids), Notification.is_read == False)\
+            .group_by(Notification.user_id)
+        shared = db.session.query(User.id, db.func.count(Broadcast.id))\
+            .join(Broadcast, db.and_(Broadcast.shared == True, Broadcast.created_at >= User.created_at))\
+            .outerjoin(BroadcastRead, db.and_(
+                BroadcastRead.broadcast_id == Broadcast.id, BroadcastRead.user_id == User.id
+            ))\
+            .filter(User.id.in_(user_ids), BroadcastRead.user_id.is_(None))\
+            .group_by(User.id)
+        for user_id, count in list(own) + list(shared):
+            counts[user_id] += count
+        return counts
+
+    @staticmethod
+    def _queue_unread(deltas):
+        """Stage {user_id: delta} for after the commit; a None delta resets to zero"""
+        pending = db.session.info.setdefault('unread_deltas', {})
+        for user_id, delta in deltas.items():
+            if delta is None:
+                pending[user_id] = None
+            else:
+                pending[user_id] = (pending.get(user_id) or 0) + delta
+
+    @staticmethod
+    def reconcile_unread_counts(batch_size=UNREAD_RECONCILE_BATCH):
+        """Drop cached counts that disagree with the database; returns (checked, drifted)"""
+        client = get_redis()
+        if client is None:
+            return 0, 0
+        checked = drifted = 0
+        try:
+            keys = client.scan_iter(match=NotificationService.unread_key('*'), count=batch_size)
+            batch = []
+            for key in keys:
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    drifted += NotificationService._reconcile_batch(client, batch)
+                    checked += len(batch)
+                    batch = []
+            if batch:
+                drifted += NotificationService._reconcile_batch(client, batch)
+                checked += len(batch)
+        except Exception as e:
+            report_redis_error(e)
+        log = logger.warning if drifted else logger.info
+        log('Unread counts: %d checked, %d drifted', checked, drifted)
+        return checked, drifted
+
+    @staticmethod
+    def _reconcile_batch(client, keys):
+        prefix = len(NotificationService.unread_key(''))
+        user_ids = [key.decode()[prefix:] for key in keys]
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, 'count')
+        cached = pipe.execute()
+        actual = NotificationService._db_unread_counts(user_ids)
+
+        stale = [
+            (key, user_id) for key, user_id, count in zip(keys, user_ids, cached)
+            if count is not None and int(count) != actual[user_id]
+        ]
+        if stale:
+            pipe = client.pipeline(transaction=False)
+            for key, user_id in stale:
+                pipe.delete(key)
+                pipe.publish(NotificationService.user_channel(user_id), '')
+            pipe.execute()
+        return len(stale)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_unread(session):
+    deltas = session.info.pop('unread_deltas', None)
+    shared = session.info.pop('unread_shared', False)
+    if not deltas and not shared:
+        return
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id, delta in deltas.items() if deltas else ():
+            if delta != 0:
+                pipe.eval(
+                    _ADJUST_UNREAD, 2,
+                    NotificationService.unread_key(user_id), NotificationService.user_channel(user_id),
+                    'reset' if delta is None else delta,
+                )
+        if shared:
+            pipe.incr(SHARED_EPOCH_KEY)
+            pipe.publish(SHARED_CHANNEL, '')
+        pipe.execute()
+    except Exception as e:
+        report_redis_error(e)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_unread(session):
+    session.info.pop('unread_deltas', None)
+    session.info.pop('unread_shared', None)
@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import bindparam
+from app import db
+from app.models import User, PointsLedgerEntry
+from app.services.leaderboard_service import LeaderboardService
+
+LEDGER_CHUNK_SIZE = 1000
+
+_ledger = PointsLedgerEntry.__table__
+_users = User.__table__
+
+
+class PointsService:
+    """Points are appended to ``points_ledger`` and summed into ``users.points``.
+
+    The total moves with ``points = points + :amount`` in the same transaction
+    as the ledger row, so concurrent awards never overwrite each other and the
+    user row is only locked from that statement to the commit. The Redis
+    points board is mirrored with ZINCRBY once the transaction has committed.
+    """
+
+    @staticmethod
+    def award(user_id, amount, reason, source_id=None):
+        """Credit (or debit) ``amount`` points and commit; returns the new total.
+
+        Anything the caller has pending in the session commits with it.
+        """
+        db.session.add(PointsLedgerEntry(
+            user_id=user_id, amount=amount, reason=reason, source_id=source_id
+        ))
+        total = db.session.execute(
+            _users.update()
+            .where(_users.c.id == user_id)
+            .values(points=db.func.coalesce(_users.c.points, 0) + amount)
+            .returning(_users.c.points)
+        ).scalar()
+        db.session.commit()
+        LeaderboardService.increment_points({user_id: amount})
+        return total
+
+    @staticmethod
+    def award_many(awards, chunk_size=LEDGER_CHUNK_SIZE):
+        """Apply (user_id, amount, reason, source_id) tuples in one transaction.
+
+        Ledger rows go in with chunked executemany inserts, and each user's
+        total moves once by the sum of their awards. Returns {user_id: amount}.
+        """
+        now = datetime.now(timezone.utc)
+        amounts = {}
+        rows = []
+        for user_id, amount, reason, source_id in awards:
+            rows.append({
+                "id": str(uuid.uuid4()), "user_id": user_id, "amount": amount,
+                "reason": reason, "source_id": source_id, "created_at": now,
+            })
+            amounts[user_id] = amounts.get(user_id, 0) + amount
+            if len(rows) >= chunk_size:
+                db.session.execute(_ledger.insert(), rows)
+                rows = []
+        if rows:
+            db.session.execute(_ledger.insert(), rows)
+
+        totals = [{"b_id": user_id, "b_amount": amount} for user_id, amount in amounts.items() if amount]
+        for i in range(0, len(totals), chunk_size):
+            db.session.execute(
+                _users.update()
+                .where(_users.c.id == bindparam("b_id"))
+                .values(points=db.func.coalesce(_users.c.points, 0) + bindparam("b_amount")),
+                totals[i:i + chunk_size],
+            )
+        db.session.commit()
+        LeaderboardService.increment_points({row["b_id"]: row["b_amount"] for row in totals})
+        return amounts
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from app import db
 from app.models import RelapseEvent
+from app.services.leaderboard_service import LeaderboardService
 
 
 class RelapseService:
@@ -27,6 +28,8 @@ class RelapseService:
         db.session.add(relapse)
         db.session.commit()
         
+        LeaderboardService.record_relapse(user_id, occurred_at)
+        
         return relapse
     
     @staticmethod
@@ -64,6 +67,9 @@ class RelapseService:
         
         db.session.commit()
         
+        if 'occurred_at' in kwargs:
+            LeaderboardService.sync_user(relapse.user)
+        
         return relapse
     
     @staticmethod
@@ -72,9 +78,12 @@ class RelapseService:
         if not relapse:
             return False
         
+        user = relapse.user
         db.session.delete(relapse)
         db.session.commit()
         
+        LeaderboardService.sync_user(user)
+        
         return True
     
     @staticmethod
@@ -1,40 +1,117 @@
+import logging
 from app import db
-from app.models.social import CommunityPost, CommunityPostLike, CommunityComment
-from app.utils.cache import LikeCache, CommentCache
+from app.models.social import CommunityPost, CommunityPostLike
+from app.utils.cache import LikeCache, CommentCache, get_redis, report_redis_error
 
+logger = logging.getLogger(__name__)
 
-def sync_likes_to_cache():
-    """Sync all likes from DB to Redis for instant access"""
-    try:
-        # Get all likes grouped by post
-        likes = db.session.query(
-            CommunityPostLike.post_id, CommunityPostLike.user_id
-        ).all()
+WARM_CHUNK_SIZE = 500
+WARMED_KEY = "social-cache:warmed"
+WARM_LOCK_KEY = "social-cache:warm-lock"
+WARM_LOCK_SECONDS = 600
 
-        # Batch load into Redis
-        for post_id, user_id in likes:
-            LikeCache.like(user_id, post_id)
 
-        print(f"Synced {len(likes)} likes to Redis cache")
-    except Exception as e:
-        print(f"Error syncing likes: {e}")
+def warm_posts(post_ids):
+    """Make sure the like sets of post_ids are loaded; returns the warm subset.
+
+    Cold posts are loaded with one query and one pipeline, so a feed page
+    costs at most one extra round-trip the first time it is seen.
+    """
+    post_ids = list(post_ids)
+    warm = LikeCache.warm_post_ids(post_ids)
+    cold = [post_id for post_id in post_ids if post_id not in warm]
+    if not cold or get_redis() is None:
+        return warm
+
+    likers = _load_likers(cold)
+    if LikeCache.warm(likers):
+        warm.update(likers)
+    return warm
+
+
+def feed_reads(user_id, post_ids):
+    """RequestCache commands for the like state and counts a feed page shows.
+
+    Fetched with the page's posts, they let warm_posts, the count lookups and
+    LikeCache.are_liked answer from the request's memo; only posts warmed in
+    between are read again.
+    """
+    commands = []
+    for post_id in post_ids:
+        like_key = LikeCache.get_like_key(post_id)
+        commands += [
+            ("exists", LikeCache.get_warm_key(post_id)),
+            ("scard", like_key),
+            ("sismember", like_key, str(user_id)),
+            ("get", CommentCache.get_key(post_id)),
+        ]
+    return commands
 
 
-def sync_comment_counts_to_cache():
-    """Sync comment counts from DB to Redis"""
+def warm_all_posts(chunk_size=WARM_CHUNK_SIZE, force=False):
+    """Warm every post in chunks, once per Redis dataset.
+
+    One caller takes a lock and does the work; a completion marker makes
+    later calls no-ops until Redis is flushed. Returns the number of posts
+    warmed, or None if skipped.
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        if not force and client.exists(WARMED_KEY):
+            return None
+        if not client.set(WARM_LOCK_KEY, 1, nx=True, ex=WARM_LOCK_SECONDS):
+            return None
+    except Exception as e:
+        report_redis_error(e)
+        return None
+
+    total = 0
+    last_id = None
     try:
-        posts = CommunityPost.query.all()
-        for post in posts:
-            CommentCache.set_count(post.id, post.comments_count)
+        while True:
+            query = db.session.query(CommunityPost.id, CommunityPost.comments_count)
+            if last_id is not None:
+                query = query.filter(CommunityPost.id > last_id)
+            rows = query.order_by(CommunityPost.id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            if not LikeCache.warm(_load_likers([post_id for post_id, _ in rows])):
+                return None
+            CommentCache.set_counts({post_id: count or 0 for post_id, count in rows})
+            total += len(rows)
+            last_id = rows[-1][0]
+            client.expire(WARM_LOCK_KEY, WARM_LOCK_SECONDS)
 
-        print(f"Synced {len(posts)} post comment counts to Redis")
+        client.set(WARMED_KEY, total)
+        logger.info("Warmed social cache for %d posts", total)
+        return total
     except Exception as e:
-        print(f"Error syncing comment counts: {e}")
+        report_redis_error(e)
+        return None
+    finally:
+        try:
+            client.delete(WARM_LOCK_KEY)
+        except Exception:
+            pass
+
 
+def _load_likers(post_ids):
+    """{post_id: [user_id, ...]} for the approved posts that exist, from one query.
 
-def initialize_social_cache():
-    """Initialize all social caching on startup"""
-    print("Initializing social cache...")
-    sync_likes_to_cache()
-    sync_comment_counts_to_cache()
-    print("Social cache initialized!")
+    Unapproved posts are never warmed, so LikeService.toggle() treats them as
+    missing, just like its database fallback does.
+    """
+    likers = {}
+    rows = (
+        db.session.query(CommunityPost.id, CommunityPostLike.user_id)
+        .outerjoin(CommunityPostLike, CommunityPostLike.post_id == CommunityPost.id)
+        .filter(CommunityPost.id.in_(post_ids), CommunityPost.is_approved == True)
+    )
+    for post_id, user_id in rows:
+        users = likers.setdefault(post_id, [])
+        if user_id is not None:
+            users.append(user_id)
+    return likers
@@ -1,160 +1,285 @@
-from datetime import datetime, timezone, timedelta
-from app.models import HabitLog
-from app.utils.cache import cache_get, cache_set
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Habit, HabitLog, HabitStreak
+
+
+REBUILD_BATCH_SIZE = 500
+REBUILD_FETCH_SIZE = 10000
 
 
 class StreakService:
+    """Streaks are materialized per habit in ``habit_streaks``.
+
+    Every inserted ``HabitLog`` advances the row in O(1); anything that
+    cannot be applied incrementally (back-dated or deleted logs, a changed
+    frequency) marks the row stale and it is rebuilt from ``habit_logs`` on
+    the next read. Rebuilds are upserted, so concurrent rebuilds or first
+    completions of a habit don't collide on its row. They are committed on
+    their own connection, so a read saves its rebuild without committing the
+    caller's work; if the session has already written in its transaction the
+    rebuild joins it instead, since a second connection could wait on the
+    session's own locks.
+    """
+
     @staticmethod
-    def calculate_current_streak(habit):
-        cache_key = f"streak:current:{habit.id}"
-        cached = cache_get(cache_key)
-        if cached is not None:
-            return cached
-
-        logs = (
-            HabitLog.query.filter_by(habit_id=habit.id)
-            .order_by(HabitLog.completed_at.desc())
-            .all()
-        )
+    def period_index(frequency, day):
+        if frequency == "weekly":
+            # date.toordinal() == 1 is a Monday, so this counts ISO weeks.
+            return (day.toordinal() - 1) // 7
+        if frequency == "monthly":
+            return day.year * 12 + day.month - 1
+        return day.toordinal()
 
-        logs = [log for log in logs if log.completed_at is not None]
-
-        if not logs:
-            result = 0
-        elif habit.frequency == "daily":
-            result = StreakService._calculate_daily_streak(logs)
-        elif habit.frequency == "weekly":
-            result = StreakService._calculate_weekly_streak(logs)
-        elif habit.frequency == "monthly":
-            result = StreakService._calculate_monthly_streak(logs)
-        else:
-            result = (
-                logs[0].streak_count if logs and logs[0].streak_count is not None else 0
-            )
+    @staticmethod
+    def _advance(current, longest, last_period, period):
+        if last_period is None:
+            return 1, max(longest, 1)
+        if period < last_period:
+            return None
+        if period == last_period:
+            return current, longest
+        current = current + 1 if period == last_period + 1 else 1
+        return current, max(longest, current)
 
-        cache_set(cache_key, result, timeout=300)
-        return result
+    @staticmethod
+    def _fold(frequency, days):
+        current, longest, last_period, last_day = 0, 0, None, None
+        for day in days:
+            period = StreakService.period_index(frequency, day)
+            current, longest = StreakService._advance(current, longest, last_period, period)
+            last_period, last_day = period, day
+        return current, longest, last_period, last_day
 
     @staticmethod
-    def _calculate_daily_streak(logs):
-        if not logs:
+    def _effective_current(state, today=None):
+        if state.last_period is None:
             return 0
+        today = today or datetime.now(timezone.utc).date()
+        if state.last_period >= StreakService.period_index(state.frequency, today) - 1:
+            return state.current_streak
+        return 0
+
+    @staticmethod
+    def _needs_rebuild(state, habit):
+        return state is None or state.is_stale or state.frequency != habit.frequency
 
-        streak = 0
-        current_date = datetime.now(timezone.utc).date()
+    @staticmethod
+    def rebuild_streaks(habits):
+        """Recompute and save streak state for ``habits`` from one ordered log query.
 
-        for log in logs:
-            if not log.completed_at:
-                continue
-            log_date = log.completed_at.date()
+        Returns {habit_id: HabitStreak} with the session's copies refreshed.
+        """
+        habits = {habit.id: habit for habit in habits}
+        if not habits:
+            return {}
 
-            if log_date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif log_date == current_date + timedelta(days=1):
-                current_date = log_date
-                streak += 1
-            else:
-                break
+        now = datetime.now(timezone.utc)
+        with _rebuild_connection() as connection:
+            # Rows arrive grouped by habit and in order, so each habit is
+            # folded as it streams past instead of collecting its days first.
+            folded = {}
+            rows = connection.execute(
+                select(HabitLog.habit_id, HabitLog.completed_at)
+                .where(HabitLog.habit_id.in_(habits), HabitLog.completed_at.isnot(None))
+                .order_by(HabitLog.habit_id, HabitLog.completed_at)
+                .execution_options(yield_per=REBUILD_FETCH_SIZE)
+            )
+            for habit_id, group in groupby(rows, key=itemgetter(0)):
+                folded[habit_id] = StreakService._fold(
+                    habits[habit_id].frequency, (completed_at.date() for _, completed_at in group)
+                )
 
-        return streak
+            values = []
+            for habit_id, habit in habits.items():
+                current, longest, last_period, last_day = folded.get(habit_id, (0, 0, None, None))
+                values.append({
+                    "habit_id": habit_id,
+                    "frequency": habit.frequency,
+                    "current_streak": current,
+                    "longest_streak": longest,
+                    "last_period": last_period,
+                    "last_completed_on": last_day,
+                    "is_stale": False,
+                    "updated_at": now,
+                })
+            connection.execute(_upsert_streaks(connection.dialect.name), values)
+
+        return {
+            state.habit_id: state
+            for state in HabitStreak.query.filter(HabitStreak.habit_id.in_(habits)).populate_existing()
+        }
 
     @staticmethod
-    def _calculate_weekly_streak(logs):
-        if not logs:
-            return 0
+    def rebuild_all_streaks(batch_size=REBUILD_BATCH_SIZE):
+        """Rebuild every habit's streak state in batches; returns the habit count."""
+        total = 0
+        last_id = None
+        while True:
+            query = Habit.query.order_by(Habit.id)
+            if last_id is not None:
+                query = query.filter(Habit.id > last_id)
+            batch = query.limit(batch_size).all()
+            if not batch:
+                return total
+            StreakService.rebuild_streaks(batch)
+            total += len(batch)
+            last_id = batch[-1].id
 
-        streak = 0
-        current_week = datetime.now(timezone.utc).isocalendar()[1]
-        current_year = datetime.now(timezone.utc).year
+    @staticmethod
+    def get_state(habit):
+        state = db.session.get(HabitStreak, habit.id)
+        if StreakService._needs_rebuild(state, habit):
+            state = StreakService.rebuild_streaks([habit])[habit.id]
+        return state
 
-        for log in logs:
-            if not log.completed_at:
-                continue
-            log_week = log.completed_at.isocalendar()[1]
-            log_year = log.completed_at.isocalendar()[0]
+    @staticmethod
+    def get_states(habits):
+        """Streak state for many habits: one lookup plus one batched rebuild."""
+        habits = list(habits)
+        if not habits:
+            return {}
 
-            if log_year == current_year and log_week == current_week:
-                streak += 1
-                current_week -= 1
-                if current_week < 1:
-                    current_year -= 1
-                    current_week = 52
-            else:
-                break
+        states = {
+            state.habit_id: state
+            for state in HabitStreak.query.filter(
+                HabitStreak.habit_id.in_([habit.id for habit in habits])
+            )
+        }
+        stale = [
+            habit for habit in habits
+            if StreakService._needs_rebuild(states.get(habit.id), habit)
+        ]
+        if stale:
+            states.update(StreakService.rebuild_streaks(stale))
+        return states
 
-        return streak
+    @staticmethod
+    def streak_after_completion(habit, completed_at):
+        """The current streak ``habit`` will have once ``completed_at`` is logged."""
+        state = StreakService.get_state(habit)
+        period = StreakService.period_index(habit.frequency, completed_at.date())
+        advanced = StreakService._advance(
+            state.current_streak, state.longest_streak, state.last_period, period
+        )
+        return advanced[0] if advanced else state.current_streak
 
     @staticmethod
-    def _calculate_monthly_streak(logs):
-        if not logs:
-            return 0
+    def calculate_current_streak(habit):
+        return StreakService._effective_current(StreakService.get_state(habit))
 
-        streak = 0
-        current_month = datetime.now(timezone.utc).month
-        current_year = datetime.now(timezone.utc).year
+    @staticmethod
+    def calculate_longest_streak(habit):
+        return StreakService.get_state(habit).longest_streak
 
-        for log in logs:
-            if not log.completed_at:
-                continue
-            log_month = log.completed_at.month
-            log_year = log.completed_at.year
+    @staticmethod
+    def get_streak_info(habit):
+        state = StreakService.get_state(habit)
+        return {
+            "current": StreakService._effective_current(state),
+            "longest": state.longest_streak,
+        }
 
-            if log_year == current_year and log_month == current_month:
-                streak += 1
-                current_month -= 1
-                if current_month < 1:
-                    current_year -= 1
-                    current_month = 12
-            else:
-                break
+    @staticmethod
+    def get_streak_info_bulk(habits):
+        today = datetime.now(timezone.utc).date()
+        return {
+            habit_id: {
+                "current": StreakService._effective_current(state, today),
+                "longest": state.longest_streak,
+            }
+            for habit_id, state in StreakService.get_states(habits).items()
+        }
 
-        return streak
 
-    @staticmethod
-    def calculate_longest_streak(habit):
-        cache_key = f"streak:longest:{habit.id}"
-        cached = cache_get(cache_key)
-        if cached is not None:
-            return cached
-
-        logs = (
-            HabitLog.query.filter_by(habit_id=habit.id)
-            .order_by(HabitLog.completed_at.asc())
-            .all()
-        )
+_streaks = HabitStreak.__table__
 
-        if not logs:
-            cache_set(cache_key, 0, timeout=300)
-            return 0
 
-        max_streak = 0
-        current_streak = 0
-        prev_date = None
+@contextmanager
+def _rebuild_connection():
+    """Own committed connection, or the session's if it has written in this transaction"""
+    session = db.session()
+    if session.new or session.dirty or session.deleted or session.info.get("flushed"):
+        yield session.connection()
+        return
+    with db.engine.begin() as connection:
+        yield connection
 
-        for log in logs:
-            if not log.completed_at:
-                continue
-            log_date = log.completed_at.date()
 
-            if prev_date is None:
-                current_streak = 1
-            elif log_date == prev_date:
-                pass
-            elif log_date == prev_date + timedelta(days=1):
-                current_streak += 1
-            else:
-                current_streak = 1
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    session.info["flushed"] = True
 
-            max_streak = max(max_streak, current_streak)
-            prev_date = log_date
 
-        cache_set(cache_key, max_streak, timeout=300)
-        return max_streak
+@event.listens_for(Session, "after_transaction_end")
+def _clear_flushed(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("flushed", None)
 
-    @staticmethod
-    def get_streak_info(habit):
-        return {
-            "current": StreakService.calculate_current_streak(habit),
-            "longest": StreakService.calculate_longest_streak(habit),
+
+def _upsert_streaks(dialect):
+    """INSERT ... ON CONFLICT (habit_id) DO UPDATE for every streak column"""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(_streaks)
+    return statement.on_conflict_do_update(
+        index_elements=[_streaks.c.habit_id],
+        set_={
+            column.name: statement.excluded[column.name]
+            for column in _streaks.columns if column.name != "habit_id"
+        },
+    )
+
+
+@event.listens_for(HabitLog, "after_insert")
+def _apply_inserted_log(mapper, connection, target):
+    if target.completed_at is None:
+        return
+
+    state = connection.execute(
+        select(
+            _streaks.c.frequency,
+            _streaks.c.current_streak,
+            _streaks.c.longest_streak,
+            _streaks.c.last_period,
+            _streaks.c.is_stale,
+        ).where(_streaks.c.habit_id == target.habit_id)
+    ).first()
+    # Missing or stale rows are rebuilt on read, which will include this log.
+    if state is None or state.is_stale:
+        return
+
+    day = target.completed_at.date()
+    period = StreakService.period_index(state.frequency, day)
+    advanced = StreakService._advance(
+        state.current_streak, state.longest_streak, state.last_period, period
+    )
+
+    if advanced is None:
+        values = {"is_stale": True}
+    elif period == state.last_period:
+        return
+    else:
+        values = {
+            "current_streak": advanced[0],
+            "longest_streak": advanced[1],
+            "last_period": period,
+            "last_completed_on": day,
         }
+
+    connection.execute(
+        _streaks.update().where(_streaks.c.habit_id == target.habit_id).values(**values)
+    )
+
+
+@event.listens_for(HabitLog, "after_delete")
+def _invalidate_deleted_log(mapper, connection, target):
+    connection.execute(
+        _streaks.update()
+        .where(_streaks.c.habit_id == target.habit_id)
+        .values(is_stale=True)
+    )
@@ -1,101 +1,430 @@
 import json
-import pickle
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
 from functools import wraps
-from flask import current_app
+from flask import g, has_request_context, request
 from app import redis_client
+from app.utils.codec import encode, decode
+from app.utils.local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+# Tag sets outlive the entries they index so invalidation never misses one.
+TAG_SET_TTL = 2 * 86400
+INVALIDATE_BATCH_SIZE = 1000
+INVALIDATION_CHANNEL = "cache:invalidate"
+SUBSCRIBER_RETRY_SECONDS = 5
+
+# Stampede protection for cached()/user_cached().
+STALE_TTL = 60
+XFETCH_BETA = 1.0
+LOCK_TTL_SECONDS = 30
+LOCK_WAIT_SECONDS = 2
+LOCK_POLL_SECONDS = 0.05
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# L1: per-process LRU in front of Redis (L2). Configured by init_cache().
+_local = LocalCache()
+_l2_retry_seconds = 5
+_l2_down_until = 0.0
+_stats = {
+    "l1_hits": 0,
+    "l1_misses": 0,
+    "l2_hits": 0,
+    "l2_misses": 0,
+    "l2_errors": 0,
+    "stale_hits": 0,
+    "lock_waits": 0,
+}
+_subscriber = {"pid": None, "origin": None, "enabled": False}
+
+
+def init_cache(app):
+    """Bind the cache layer to the app's Redis client and configure L1"""
+    global redis_client, _l2_retry_seconds
+    from app import redis_client
+
+    _l2_retry_seconds = app.config.get("CACHE_L2_RETRY_SECONDS", 5)
+    _subscriber["enabled"] = app.config.get("CACHE_INVALIDATION_SUBSCRIBER", False)
+    _local.configure(
+        app.config.get("CACHE_L1_MAXSIZE", 1024), app.config.get("CACHE_L1_TTL", 30)
+    )
+    app.teardown_request(_flush_request_cache)
+    _ensure_subscriber()
+
+
+def cache_stats():
+    """Hit/miss counters per tier for this worker process"""
+    return dict(_stats, l1_size=len(_local), l2_available=_l2_available())
+
+
+def get_redis():
+    """The shared Redis client, or None while Redis is marked unavailable"""
+    return redis_client if _l2_available() else None
+
+
+def report_redis_error(exc):
+    """Open the circuit breaker after a failed Redis call made via get_redis()"""
+    _l2_failed(exc)
+
+
+def _l2_available():
+    return time.monotonic() >= _l2_down_until
+
+
+def _l2_failed(exc):
+    """Skip Redis for a short while instead of paying a failed connect per call"""
+    global _l2_down_until
+    _stats["l2_errors"] += 1
+    if _l2_available():
+        logger.warning("Redis unavailable, serving from local cache only: %s", exc)
+    _l2_down_until = time.monotonic() + _l2_retry_seconds
+
+
+def _origin():
+    _ensure_subscriber()
+    return _subscriber["origin"]
+
+
+def _ensure_subscriber():
+    """Start this process's invalidation listener (once per pid, so after fork too).
+
+    Only web workers listen (CACHE_INVALIDATION_SUBSCRIBER); other processes
+    still publish their invalidations.
+    """
+    pid = os.getpid()
+    if _subscriber["pid"] == pid:
+        return
+    _subscriber["pid"] = pid
+    _subscriber["origin"] = uuid.uuid4().hex
+    if _local.enabled and _subscriber["enabled"]:
+        threading.Thread(target=_listen, name="cache-invalidation", daemon=True).start()
+
+
+def _listen():
+    lost = False
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            if lost:
+                # Invalidations published while disconnected were missed. L1
+                # keeps serving until then, so Redis outages degrade to L1 only.
+                _local.clear()
+                lost = False
+            for message in pubsub.listen():
+                _apply_invalidation(json.loads(message["data"]))
+        except Exception:
+            lost = True
+            time.sleep(SUBSCRIBER_RETRY_SECONDS)
 
 
-def cached(timeout=300, key_prefix="default"):
-    """Decorator to cache function results in Redis"""
+def _apply_invalidation(data):
+    """Drop what another worker invalidated from this worker's L1"""
+    if data.get("origin") == _subscriber["origin"]:
+        return
+    _local.invalidate_tags(*data.get("tags", ()))
+    _local.delete(*data.get("keys", ()))
 
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            cache_key = f"{key_prefix}:{f.__name__}:{str(args)}:{str(kwargs)}"
 
-            try:
-                cached_value = redis_client.get(cache_key)
-                if cached_value:
-                    return pickle.loads(cached_value)
-            except Exception:
-                pass
+def _publish_invalidation(tags=(), keys=()):
+    if not _local.enabled:
+        return
+    redis_client.publish(
+        INVALIDATION_CHANNEL,
+        json.dumps({"origin": _origin(), "tags": list(tags), "keys": list(keys)}),
+    )
 
-            result = f(*args, **kwargs)
 
-            try:
-                redis_client.setex(cache_key, timeout, pickle.dumps(result))
-            except Exception:
-                pass
+def _tag_key(tag):
+    return f"cache:tag:{tag}"
 
-            return result
 
-        return decorated_function
+def _pack(value, timeout, delta=0.0):
+    """Entry payload: the value, its recompute time and its logical expiry"""
+    return encode([value, delta, time.time() + timeout])
 
-    return decorator
 
+def _fresh(entry):
+    return entry is not None and entry[2] > time.time()
 
-def user_cached(timeout=300, key_prefix="user"):
-    """Decorator to cache function results per user"""
 
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(user_id, *args, **kwargs):
-            cache_key = f"{key_prefix}:{user_id}:{f.__name__}:{str(args)}:{str(kwargs)}"
+def _load(key, tags=()):
+    """Return the (value, delta, expires) entry from L1, then L2, or None.
 
-            try:
-                cached_value = redis_client.get(cache_key)
-                if cached_value:
-                    return pickle.loads(cached_value)
-            except Exception:
-                pass
+    L2 hits are copied into L1. Entries past their logical expiry are still
+    returned (the stale grace window) so callers can decide to serve them.
+    """
+    if _local.enabled:
+        payload = _local.get(key)
+        if payload is not None:
+            entry = decode(payload)
+            if _fresh(entry):
+                _stats["l1_hits"] += 1
+                return entry
+        _stats["l1_misses"] += 1
+
+    if not _l2_available():
+        return None
+    try:
+        payload = redis_client.get(key)
+    except Exception as e:
+        _l2_failed(e)
+        return None
+    if not payload:
+        _stats["l2_misses"] += 1
+        return None
+
+    _stats["l2_hits"] += 1
+    entry = decode(payload)
+    if _fresh(entry):
+        _local.set(key, payload, ttl=entry[2] - time.time(), tags=tags)
+    return entry
+
+
+def _store(key, value, timeout, tags=(), delta=0.0, stale_ttl=0):
+    """Write both tiers; SETEX and tag bookkeeping share one Redis pipeline.
+
+    Redis keeps the entry stale_ttl seconds past its logical expiry so it can
+    be served while one worker recomputes it.
+    """
+    payload = _pack(value, timeout, delta)
+    _local.set(key, payload, ttl=timeout, tags=tags)
+
+    if not _l2_available():
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(key, timeout + stale_ttl, payload)
+        for tag in tags:
+            pipe.sadd(_tag_key(tag), key)
+            pipe.expire(_tag_key(tag), max(timeout + stale_ttl, TAG_SET_TTL))
+        pipe.execute()
+    except Exception as e:
+        _l2_failed(e)
 
-            result = f(user_id, *args, **kwargs)
 
-            try:
-                redis_client.setex(cache_key, timeout, pickle.dumps(result))
-            except Exception:
-                pass
+def _should_refresh(entry, beta=XFETCH_BETA, now=None, rand=None):
+    """XFetch: recompute early with a probability that rises towards expiry.
 
-            return result
+    Slow computations (large delta) start refreshing sooner, so one caller
+    usually rebuilds the entry before it expires for everyone.
+    """
+    _, delta, expires = entry
+    now = time.time() if now is None else now
+    rand = random.random() if rand is None else rand
+    return now - delta * beta * math.log(rand or 1e-12) >= expires
 
-        return decorated_function
 
-    return decorator
+def _lock_key(key):
+    return f"cache:lock:{key}"
 
 
-def delete_cache(pattern="*"):
-    """Delete all keys matching pattern"""
+def _acquire_lock(key):
+    """Single-flight: SET NX a short-lived lock; returns its token or None"""
+    if not _l2_available():
+        return None
+    token = uuid.uuid4().hex
     try:
-        for key in redis_client.scan_iter(match=pattern):
-            redis_client.delete(key)
+        if redis_client.set(_lock_key(key), token, nx=True, ex=LOCK_TTL_SECONDS):
+            return token
+    except Exception as e:
+        _l2_failed(e)
+    return None
+
+
+def _release_lock(key, token):
+    try:
+        redis_client.eval(_RELEASE_LOCK, 1, _lock_key(key), token)
     except Exception:
+        # The lock expires on its own after LOCK_TTL_SECONDS.
         pass
 
 
-def delete_user_cache(user_id, key_prefix="user"):
-    """Delete all cached data for a user"""
+def _wait_for_entry(key, tags):
+    """Poll for the lock holder's result instead of recomputing alongside it"""
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = _load(key, tags)
+        if _fresh(entry):
+            return entry
+    return None
+
+
+def _compute(cache_key, tags, timeout, stale_ttl, f, args, kwargs):
+    started = time.monotonic()
+    result = f(*args, **kwargs)
     try:
-        pattern = f"{key_prefix}:{user_id}:*"
-        for key in redis_client.scan_iter(match=pattern):
-            redis_client.delete(key)
+        _store(cache_key, result, timeout, tags, time.monotonic() - started, stale_ttl)
     except Exception:
         pass
+    return result
+
+
+def _cached_call(cache_key, tags, timeout, stale_ttl, f, args, kwargs):
+    try:
+        entry = _load(cache_key, tags)
+    except Exception:
+        # Undecodable or stale payloads are recomputed and overwritten.
+        entry = None
+
+    if _fresh(entry) and not _should_refresh(entry):
+        return entry[0]
+
+    if not _l2_available():
+        return _compute(cache_key, tags, timeout, stale_ttl, f, args, kwargs)
+
+    token = _acquire_lock(cache_key)
+    if token is None:
+        # Someone else is recomputing: serve what we have, else wait for it.
+        if entry is not None:
+            _stats["stale_hits"] += 1
+            return entry[0]
+        _stats["lock_waits"] += 1
+        entry = _wait_for_entry(cache_key, tags)
+        if entry is not None:
+            return entry[0]
+        return _compute(cache_key, tags, timeout, stale_ttl, f, args, kwargs)
+
+    try:
+        return _compute(cache_key, tags, timeout, stale_ttl, f, args, kwargs)
+    finally:
+        _release_lock(cache_key, token)
+
+
+def _vary_key(query_args, per_user):
+    """Key suffix for the request values a view-level cache entry depends on"""
+    parts = []
+    if query_args:
+        args = request.args if has_request_context() else {}
+        parts.append("&".join(f"{name}={args.get(name, '')}" for name in query_args))
+    if per_user:
+        parts.append(f"user={_current_user_id()}")
+    return "".join(f":{part}" for part in parts)
+
+
+def _current_user_id():
+    from flask_login import current_user
+
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return "anonymous"
+
+
+def cached(
+    timeout=300,
+    key_prefix="default",
+    tags=(),
+    stale_ttl=STALE_TTL,
+    query_args=(),
+    per_user=False,
+):
+    """Decorator to cache function results, tagged with key_prefix and tags.
+
+    Only one worker recomputes an expired entry; the others keep serving the
+    previous value for up to stale_ttl seconds.
+
+    Views and fragments that read the request must declare what they vary on:
+    query_args names request.args values to add to the key, and per_user adds
+    the logged-in user's id (and a "<key_prefix>:<user_id>" tag, so
+    delete_user_cache(user_id, key_prefix) drops the entry).
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache_key = (
+                f"{key_prefix}:{f.__name__}:{str(args)}:{str(kwargs)}"
+                f"{_vary_key(query_args, per_user)}"
+            )
+            entry_tags = (key_prefix, *tags)
+            if per_user:
+                entry_tags += (f"{key_prefix}:{_current_user_id()}",)
+            return _cached_call(
+                cache_key, entry_tags, timeout, stale_ttl, f, args, kwargs
+            )
+
+        return decorated_function
+
+    return decorator
+
+
+def user_cached(timeout=300, key_prefix="user", tags=(), stale_ttl=STALE_TTL):
+    """Decorator to cache function results per user.
+
+    Entries are tagged "<prefix>:<user_id>" for key_prefix and every extra tag,
+    so delete_user_cache(user_id, prefix) drops them. Stampede protection is
+    the same as for cached().
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(user_id, *args, **kwargs):
+            cache_key = f"{key_prefix}:{user_id}:{f.__name__}:{str(args)}:{str(kwargs)}"
+            entry_tags = [f"{tag}:{user_id}" for tag in (key_prefix, *tags)]
+            return _cached_call(
+                cache_key, entry_tags, timeout, stale_ttl, f, (user_id, *args), kwargs
+            )
+
+        return decorated_function
+
+    return decorator
+
 
+def invalidate_tags(*tags):
+    """Delete every entry recorded under any of tags, in every worker"""
+    if not tags:
+        return
+    _local.invalidate_tags(*tags)
 
-def cache_set(key, value, timeout=300):
+    if not _l2_available():
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.smembers(_tag_key(tag))
+        keys = set().union(*pipe.execute())
+        keys.update(_tag_key(tag) for tag in tags)
+
+        keys = list(keys)
+        for i in range(0, len(keys), INVALIDATE_BATCH_SIZE):
+            pipe.delete(*keys[i:i + INVALIDATE_BATCH_SIZE])
+        pipe.execute()
+        _publish_invalidation(tags=tags)
+    except Exception as e:
+        _l2_failed(e)
+
+
+def delete_user_cache(user_id, *key_prefixes):
+    """Delete all cached data for a user under the given prefixes (default "user")"""
+    invalidate_tags(*(f"{prefix}:{user_id}" for prefix in key_prefixes or ("user",)))
+
+
+def cache_set(key, value, timeout=300, tags=()):
     """Set a value in cache"""
     try:
-        redis_client.setex(key, timeout, pickle.dumps(value))
+        _store(key, value, timeout, tags)
     except Exception:
         pass
 
 
-def cache_get(key, default=None):
-    """Get a value from cache"""
+def cache_get(key, default=None, tags=()):
+    """Get a value from cache; tags are recorded if the value is copied into L1"""
     try:
-        value = redis_client.get(key)
-        if value:
-            return pickle.loads(value)
+        entry = _load(key, tags)
+        if _fresh(entry):
+            return entry[0]
     except Exception:
         pass
     return default
@@ -103,15 +432,143 @@ def cache_get(key, default=None):
 
 def cache_delete(key):
     """Delete a specific key from cache"""
+    _local.delete(key)
+    if not _l2_available():
+        return
     try:
         redis_client.delete(key)
-    except Exception:
-        pass
+        _publish_invalidation(keys=(key,))
+    except Exception as e:
+        _l2_failed(e)
+
+
+class RequestCache:
+    """Request-scoped memo of Redis reads plus a deferred write pipeline.
+
+    fetch() resolves every command it has not seen yet in one pipeline;
+    defer() queues writes that are flushed together at request teardown.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.writes = []
+
+    @staticmethod
+    def current():
+        if not has_request_context():
+            return RequestCache()
+        if "redis_request_cache" not in g:
+            g.redis_request_cache = RequestCache()
+        return g.redis_request_cache
+
+    def fetch(self, commands):
+        """Run (method, key, *args) read commands; results come back in order"""
+        commands = [tuple(command) for command in commands]
+        missing = list(dict.fromkeys(c for c in commands if c not in self.values))
+        if missing:
+            if not _l2_available():
+                raise ConnectionError("Redis unavailable")
+            pipe = redis_client.pipeline(transaction=False)
+            for method, *args in missing:
+                getattr(pipe, method)(*args)
+            try:
+                results = pipe.execute()
+            except Exception as e:
+                _l2_failed(e)
+                raise
+            self.values.update(zip(missing, results))
+        return [self.values[command] for command in commands]
+
+    def defer(self, method, key, *args):
+        self.writes.append((method, key, *args))
+        if method == "setex":
+            self.values[("get", key)] = str(args[-1]).encode()
+
+    def forget(self, *keys):
+        """Drop memoized reads of keys written outside this cache"""
+        keys = set(keys)
+        self.values = {c: v for c, v in self.values.items() if c[1] not in keys}
+
+    def flush(self):
+        writes, self.writes = self.writes, []
+        if not writes or not _l2_available():
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for method, *args in writes:
+                getattr(pipe, method)(*args)
+            pipe.execute()
+        except Exception as e:
+            _l2_failed(e)
+
+
+def _flush_request_cache(exc=None):
+    request_cache = g.pop("redis_request_cache", None)
+    if request_cache is not None:
+        request_cache.flush()
+
+
+def _deferred_write(method, key, *args):
+    """Queue a write for request teardown, or run it now outside a request"""
+    request_cache = RequestCache.current()
+    request_cache.defer(method, key, *args)
+    if not has_request_context():
+        request_cache.flush()
+
+
+# Write-behind queues
+
+# Moves a batch from the queue to the processing list atomically, so a
+# flusher that dies mid-batch leaves it to be retried instead of lost.
+CLAIM_BATCH = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
 
 
 # Like/Comment fast operations using Redis
 
 
+LIKE_QUEUE_KEY = "community:likes:queue"
+# Like sets are only trusted once warmed from the database (KEYS[3]).
+_TOGGLE_LIKE = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return nil
+end
+local liked = 1
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SREM', KEYS[1], ARGV[1])
+    liked = 0
+else
+    redis.call('SADD', KEYS[1], ARGV[1])
+end
+redis.call('RPUSH', KEYS[2], cjson.encode({post = ARGV[2], user = ARGV[1], liked = liked}))
+return {liked, redis.call('SCARD', KEYS[1])}
+"""
+# Loads a post's likers once; a set that is already warm may have newer
+# toggles than the database and is left alone.
+_WARM_LIKES = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+for i = 1, #ARGV, 5000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 4999, #ARGV)))
+end
+redis.call('SET', KEYS[2], 1)
+return 1
+"""
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCR', KEYS[1])
+end
+return nil
+"""
+
+
 class LikeCache:
     """Ultra-fast like operations using Redis"""
 
@@ -120,72 +577,104 @@ class LikeCache:
         return f"post:{post_id}:likes"
 
     @staticmethod
-    def get_user_like_key(user_id, post_id):
-        return f"user:{user_id}:liked:{post_id}"
+    def get_warm_key(post_id):
+        return f"post:{post_id}:likes:warm"
 
     @staticmethod
-    def is_liked(user_id, post_id):
-        """Check if user liked post - O(1) operation"""
+    def warm_post_ids(post_ids):
+        """Subset of post_ids whose like sets have been loaded from the database"""
+        post_ids = list(post_ids)
         try:
-            return redis_client.sismember(LikeCache.get_like_key(post_id), str(user_id))
+            results = RequestCache.current().fetch(
+                ("exists", LikeCache.get_warm_key(post_id)) for post_id in post_ids
+            )
         except Exception:
-            return False
+            return set()
+        return {post_id for post_id, warm in zip(post_ids, results) if warm}
 
     @staticmethod
-    def like(user_id, post_id):
-        """Add like - O(1) operation"""
+    def warm(likers_by_post):
+        """Load {post_id: [user_id, ...]} into cold like sets in one pipeline"""
+        if not likers_by_post:
+            return True
+        client = get_redis()
+        if client is None:
+            return False
         try:
-            redis_client.sadd(LikeCache.get_like_key(post_id), str(user_id))
-            redis_client.setex(
-                LikeCache.get_user_like_key(user_id, post_id), 86400, "1"
-            )
-        except Exception:
-            pass
+            pipe = client.pipeline(transaction=False)
+            for post_id, user_ids in likers_by_post.items():
+                pipe.eval(
+                    _WARM_LIKES, 2,
+                    LikeCache.get_like_key(post_id), LikeCache.get_warm_key(post_id),
+                    *(str(user_id) for user_id in user_ids),
+                )
+            pipe.execute()
+        except Exception as e:
+            _l2_failed(e)
+            return False
+        request_cache = RequestCache.current()
+        for post_id in likers_by_post:
+            request_cache.forget(LikeCache.get_like_key(post_id), LikeCache.get_warm_key(post_id))
+        return True
 
     @staticmethod
-    def unlike(user_id, post_id):
-        """Remove like - O(1) operation"""
-        try:
-            redis_client.srem(LikeCache.get_like_key(post_id), str(user_id))
-            redis_client.delete(LikeCache.get_user_like_key(user_id, post_id))
-        except Exception:
-            pass
+    def is_liked(user_id, post_id):
+        """Check if user liked post - O(1) operation"""
+        return post_id in LikeCache.are_liked(user_id, [post_id])
 
     @staticmethod
-    def get_count(post_id):
-        """Get like count - O(1) operation"""
+    def are_liked(user_id, post_ids):
+        """Set of post_ids the user liked, in one pipelined round-trip"""
+        post_ids = list(post_ids)
         try:
-            return redis_client.scard(LikeCache.get_like_key(post_id))
+            results = RequestCache.current().fetch(
+                ("sismember", LikeCache.get_like_key(post_id), str(user_id))
+                for post_id in post_ids
+            )
         except Exception:
-            return 0
+            return set()
+        return {post_id for post_id, liked in zip(post_ids, results) if liked}
 
     @staticmethod
-    def set_count(post_id, count):
-        """Set initial like count from DB"""
+    def toggle(user_id, post_id):
+        """Flip the like and queue it for the database in one atomic script.
+
+        Returns (liked, count), or None if the post's like set has not been
+        warmed yet. Raises if Redis is unavailable.
+        """
+        client = get_redis()
+        if client is None:
+            raise ConnectionError("Redis unavailable")
         try:
-            redis_client.setex(f"post:{post_id}:like_count", 3600, str(count))
-        except Exception:
-            pass
+            result = client.eval(
+                _TOGGLE_LIKE, 3,
+                LikeCache.get_like_key(post_id), LIKE_QUEUE_KEY, LikeCache.get_warm_key(post_id),
+                str(user_id), str(post_id),
+            )
+        except Exception as e:
+            _l2_failed(e)
+            raise
+        RequestCache.current().forget(LikeCache.get_like_key(post_id))
+        if result is None:
+            return None
+        return bool(result[0]), result[1]
 
     @staticmethod
-    def increment_count(post_id):
-        """Increment like count"""
-        try:
-            key = f"post:{post_id}:like_count"
-            if redis_client.exists(key):
-                redis_client.incr(key)
-        except Exception:
-            pass
+    def get_count(post_id):
+        """Get like count - O(1) operation"""
+        return LikeCache.get_counts([post_id]).get(post_id, 0)
 
     @staticmethod
-    def decrement_count(post_id):
-        """Decrement like count"""
+    def get_counts(post_ids):
+        """{post_id: like count} for many posts in one pipelined round-trip"""
+        post_ids = list(post_ids)
         try:
-            key = f"post:{post_id}:like_count"
-            if redis_client.exists(key):
-                redis_client.decr(key)
+            results = RequestCache.current().fetch(
+                ("scard", LikeCache.get_like_key(post_id)) for post_id in post_ids
+            )
         except Exception:
-            pass
+            return {post_id: 0 for post_id in post_ids}
+        return dict(zip(post_ids, results))
 
 
 class CommentCache:
@@ -197,25 +686,43 @@ class CommentCache:
 
     @staticmethod
     def increment(post_id):
-        """Increment comment count"""
+        """Increment comment count if it is cached; a cold key is filled on read"""
         try:
-            redis_client.incr(CommentCache.get_key(post_id))
+            redis_client.eval(_INCR_IF_EXISTS, 1, CommentCache.get_key(post_id))
+            RequestCache.current().forget(CommentCache.get_key(post_id))
         except Exception:
             pass
 
     @staticmethod
     def get_count(post_id):
         """Get cached comment count"""
+        return CommentCache.get_counts([post_id]).get(post_id)
+
+    @staticmethod
+    def get_counts(post_ids):
+        """{post_id: cached comment count or None} in one pipelined round-trip"""
+        post_ids = list(post_ids)
         try:
-            count = redis_client.get(CommentCache.get_key(post_id))
-            return int(count) if count else None
+            results = RequestCache.current().fetch(
+                ("get", CommentCache.get_key(post_id)) for post_id in post_ids
+            )
         except Exception:
-            return None
+            return {post_id: None for post_id in post_ids}
+        return {
+            post_id: int(count) if count else None
+            for post_id, count in zip(post_ids, results)
+        }
 
     @staticmethod
     def set_count(post_id, count):
         """Set comment count from DB"""
-        try:
-            redis_client.setex(CommentCache.get_key(post_id), 3600, str(count))
-        except Exception:
-            pass
+        _deferred_write("setex", CommentCache.get_key(post_id), 3600, str(count))
+
+    @staticmethod
+    def set_counts(counts):
+        """Set {post_id: count} from DB in one pipeline"""
+        request_cache = RequestCache.current()
+        for post_id, count in counts.items():
+            request_cache.defer("setex", CommentCache.get_key(post_id), 3600, str(count))
+        if not has_request_context():
+            request_cache.flush()
@@ -0,0 +1,104 @@
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+
+# Bump to invalidate every cached payload at once.
+CODEC_VERSION = 2
+
+_serializers = {}
+_serializers_by_name = {}
+
+
+class StaleCacheEntry(ValueError):
+    """Payload was written by a different codec or serializer version."""
+
+
+class Record(SimpleNamespace):
+    """Detached stand-in for a cached model instance.
+
+    Only the registered fields are available; relationships that were not
+    registered as fields do not exist on a record.
+    """
+
+
+def register_serializer(cls, fields, version=1, name=None):
+    """Cache ``cls`` instances as ``fields`` only, tagged with ``version``."""
+    name = name or cls.__name__
+    _serializers[cls] = (name, version, tuple(fields))
+    _serializers_by_name[name] = (version, tuple(fields))
+
+
+def _serializer_for(value):
+    for cls in type(value).__mro__:
+        if cls in _serializers:
+            return _serializers[cls]
+    return None
+
+
+def _dump(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) and not key.startswith('$') for key in value):
+            raise TypeError('Cached dict keys must be strings not starting with "$"')
+        return {key: _dump(item) for key, item in value.items()}
+
+    serializer = _serializer_for(value)
+    if serializer is None:
+        raise TypeError(f'No cache serializer registered for {type(value).__name__}')
+    name, version, fields = serializer
+    return {'$m': [name, version, [_dump(getattr(value, field)) for field in fields]]}
+
+
+def _load(value):
+    if isinstance(value, list):
+        return [_load(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        tag, payload = next(iter(value.items()))
+        if tag == '$dt':
+            return datetime.fromisoformat(payload)
+        if tag == '$d':
+            return date.fromisoformat(payload)
+        if tag == '$m':
+            name, version, values = payload
+            registered = _serializers_by_name.get(name)
+            if registered is None or registered[0] != version:
+                raise StaleCacheEntry(f'{name} v{version} is no longer current')
+            return Record(**dict(zip(registered[1], (_load(item) for item in values))))
+    return {key: _load(item) for key, item in value.items()}
+
+
+def encode(value):
+    """Serialize ``value`` to compact JSON bytes; raises TypeError for unregistered types."""
+    return json.dumps({'v': CODEC_VERSION, 'd': _dump(value)}, separators=(',', ':')).encode('utf-8')
+
+
+def decode(payload):
+    """Inverse of :func:`encode`; raises StaleCacheEntry for outdated payloads."""
+    try:
+        envelope = json.loads(payload)
+    except (TypeError, ValueError):
+        raise StaleCacheEntry('Payload is not a codec envelope')
+    if not isinstance(envelope, dict) or envelope.get('v') != CODEC_VERSION:
+        raise StaleCacheEntry('Codec version mismatch')
+    return _load(envelope['d'])
+
+
+def _register_builtin_serializers():
+    from flask_sqlalchemy.pagination import Pagination
+
+    register_serializer(Pagination, fields=(
+        'items', 'page', 'per_page', 'total', 'pages',
+        'has_prev', 'has_next', 'prev_num', 'next_num',
+    ))
+
+
+_register_builtin_serializers()
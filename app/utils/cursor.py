@@ -0,0 +1,20 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for a row's (created_at, id) position"""
+    raw = json.dumps([row.created_at.isoformat(), row.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, kind='cursor'):
+    """(created_at, id) for a cursor; raises ValueError naming ``kind`` if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid {kind}') from e
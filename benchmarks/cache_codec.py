@@ -0,0 +1,71 @@
+"""Compare pickled ORM cache payloads with the typed cache codec.
+
+Run from the repository root:
+
+    python benchmarks/cache_codec.py [--habits 50] [--posts 20] [--rounds 2000]
+"""
+import argparse
+import os
+import pickle
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, Habit, CommunityPost
+from app.utils.codec import encode, decode
+
+
+def seed(habit_count, post_count):
+    user = User(email='bench@example.com', username='bench', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    for i in range(habit_count):
+        db.session.add(Habit(user_id=user.id, name=f'Habit {i}',
+                             description='Benchmark habit ' * 4, frequency='daily'))
+    for i in range(post_count):
+        db.session.add(CommunityPost(user_id=user.id, content='Keep going! ' * 10,
+                                     created_at=datetime.now(timezone.utc)))
+    db.session.commit()
+    return user
+
+
+def measure(label, value, rounds):
+    for name, dumps, loads in (('pickle', pickle.dumps, pickle.loads), ('codec', encode, decode)):
+        try:
+            payload = dumps(value)
+        except Exception as e:
+            print(f'{label:<18} {name:<7} fails: {type(e).__name__}')
+            continue
+        enc = timeit.timeit(lambda: dumps(value), number=rounds) / rounds * 1e6
+        dec = timeit.timeit(lambda: loads(payload), number=rounds) / rounds * 1e6
+        print(f'{label:<18} {name:<7} {len(payload):>9} B {enc:>10.1f} us {dec:>10.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--habits', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = seed(args.habits, args.posts)
+
+        habits = Habit.query.filter_by(user_id=user.id).all()
+        page = CommunityPost.query.order_by(CommunityPost.created_at.desc()).paginate(
+            page=1, per_page=args.posts, error_out=False)
+        for post in page.items:
+            post.user  # load the author, as the feed template does
+
+        print(f'{"payload":<18} {"format":<7} {"size":>11} {"encode":>13} {"decode":>13}')
+        measure(f'{args.habits} habits', habits, args.rounds)
+        measure(f'{args.posts}-post page', page, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
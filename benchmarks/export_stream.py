@@ -0,0 +1,137 @@
+"""Peak RSS and time to first byte of the habit log CSV export.
+
+Compares the previous ORM + StringIO export, which built the whole file
+before responding, with the streaming export. Each mode runs in its own
+process so ru_maxrss is not shared between them. The database is seeded
+once and reused on later runs.
+
+Run from the repository root:
+
+    python benchmarks/export_stream.py [--rows 1000000] [--db /tmp/export_bench.db]
+"""
+import argparse
+import csv
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ('legacy', 'stream')
+
+
+def legacy_export(user_id):
+    """The export as it was before streaming: every row as an ORM object"""
+    from app.models import HabitLog
+
+    logs = HabitLog.query.filter_by(user_id=user_id)\
+        .order_by(HabitLog.completed_at.desc()).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['ID', 'Habit ID', 'Completed At', 'Streak Count', 'Notes'])
+    for log in logs:
+        writer.writerow([
+            log.id,
+            log.habit_id,
+            log.completed_at.isoformat() if log.completed_at else '',
+            log.streak_count,
+            log.notes or ''
+        ])
+    yield output.getvalue()
+
+
+def seed(rows):
+    from app import db
+    from app.models import User, Habit, HabitLog
+
+    user = User.query.filter_by(username='bench').first()
+    if user is not None:
+        return user.id
+    user = User(email='bench@example.com', username='bench', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    habit = Habit(user_id=user.id, name='Benchmark', frequency='daily')
+    db.session.add(habit)
+    db.session.flush()
+
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'id': str(uuid.uuid4()), 'habit_id': habit.id, 'user_id': user.id,
+            'completed_at': start + timedelta(minutes=i), 'streak_count': i % 365,
+            'notes': 'Felt good today' if i % 3 == 0 else None, 'created_at': start,
+        })
+        if len(batch) == 10000:
+            db.session.execute(HabitLog.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(HabitLog.__table__.insert(), batch)
+    db.session.commit()
+    return user.id
+
+
+def run(mode):
+    """Export in this process and print one result line"""
+    from app import create_app
+    from app.models import User
+    from app.services.export_service import ExportService
+
+    app = create_app('development')
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench').first().id
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        chunks = legacy_export(user_id) if mode == 'legacy' else ExportService.iter_habit_logs_csv(user_id)
+        started = time.perf_counter()
+        first_byte = None
+        size = 0
+        for chunk in chunks:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+        total = time.perf_counter() - started
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{mode:<8} {first_byte * 1000:>10.1f} ms {total:>9.2f} s '
+          f'{peak / 1024:>9.1f} MB {(peak - baseline) / 1024:>9.1f} MB {size / 1e6:>8.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--db', default=os.path.join('/tmp', 'export_bench.db'))
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Set before the app is imported so the config picks it up.
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    if args.mode:
+        run(args.mode)
+        return
+
+    from app import create_app, db
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed(args.rows)
+        print(f'seeded in {time.perf_counter() - started:.1f} s ({args.db})\n')
+
+    print(f'{"mode":<8} {"first byte":>13} {"total":>11} {"peak RSS":>12} {"export RSS":>12} {"size":>11}')
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--db', args.db, '--mode', mode],
+            check=True, cwd=ROOT,
+        )
+
+
+if __name__ == '__main__':
+    main()
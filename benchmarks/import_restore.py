@@ -0,0 +1,86 @@
+"""Time restoring a large JSON export into an empty account.
+
+Writes a synthetic user_data.json with --rows daily habit logs spread over
+--habits habits to a temporary directory, then imports it into a fresh SQLite database with ImportService
+and reports wall time, rows per second and peak RSS.
+
+Run from the repository root:
+
+    python benchmarks/import_restore.py [--rows 1000000] [--habits 20]
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_export(path, rows, habit_count):
+    habit_ids = [str(uuid.uuid4()) for _ in range(habit_count)]
+    start = datetime(2015, 1, 1, 7, 0)
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write('{\n  "exported_at": "2024-01-01T00:00:00",\n  "user_id": "bench",\n  "habits": [')
+        fp.write(','.join(
+            '\n    ' + json.dumps({
+                'id': habit_id, 'name': f'Habit {i}', 'description': None, 'frequency': 'daily',
+                'category': None, 'is_active': True, 'created_at': start.isoformat(),
+            }) for i, habit_id in enumerate(habit_ids)
+        ))
+        fp.write('\n  ],\n  "habit_logs": [')
+        for i in range(rows):
+            log = {
+                'id': str(uuid.uuid4()), 'habit_id': habit_ids[i % habit_count],
+                'completed_at': (start + timedelta(days=i // habit_count)).isoformat(),
+                'streak_count': i // habit_count, 'notes': 'Felt good' if i % 5 == 0 else None,
+            }
+            fp.write((',' if i else '') + '\n    ' + json.dumps(log))
+        fp.write('\n  ],\n  "relapses": [],\n  "journal_entries": [],\n  "mood_entries": [],\n'
+                 '  "triggers": [],\n  "achievements": [],\n  "prevention_plans": [],\n'
+                 '  "partnerships": [],\n  "shared_goals": []\n}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--habits', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='import_bench_') as workdir:
+        export_path = os.path.join(workdir, 'user_data.json')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+        from app import create_app, db
+        from app.models import User
+        from app.services.import_service import ImportService
+
+        started = time.perf_counter()
+        write_export(export_path, args.rows, args.habits)
+        print(f'wrote {os.path.getsize(export_path) / 1e6:.1f} MB export in {time.perf_counter() - started:.1f} s')
+
+        app = create_app('development')
+        with app.app_context():
+            db.create_all()
+            user = User(email='bench@example.com', username='bench', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+
+            baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            started = time.perf_counter()
+            with open(export_path, encoding='utf-8') as fp:
+                report = ImportService.import_json(user.id, fp)
+            elapsed = time.perf_counter() - started
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            db.session.remove()
+
+    print(f"imported {report['imported']} with {report['error_count']} errors")
+    print(f'{elapsed:.1f} s total, {args.rows / elapsed:,.0f} logs/s, '
+          f'peak RSS {peak / 1024:.0f} MB (+{(peak - baseline) / 1024:.0f} MB during import)')
+
+if __name__ == '__main__':
+    main()
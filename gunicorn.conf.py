@@ -9,11 +9,20 @@ bind = f"0.0.0.0:{port}"
 backlog = 2048
 
 # Worker processes
+# Threaded workers: the notification and chat event streams each hold a
+# thread for up to STREAM_SECONDS, so a sync worker per stream would starve
+# the site. The arbiter's timeout only watches a worker's main loop, so long
+# streams on a request thread don't get the worker killed.
 workers = 4
-worker_class = "sync"  # Use sync worker to avoid gevent warnings
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
 timeout = 60
 keepalive = 5
 
+# Each worker keeps an in-process L1 cache and listens on Redis pub/sub for
+# the other workers' invalidations (see app/utils/cache.py).
+raw_env = ["CACHE_INVALIDATION_SUBSCRIBER=1"]
+
 # Logging
 accesslog = "-"
 errorlog = "-"
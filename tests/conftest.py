@@ -67,3 +67,28 @@ def test_habit(app, test_user):
         frequency='daily'
     )
     return habit
+
+
+@pytest.fixture
+def redis_server(app, monkeypatch):
+    """An in-process Redis (fakeredis, with Lua scripting) behind the cache layer."""
+    fakeredis = pytest.importorskip('fakeredis')
+    from app.utils import cache
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, 'redis_client', client)
+    monkeypatch.setattr(cache, '_l2_down_until', 0.0)
+    return client
+
+
+@pytest.fixture
+def query_counter(app):
+    """Statements executed against the database while the test runs."""
+    from sqlalchemy import event
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
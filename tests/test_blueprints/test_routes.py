@@ -1,3 +1,5 @@
+import re
+from datetime import datetime, timedelta
 import pytest
 
 
@@ -102,6 +104,204 @@ class TestDashboardBlueprint:
         assert b'Dashboard' in response.data
 
 
+class TestCalendarBlueprint:
+    
+    def test_calendar_marks_completed_days(self, app, authenticated_client, test_habit):
+        from datetime import datetime
+        from app import db
+        from app.models import HabitLog
+        for day in (3, 17):
+            db.session.add(HabitLog(habit_id=test_habit.id, user_id=test_habit.user_id,
+                                    completed_at=datetime(2024, 2, day, 9)))
+        db.session.commit()
+        
+        response = authenticated_client.get('/calendar/?year=2024&month=2')
+        assert response.status_code == 200
+        assert b'February 2024' in response.data
+        assert response.data.count('\u25cf'.encode()) == 2
+        
+        assert authenticated_client.get('/calendar/?year=2024&month=13').status_code == 404
+
+
+class TestLeaderboardBlueprint:
+    
+    def test_leaderboard_shows_viewer_rank(self, authenticated_client, test_habit):
+        authenticated_client.post(f'/habits/{test_habit.id}/complete')
+        
+        response = authenticated_client.get('/leaderboard/?timeframe=week')
+        assert response.status_code == 200
+        assert b'Your Rankings' in response.data
+    
+    def test_unknown_timeframe_redirects(self, authenticated_client):
+        response = authenticated_client.get('/leaderboard/?timeframe=decade')
+        assert response.status_code == 302
+        assert 'timeframe=all' in response.headers['Location']
+
+
+class TestCommunityBlueprint:
+    
+    def test_feed_loads_more_with_cursor(self, app, authenticated_client, test_user):
+        from app import db
+        from app.models.social import CommunityPost
+        for i in range(25):
+            db.session.add(CommunityPost(user_id=test_user.id, content=f'Keep going {i}'))
+        db.session.commit()
+        
+        response = authenticated_client.get('/community/')
+        assert response.status_code == 200
+        assert b'Load more' in response.data
+        
+        cursor = response.data.split(b'cursor=')[1].split(b'"')[0].decode()
+        more = authenticated_client.get(f'/community/?cursor={cursor}', headers={'HX-Request': 'true'})
+        assert more.status_code == 200
+        assert more.data.count(b'class="card mb-3"') == 5
+        assert b'Load more' not in more.data
+    
+    def test_bad_cursor_is_rejected(self, authenticated_client):
+        response = authenticated_client.get('/community/?cursor=%%%')
+        assert response.status_code == 400
+    
+    def test_post_comments_load_more_with_cursor(self, app, authenticated_client, test_user):
+        from app import db
+        from app.models.social import CommunityPost, CommunityComment
+        post = CommunityPost(user_id=test_user.id, content='Day one')
+        db.session.add(post)
+        db.session.flush()
+        for i in range(55):
+            db.session.add(CommunityComment(post_id=post.id, user_id=test_user.id, content=f'Nice {i}'))
+        db.session.commit()
+        
+        response = authenticated_client.get(f'/community/post/{post.id}')
+        assert response.status_code == 200
+        assert b'Nice 49' in response.data
+        assert b'Nice 50' not in response.data
+        
+        cursor = response.data.split(b'cursor=')[1].split(b'"')[0].decode()
+        more = authenticated_client.get(f'/community/post/{post.id}?cursor={cursor}', headers={'HX-Request': 'true'})
+        assert more.status_code == 200
+        assert more.data.count(b'class="card mb-2"') == 5
+        assert b'Load more comments' not in more.data
+
+
+class TestQueryBudgets:
+    """Routes must issue a constant number of queries, however much they render."""
+    
+    def _make_users(self, count):
+        from app import db
+        from app.models import User
+        users = [
+            User(email=f'member{i}@example.com', username=f'member{i}', password_hash='x')
+            for i in range(count)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return users
+    
+    def _count(self, client, url, query_counter):
+        from flask import g
+        from app import db
+        # The test app context outlives requests; start each one cold so
+        # lazy loads can't be answered from the identity map.
+        db.session.expunge_all()
+        g.pop('_login_user', None)
+        query_counter.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        return len(query_counter)
+    
+    def test_post_page_query_count_is_constant(self, app, authenticated_client, test_user, query_counter):
+        from app import db
+        from app.models.social import CommunityPost, CommunityComment
+        users = self._make_users(30)
+        small = CommunityPost(user_id=test_user.id, content='Small thread')
+        large = CommunityPost(user_id=users[0].id, content='Large thread')
+        db.session.add_all([small, large])
+        db.session.flush()
+        for i in range(5):
+            db.session.add(CommunityComment(post_id=small.id, user_id=users[i].id, content='Hi'))
+        for i in range(120):
+            db.session.add(CommunityComment(post_id=large.id, user_id=users[i % 30].id, content='Hi'))
+        db.session.commit()
+        small_url, large_url = f'/community/post/{small.id}', f'/community/post/{large.id}'
+        
+        baseline = self._count(authenticated_client, small_url, query_counter)
+        assert self._count(authenticated_client, large_url, query_counter) == baseline
+        assert baseline <= 8
+    
+    def test_feed_query_count_is_constant(self, app, authenticated_client, test_user, query_counter):
+        from app import db
+        from app.models.social import CommunityPost
+        db.session.add(CommunityPost(user_id=test_user.id, content='Only post'))
+        db.session.commit()
+        baseline = self._count(authenticated_client, '/community/', query_counter)
+        
+        for user in self._make_users(20):
+            db.session.add(CommunityPost(user_id=user.id, content='Keep going'))
+        db.session.commit()
+        assert self._count(authenticated_client, '/community/', query_counter) == baseline
+        assert baseline <= 8
+
+
+class TestPartnerBlueprint:
+    
+    def _partnership(self, test_user, test_admin):
+        from app import db
+        from app.models.partnership import Partnership
+        partnership = Partnership(user1_id=test_user.id, user2_id=test_admin.id, status='accepted')
+        db.session.add(partnership)
+        db.session.commit()
+        return partnership.id
+    
+    def test_chat_send_and_fetch_since(self, app, authenticated_client, test_user, test_admin):
+        partnership_id = self._partnership(test_user, test_admin)
+        
+        page = authenticated_client.get(f'/partner/{partnership_id}/chat')
+        assert page.status_code == 200
+        
+        sent = authenticated_client.post(f'/partner/{partnership_id}/chat/send', data={'message': 'Hello'},
+                                         headers={'Accept': 'application/json'})
+        assert sent.status_code == 201
+        cursor = sent.json['cursor']
+        authenticated_client.post(f'/partner/{partnership_id}/chat/send', data={'message': 'Again'},
+                                  headers={'Accept': 'application/json'})
+        
+        since = authenticated_client.get(f'/partner/{partnership_id}/chat/messages?since={cursor}')
+        assert [m['message'] for m in since.json['messages']] == ['Again']
+        assert authenticated_client.get(f'/partner/{partnership_id}/chat/messages?since=%%%').status_code == 400
+    
+    def test_chat_loads_earlier_messages(self, app, authenticated_client, test_user, test_admin):
+        from app import db
+        from app.models.partnership import PartnerMessage
+        from app.services.chat_service import CHAT_PAGE_SIZE
+        partnership_id = self._partnership(test_user, test_admin)
+        start = datetime(2026, 1, 1, 12, 0)
+        db.session.add_all([
+            PartnerMessage(partnership_id=partnership_id, sender_id=test_admin.id,
+                           message=f'Message {i}', created_at=start + timedelta(minutes=i))
+            for i in range(CHAT_PAGE_SIZE + 1)
+        ])
+        db.session.commit()
+        
+        page = authenticated_client.get(f'/partner/{partnership_id}/chat').get_data(as_text=True)
+        assert 'Message 0<' not in page
+        assert f'Message {CHAT_PAGE_SIZE}<' in page
+        earlier_url = re.search(r'id="chat-earlier".*?hx-get="([^"]+)"', page, re.S).group(1).replace('&amp;', '&')
+        
+        earlier = authenticated_client.get(earlier_url, headers={'HX-Request': 'true'}).get_data(as_text=True)
+        assert 'Message 0<' in earlier
+        assert 'Message 1<' not in earlier
+        assert 'Load earlier' not in earlier
+        assert authenticated_client.get(f'/partner/{partnership_id}/chat?before=%%%').status_code == 400
+    
+    def test_chat_is_private_to_partners(self, app, client, test_user, test_admin):
+        from app.services import AuthService
+        partnership_id = self._partnership(test_user, test_admin)
+        AuthService.create_user(email='other@example.com', username='other', password='password123')
+        client.post('/auth/login', data={'email': 'other@example.com', 'password': 'password123'})
+        
+        assert client.get(f'/partner/{partnership_id}/chat/messages').status_code == 403
+
+
 class TestAdminBlueprint:
     
     def test_admin_requires_admin(self, authenticated_client):
@@ -116,3 +316,40 @@ class TestAdminBlueprint:
         
         response = client.get('/admin/')
         assert response.status_code == 200
+    
+    def test_broadcast_reaches_every_inbox(self, app, client, test_admin, test_user):
+        from app.models import Notification
+        client.post('/auth/login', data={
+            'email': 'admin@example.com',
+            'password': 'adminpass123'
+        })
+        
+        response = client.post('/admin/notifications', data={
+            'title': 'Maintenance', 'message': 'Back soon',
+            'notification_type': 'maintenance', 'delivery': 'inbox'
+        })
+        assert response.status_code == 302
+        assert Notification.query.filter_by(title='Maintenance').count() == 2
+        
+        page = client.get('/admin/notifications')
+        assert b'2 / 2' in page.data
+    
+    def test_deleting_a_user_removes_their_posts_from_the_feed(self, app, client, test_admin, test_user, redis_server):
+        from app import db
+        from app.models.social import CommunityPost
+        from app.services import CommunityService
+        post = CommunityPost(user_id=test_user.id, content='Leaving soon')
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        CommunityService.publish_post(post)
+        assert [p.id for p in CommunityService.get_feed_page()[0]] == [post_id]
+        client.post('/auth/login', data={
+            'email': 'admin@example.com',
+            'password': 'adminpass123'
+        })
+        
+        assert client.post(f'/admin/users/{test_user.id}/delete').status_code == 302
+        
+        assert CommunityService.get_feed_page()[0] == []
+        assert not redis_server.exists(CommunityService.post_key(post_id))
@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+from app.services import ActivityService, HabitService
+from app.models import HabitLog
+from app import db
+
+
+class TestActivityService:
+    
+    def test_histogram_fills_empty_days(self, app, test_user, test_habit):
+        now = datetime.now(timezone.utc)
+        for days_ago in (0, 0, 2):
+            db.session.add(HabitLog(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                completed_at=now - timedelta(days=days_ago)
+            ))
+        db.session.commit()
+        
+        histogram = ActivityService.get_completion_histogram(test_user.id, days=7)
+        
+        assert len(histogram) == 7
+        assert histogram[-1] == (now.date(), 2)
+        assert [count for _, count in histogram] == [0, 0, 0, 0, 1, 0, 2]
+    
+    def test_histogram_ignores_other_users_and_old_logs(self, app, test_user, test_habit, test_admin):
+        other = HabitService.create_habit(test_admin.id, 'Walk')
+        db.session.add(HabitLog(habit_id=other.id, user_id=test_admin.id))
+        db.session.add(HabitLog(
+            habit_id=test_habit.id,
+            user_id=test_user.id,
+            completed_at=datetime.now(timezone.utc) - timedelta(days=30)
+        ))
+        db.session.commit()
+        
+        assert ActivityService.get_completion_total(test_user.id, days=7) == 0
+    
+    def test_complete_habit_counts_today(self, app, test_user, test_habit):
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        
+        assert ActivityService.get_completion_total(test_user.id, days=1) == 1
@@ -0,0 +1,75 @@
+import pytest
+from datetime import date, datetime, timezone, timedelta
+from app.services import CalendarService, HabitService
+from app.models import HabitLog
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def redis_down(monkeypatch):
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+
+
+@pytest.fixture
+def local_tier(app):
+    cache._local.configure(16, 30)
+    yield cache
+    cache._local.configure(app.config['CACHE_L1_MAXSIZE'], app.config['CACHE_L1_TTL'])
+
+
+def _log(habit, when):
+    db.session.add(HabitLog(habit_id=habit.id, user_id=habit.user_id, completed_at=when))
+
+
+class TestCalendarService:
+    
+    def test_month_matrix_counts_each_habit_per_day(self, app, test_user, test_habit, test_admin, query_counter):
+        other = HabitService.create_habit(test_user.id, 'Read')
+        for when in (datetime(2024, 2, 1, 7), datetime(2024, 2, 1, 21), datetime(2024, 2, 29, 23, 59)):
+            _log(test_habit, when)
+        _log(other, datetime(2024, 2, 10, 12))
+        _log(test_habit, datetime(2024, 3, 1))
+        _log(HabitService.create_habit(test_admin.id, 'Walk'), datetime(2024, 2, 10))
+        db.session.commit()
+        user_id = test_user.id
+        query_counter.clear()
+        
+        matrix = CalendarService.get_month_matrix(user_id, 2024, 2)
+        
+        assert len(query_counter) == 1
+        assert set(matrix) == {test_habit.id, other.id}
+        assert len(matrix[test_habit.id]) == 29
+        assert matrix[test_habit.id][0] == 2 and matrix[test_habit.id][28] == 1
+        assert sum(matrix[test_habit.id]) == 3
+        assert matrix[other.id][9] == 1
+        assert CalendarService.get_month_matrix(user_id, 2999, 1) == {}
+    
+    def test_range_spans_months(self, app, test_user, test_habit):
+        for when in (datetime(2023, 12, 30), datetime(2024, 1, 2), datetime(2024, 1, 20)):
+            _log(test_habit, when)
+        db.session.commit()
+        
+        matrix = CalendarService.get_completion_matrix(test_user.id, date(2023, 12, 31), date(2024, 1, 3))
+        
+        assert matrix == {test_habit.id: [0, 0, 1]}
+    
+    def test_past_months_stay_cached_until_invalidated(self, app, local_tier, test_user, test_habit, query_counter):
+        user_id = test_user.id
+        now = datetime.now(timezone.utc)
+        last_month = now.replace(day=1) - timedelta(days=1)
+        _log(test_habit, last_month)
+        db.session.commit()
+        
+        past = CalendarService.get_month_matrix(user_id, last_month.year, last_month.month)
+        assert sum(past[test_habit.id]) == 1
+        assert CalendarService.get_month_matrix(user_id, now.year, now.month) == {}
+        
+        HabitService.complete_habit(test_habit.id, user_id)
+        query_counter.clear()
+        assert CalendarService.get_month_matrix(user_id, last_month.year, last_month.month) == past
+        assert query_counter == []
+        assert sum(CalendarService.get_month_matrix(user_id, now.year, now.month)[test_habit.id]) == 1
+        
+        HabitService.delete_habit(test_habit.id)
+        assert CalendarService.get_month_matrix(user_id, last_month.year, last_month.month) == {}
@@ -0,0 +1,77 @@
+import pytest
+from app.services.chat_service import ChatService
+from app.models.partnership import Partnership, PartnerMessage
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture
+def partnership(app, monkeypatch, test_user, test_admin):
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+    partnership = Partnership(user1_id=test_user.id, user2_id=test_admin.id, status='accepted')
+    db.session.add(partnership)
+    db.session.commit()
+    return partnership
+
+
+class TestChatService:
+    
+    def test_since_returns_only_newer_messages(self, app, partnership, test_user, test_admin):
+        first = ChatService.send(partnership, test_user, 'Morning!')
+        cursor = ChatService.to_dict(first)['cursor']
+        ChatService.send(partnership, test_admin, 'Hey')
+        ChatService.send(partnership, test_user, 'Day 30 today')
+        
+        assert [m.message for m in ChatService.get_since(partnership.id, cursor)] == ['Hey', 'Day 30 today']
+        assert len(ChatService.get_since(partnership.id)) == 3
+        with pytest.raises(ValueError, match='Invalid chat cursor'):
+            ChatService.get_before(partnership.id, 'garbage')
+    
+    def test_before_pages_backwards_to_the_start(self, app, partnership, test_user, test_admin):
+        for text in ['One', 'Two', 'Three', 'Four', 'Five']:
+            ChatService.send(partnership, test_user, text)
+        
+        latest, cursor = ChatService.get_before(partnership.id, limit=2)
+        assert [m.message for m in latest] == ['Four', 'Five']
+        earlier, cursor = ChatService.get_before(partnership.id, cursor, limit=2)
+        assert [m.message for m in earlier] == ['Two', 'Three']
+        first, cursor = ChatService.get_before(partnership.id, cursor, limit=2)
+        assert [m.message for m in first] == ['One']
+        assert cursor is None
+        with pytest.raises(ValueError, match='Invalid chat cursor'):
+            ChatService.get_since(partnership.id, 'garbage')
+    
+    def test_receipts_mark_partner_messages_up_to_timestamp(self, app, partnership, test_user, test_admin):
+        early = ChatService.send(partnership, test_admin, 'One')
+        ChatService.send(partnership, test_user, 'Mine')
+        ChatService.send(partnership, test_admin, 'Two')
+        
+        ChatService.mark_read(partnership.id, test_user.id, early.created_at)
+        read = {m.message: m.is_read for m in PartnerMessage.query}
+        assert read == {'One': True, 'Mine': False, 'Two': False}
+    
+    def test_receipts_are_collapsed_per_reader(self, app, partnership, test_user, test_admin):
+        messages = [ChatService.send(partnership, test_admin, f'm{i}') for i in range(3)]
+        receipts = [
+            {'partnership': partnership.id, 'reader': test_user.id, 'up_to': m.created_at.isoformat()}
+            for m in reversed(messages)
+        ]
+        
+        ChatService._apply_receipts(receipts)
+        assert all(m.is_read for m in PartnerMessage.query)
+    
+    def test_failed_receipt_batch_is_retried(self, app, partnership, redis_server, monkeypatch, test_user, test_admin):
+        from app.services.chat_service import RECEIPT_QUEUE_KEY, RECEIPT_PROCESSING_KEY
+        message = ChatService.send(partnership, test_admin, 'One')
+        ChatService.mark_read(partnership.id, test_user.id, message.created_at)
+        assert redis_server.llen(RECEIPT_QUEUE_KEY) == 1
+        
+        apply_receipts = ChatService._apply_receipts
+        monkeypatch.setattr(ChatService, '_apply_receipts', staticmethod(lambda receipts: 1 / 0))
+        assert ChatService.flush_receipts() == 0
+        assert redis_server.llen(RECEIPT_PROCESSING_KEY) == 1
+        
+        monkeypatch.setattr(ChatService, '_apply_receipts', staticmethod(apply_receipts))
+        assert ChatService.flush_receipts() == 1
+        assert redis_server.llen(RECEIPT_PROCESSING_KEY) == 0
+        assert PartnerMessage.query.one().is_read
@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, timedelta
+from app.services import CommunityService
+from app.models.social import CommunityPost
+from app.utils.cursor import encode_cursor, decode_cursor
+from app import db
+
+
+@pytest.fixture
+def posts(app, test_user):
+    start = datetime(2026, 1, 1, 12, 0)
+    created = []
+    for i in range(5):
+        post = CommunityPost(user_id=test_user.id, content=f'Post {i}',
+                             created_at=start + timedelta(minutes=i))
+        db.session.add(post)
+        created.append(post)
+    # Same timestamp as the newest post; (created_at, id) breaks the tie.
+    db.session.add(CommunityPost(user_id=test_user.id, content='Twin',
+                                 created_at=start + timedelta(minutes=4)))
+    db.session.add(CommunityPost(user_id=test_user.id, content='Hidden',
+                                 created_at=start + timedelta(minutes=9), is_approved=False))
+    db.session.commit()
+    return created
+
+
+class TestCommunityService:
+    
+    def test_cursor_walks_every_post_once(self, app, posts):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = CommunityService.get_feed_page(cursor, limit=2)
+            seen.extend(post.content for post in page)
+            if cursor is None:
+                break
+        
+        assert len(seen) == 6
+        assert set(seen) == {'Post 0', 'Post 1', 'Post 2', 'Post 3', 'Post 4', 'Twin'}
+        assert seen[-4:] == ['Post 3', 'Post 2', 'Post 1', 'Post 0']
+    
+    def test_last_page_has_no_cursor(self, app, posts):
+        page, cursor = CommunityService.get_feed_page(limit=10)
+        assert len(page) == 6
+        assert cursor is None
+    
+    def test_cursor_round_trip(self, app, posts):
+        cursor = encode_cursor(posts[0])
+        assert decode_cursor(cursor) == (posts[0].created_at, posts[0].id)
+    
+    def test_invalid_cursor(self, app):
+        with pytest.raises(ValueError, match='Invalid feed cursor'):
+            CommunityService.get_feed_page('not-a-cursor')
+    
+    def test_get_posts_keeps_order_and_hides_unapproved(self, app, posts):
+        hidden = CommunityPost.query.filter_by(content='Hidden').one()
+        ids = [posts[2].id, hidden.id, posts[0].id, 'missing']
+        
+        assert [post.content for post in CommunityService.get_posts(ids)] == ['Post 2', 'Post 0']
+
+
+class TestCommunityTimeline:
+    
+    def test_pages_are_sliced_from_the_timeline_and_hydrated_from_cache(self, app, posts, redis_server, query_counter):
+        from app.services.community_service import TIMELINE_KEY
+        db_pages = []
+        cursor = None
+        while True:
+            page, cursor = CommunityService.get_feed_page(cursor, limit=4)
+            db_pages.append([post.content for post in page])
+            if cursor is None:
+                break
+        
+        assert redis_server.zcard(TIMELINE_KEY) == 6
+        assert redis_server.exists(CommunityService.post_key(posts[0].id))
+        
+        query_counter.clear()
+        page, cursor = CommunityService.get_feed_page(limit=4)
+        assert [post.content for post in page] == db_pages[0]
+        assert query_counter == []
+        
+        redis_server.delete(TIMELINE_KEY, 'community:timeline:ready')
+        assert CommunityService.rebuild_timeline()
+        assert redis_server.zcard(TIMELINE_KEY) == 6
+    
+    def test_published_and_unpublished_posts(self, app, posts, test_user, redis_server):
+        CommunityService.get_feed_page()
+        post = CommunityPost(user_id=test_user.id, content='Fresh', created_at=datetime(2026, 2, 1))
+        db.session.add(post)
+        db.session.commit()
+        
+        CommunityService.publish_post(post)
+        assert CommunityService.get_feed_page(limit=1)[0][0].content == 'Fresh'
+        
+        db.session.delete(post)
+        db.session.commit()
+        CommunityService.unpublish_posts([post.id])
+        assert CommunityService.get_feed_page(limit=1)[0][0].content != 'Fresh'
+        assert not redis_server.exists(CommunityService.post_key(post.id))
+    
+    def test_counter_changes_drop_the_cached_post(self, app, posts, test_user, redis_server):
+        from app.services.like_service import LikeService
+        post_id = posts[0].id
+        assert CommunityService.get_posts([post_id])[0].likes_count == 0
+        
+        LikeService._apply([{'post': post_id, 'user': test_user.id, 'liked': True}])
+        
+        assert CommunityService.get_posts([post_id])[0].likes_count == 1
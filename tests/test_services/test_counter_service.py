@@ -0,0 +1,73 @@
+import pytest
+from app.services.counter_service import CounterService
+from app.models.social import CommunityPost, CommunityPostLike, CommunityComment
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture
+def drifted_post(app, monkeypatch, test_user, test_admin):
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+    post = CommunityPost(user_id=test_user.id, content='Drifted', likes_count=5, comments_count=0)
+    clean = CommunityPost(user_id=test_user.id, content='Clean', likes_count=0, comments_count=0)
+    db.session.add_all([post, clean])
+    db.session.flush()
+    db.session.add(CommunityPostLike(post_id=post.id, user_id=test_admin.id))
+    db.session.add_all([
+        CommunityComment(post_id=post.id, user_id=test_admin.id, content='One'),
+        CommunityComment(post_id=post.id, user_id=test_user.id, content='Two'),
+    ])
+    db.session.commit()
+    return post
+
+
+class TestCounterService:
+    
+    def test_reconcile_repairs_columns(self, app, drifted_post):
+        report = CounterService.reconcile(batch_size=1)
+        
+        assert report['posts'] == 2
+        assert report['likes_count_drift'] == 1
+        assert report['comments_count_drift'] == 1
+        assert report['column_delta'] == 6
+        db.session.refresh(drifted_post)
+        assert (drifted_post.likes_count, drifted_post.comments_count) == (1, 2)
+        
+        assert CounterService.reconcile()['likes_count_drift'] == 0
+    
+    def test_dry_run_only_reports(self, app, drifted_post):
+        report = CounterService.reconcile(repair=False)
+        
+        assert report['likes_count_drift'] == 1
+        db.session.refresh(drifted_post)
+        assert (drifted_post.likes_count, drifted_post.comments_count) == (5, 0)
+    
+    def test_comment_increments_counter_in_sql(self, app, authenticated_client, drifted_post):
+        response = authenticated_client.post(
+            f'/community/post/{drifted_post.id}/comment', data={'content': 'Three'}
+        )
+        assert response.status_code == 302
+        db.session.refresh(drifted_post)
+        assert drifted_post.comments_count == 1
+    
+    def test_reconcile_repairs_redis_copies_for_good(self, app, authenticated_client, drifted_post, redis_server, test_admin):
+        from app.services import CommunityService
+        from app.services.social_cache_service import warm_posts
+        from app.utils.cache import CommentCache, LikeCache
+        CounterService.reconcile()
+        post_id = drifted_post.id
+        assert post_id in warm_posts([post_id])
+        CommunityService.get_posts([post_id])
+        redis_server.set(CommentCache.get_key(post_id), 9)
+        db.session.delete(CommunityPostLike.query.filter_by(post_id=post_id).one())
+        db.session.commit()
+        
+        report = CounterService.reconcile()
+        
+        assert report['redis_comments_drift'] == 1
+        assert report['redis_likes_drift'] == 1
+        assert not redis_server.exists(LikeCache.get_like_key(post_id))
+        assert not redis_server.exists(CommunityService.post_key(post_id))
+        assert authenticated_client.get('/community/').status_code == 200
+        assert redis_server.get(CommentCache.get_key(post_id)) == b'2'
+        assert CounterService.reconcile()['redis_comments_drift'] == 0
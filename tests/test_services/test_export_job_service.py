@@ -0,0 +1,139 @@
+import io
+import json
+import os
+import zipfile
+from datetime import datetime, timezone, timedelta
+import pytest
+from app.services.export_job_service import ExportJobService
+from app.services.export_service import ExportService
+from app.models import ExportJob, HabitLog
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def storage(app, tmp_path):
+    app.config['EXPORT_STORAGE_DIR'] = str(tmp_path)
+    return tmp_path
+
+
+class TestExportJobService:
+    
+    def test_build_writes_one_member_per_entity(self, app, test_habit, storage):
+        db.session.add(HabitLog(habit_id=test_habit.id, user_id=test_habit.user_id, notes='done'))
+        db.session.commit()
+        
+        job = ExportJobService.start(test_habit.user_id)
+        
+        assert job.status == 'done'
+        assert job.progress == 100
+        assert job.written == job.total == 2
+        assert os.listdir(storage) == [f'{job.id}.zip']
+        with zipfile.ZipFile(ExportJobService.path_for(job)) as archive:
+            assert archive.namelist() == [
+                'habits.csv', 'habit_logs.csv', 'relapses.csv',
+                'journal_entries.csv', 'mood_entries.csv', 'user_data.json',
+            ]
+            assert archive.read('habit_logs.csv').decode() == \
+                ExportService.export_habit_logs_csv(test_habit.user_id)
+            data = json.loads(archive.read('user_data.json'))
+        assert data['habits'][0]['name'] == 'Exercise'
+        assert job.size == os.path.getsize(ExportJobService.path_for(job))
+    
+    def test_start_reuses_job_in_progress(self, app, test_user):
+        running = ExportJob(user_id=test_user.id, status='running',
+                            claimed_at=datetime.now(timezone.utc))
+        db.session.add(running)
+        db.session.commit()
+        
+        assert ExportJobService.start(test_user.id).id == running.id
+        assert ExportJob.query.count() == 1
+        assert db.session.get(ExportJob, running.id).status == 'running'
+    
+    def test_start_rebuilds_a_job_whose_worker_died(self, app, test_user):
+        abandoned = ExportJob(user_id=test_user.id, status='running',
+                              claimed_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        db.session.add(abandoned)
+        db.session.commit()
+        
+        job = ExportJobService.start(test_user.id)
+        
+        assert job.id == abandoned.id
+        assert job.status == 'done'
+        assert ExportJob.query.count() == 1
+    
+    def test_resume_reclaims_abandoned_jobs(self, app, test_user):
+        abandoned = ExportJob(user_id=test_user.id, status='running',
+                              claimed_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        failed = ExportJob(user_id=test_user.id, status='failed', error='disk full')
+        db.session.add_all([abandoned, failed])
+        db.session.commit()
+        
+        assert ExportJobService.resume_jobs() == 1
+        assert db.session.get(ExportJob, abandoned.id).status == 'done'
+        assert db.session.get(ExportJob, failed.id).status == 'failed'
+        
+        assert ExportJobService.resume_jobs(retry_failed=True) == 1
+        assert db.session.get(ExportJob, failed.id).status == 'done'
+    
+    def test_expire_deletes_archives(self, app, test_user, storage):
+        job = ExportJobService.start(test_user.id)
+        
+        assert ExportJobService.expire_jobs() == 0
+        assert ExportJobService.expire_jobs(now=datetime.now(timezone.utc) + timedelta(days=2)) == 1
+        assert db.session.get(ExportJob, job.id).status == 'expired'
+        assert os.listdir(storage) == []
+    
+    def test_routes_poll_and_resume_download(self, app, authenticated_client, test_user, test_admin):
+        response = authenticated_client.post('/export/all', headers={'Accept': 'application/json'})
+        assert response.status_code == 202
+        job_id = response.get_json()['id']
+        
+        status = authenticated_client.get(f'/export/jobs/{job_id}').get_json()
+        assert status['status'] == 'done'
+        assert 'Download ZIP' in authenticated_client.get('/export/').get_data(as_text=True)
+        
+        full = authenticated_client.get(f'/export/jobs/{job_id}/download')
+        assert full.status_code == 200
+        assert full.mimetype == 'application/zip'
+        zipfile.ZipFile(io.BytesIO(full.data)).testzip()
+        
+        rest = authenticated_client.get(f'/export/jobs/{job_id}/download',
+                                        headers={'Range': 'bytes=100-'})
+        assert rest.status_code == 206
+        assert rest.data == full.data[100:]
+        
+        other = ExportJob(user_id=test_admin.id, status='done', filename='x.zip')
+        db.session.add(other)
+        db.session.commit()
+        assert authenticated_client.get(f'/export/jobs/{other.id}').status_code == 404
+        assert authenticated_client.get(f'/export/jobs/{other.id}/download').status_code == 404
+    
+    def test_lease_is_renewed_inside_a_member(self, app, test_habit, monkeypatch):
+        from app.services import export_job_service
+        from app.services.export_service import EXPORT_BATCH_SIZE
+        monkeypatch.setattr(export_job_service, 'CHECKPOINT_CHUNKS', 1)
+        db.session.execute(HabitLog.__table__.insert(), [
+            {'id': str(i), 'habit_id': test_habit.id, 'user_id': test_habit.user_id,
+             'completed_at': datetime(2024, 1, 1), 'created_at': datetime(2024, 1, 1)}
+            for i in range(EXPORT_BATCH_SIZE * 2 + 1)
+        ])
+        db.session.commit()
+        total = EXPORT_BATCH_SIZE * 2 + 2
+        beats = []
+        heartbeat = ExportJobService._heartbeat
+        
+        def recording_heartbeat(job_id, written):
+            heartbeat(job_id, written)
+            beats.append(db.session.execute(
+                db.select(ExportJob.written, ExportJob.current_file).where(ExportJob.id == job_id)
+            ).one())
+        
+        monkeypatch.setattr(ExportJobService, '_heartbeat', staticmethod(recording_heartbeat))
+        job = ExportJobService.start(test_habit.user_id)
+        
+        assert job.status == 'done'
+        assert job.written == job.total == total
+        log_beats = [written for written, current_file in beats if current_file == 'habit_logs.csv']
+        assert len(log_beats) >= 3
+        assert log_beats == sorted(log_beats)
+        assert 1 < log_beats[0] < log_beats[-1] <= total
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from app.services.export_service import ExportService, EXPORT_BATCH_SIZE
+from app.models import HabitLog
+from app import db
+
+
+def _add_logs(habit, count):
+    start = datetime(2024, 1, 1)
+    db.session.execute(HabitLog.__table__.insert(), [
+        {'id': str(uuid.uuid4()), 'habit_id': habit.id, 'user_id': habit.user_id,
+         'completed_at': start + timedelta(minutes=i), 'streak_count': i,
+         'notes': 'note, with "quotes"' if i % 2 else None, 'created_at': start}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+class TestExportService:
+    
+    def test_logs_stream_in_batches(self, app, test_habit):
+        _add_logs(test_habit, EXPORT_BATCH_SIZE * 2 + 5)
+        
+        chunks = list(ExportService.iter_habit_logs_csv(test_habit.user_id))
+        
+        # Header, then one chunk per batch of rows.
+        assert len(chunks) == 4
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        assert rows[0] == ['ID', 'Habit ID', 'Completed At', 'Streak Count', 'Notes']
+        assert len(rows) == EXPORT_BATCH_SIZE * 2 + 6
+        assert rows[1][3] == str(EXPORT_BATCH_SIZE * 2 + 4)
+        assert rows[1][2] == (datetime(2024, 1, 1) + timedelta(minutes=EXPORT_BATCH_SIZE * 2 + 4)).isoformat()
+        assert rows[2][4] == 'note, with "quotes"'
+        assert rows[-1][4] == ''
+        assert ExportService.export_habit_logs_csv(test_habit.user_id) == ''.join(chunks)
+    
+    def test_route_streams_csv(self, app, authenticated_client, test_habit):
+        _add_logs(test_habit, 3)
+        
+        response = authenticated_client.get('/export/logs')
+        
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'text/csv'
+        assert 'attachment; filename=habit_logs_' in response.headers['Content-Disposition']
+        assert response.get_data(as_text=True).count('\n') == 4
+    
+    def test_user_data_json_streams_large_account(self, app, test_habit, test_admin, query_counter):
+        from app.models import User, Partnership, SharedGoal, Trigger
+        user_id = test_habit.user_id
+        _add_logs(test_habit, EXPORT_BATCH_SIZE * 3 + 7)
+        partners = [User(email=f'p{i}@example.com', username=f'partner{i}', password_hash='x')
+                    for i in range(4)]
+        db.session.add_all(partners)
+        db.session.flush()
+        for i, partner in enumerate(partners):
+            pair = (user_id, partner.id) if i % 2 else (partner.id, user_id)
+            partnership = Partnership(user1_id=pair[0], user2_id=pair[1], status='accepted')
+            db.session.add(partnership)
+            db.session.flush()
+            db.session.add_all([SharedGoal(partnership_id=partnership.id, title=f'Goal {i}.{j}')
+                                for j in range(3)])
+        other = Partnership(user1_id=test_admin.id, user2_id=partners[0].id)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(SharedGoal(partnership_id=other.id, title='Not mine'))
+        db.session.add(Trigger(user_id=user_id, name='Stress "at work"\n', category='emotional'))
+        db.session.commit()
+        
+        query_counter.clear()
+        text = ''.join(ExportService.iter_user_data_json(user_id))
+        
+        # One query per section, however many partnerships there are.
+        assert len(query_counter) == 10
+        data = json.loads(text)
+        assert text == json.dumps(data, indent=2)
+        assert list(data) == [
+            'exported_at', 'user_id', 'habits', 'habit_logs', 'relapses', 'journal_entries',
+            'mood_entries', 'triggers', 'achievements', 'prevention_plans', 'partnerships',
+            'shared_goals',
+        ]
+        assert len(data['habit_logs']) == EXPORT_BATCH_SIZE * 3 + 7
+        assert data['relapses'] == []
+        assert data['triggers'][0]['name'] == 'Stress "at work"\n'
+        assert sorted(p['partner_id'] for p in data['partnerships']) == sorted(p.id for p in partners)
+        assert len(data['shared_goals']) == 12
+        assert 'Not mine' not in text
+        
+        expected = ExportService.export_all_user_data(user_id)
+        del expected['exported_at'], data['exported_at']
+        assert data == expected
@@ -0,0 +1,129 @@
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.services import import_service
+from app.services.import_service import ImportService
+from app.services.export_service import ExportService
+from app.services.export_job_service import ExportJobService
+from app.services.streak_service import StreakService
+from app.services.achievement_service import AchievementService
+from app.models import Habit, HabitLog, HabitStreak, JournalEntry, MoodEntry, RelapseEvent, Trigger, UserAchievement
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def redis_down(monkeypatch):
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+
+
+@pytest.fixture
+def source(app, test_habit):
+    """An account with a little of everything"""
+    user_id = test_habit.user_id
+    start = datetime(2024, 3, 1, 8, 30)
+    db.session.add_all([
+        HabitLog(habit_id=test_habit.id, user_id=user_id, completed_at=start + timedelta(days=i),
+                 streak_count=i + 1, notes='tab\there' if i == 0 else None)
+        for i in range(5)
+    ])
+    db.session.add_all([
+        Habit(user_id=user_id, name='Read', frequency='weekly', is_active=False),
+        RelapseEvent(user_id=user_id, trigger_type='stress', severity=4, occurred_at=start),
+        JournalEntry(user_id=user_id, date=start.date(), content='Line one\nLine "two"'),
+        MoodEntry(user_id=user_id, date=start.date(), mood='good'),
+        Trigger(user_id=user_id, name='Late nights'),
+    ])
+    achievement = AchievementService.create_achievement('First', 'First step', 'streak', 1)
+    AchievementService.award_achievement(user_id, achievement.id)
+    db.session.commit()
+    return user_id
+
+
+def _export(user_id):
+    return io.StringIO(''.join(ExportService.iter_user_data_json(user_id)))
+
+
+def _counts(user_id):
+    return [model.query.filter_by(user_id=user_id).count()
+            for model in (Habit, HabitLog, RelapseEvent, JournalEntry, MoodEntry, Trigger, UserAchievement)]
+
+
+class TestImportService:
+    
+    def test_json_round_trip_remaps_ids_and_rebuilds_streaks(self, app, source, test_admin):
+        report = ImportService.import_json(test_admin.id, _export(source))
+        
+        assert report['error_count'] == 0
+        assert report['imported'] == {
+            'habits': 2, 'habit_logs': 5, 'relapses': 1, 'journal_entries': 1,
+            'mood_entries': 1, 'triggers': 1, 'achievements': 1,
+        }
+        assert _counts(test_admin.id) == _counts(source)
+        
+        habit = Habit.query.filter_by(user_id=test_admin.id, name='Exercise').one()
+        assert habit.id != Habit.query.filter_by(user_id=source, name='Exercise').one().id
+        logs = HabitLog.query.filter_by(user_id=test_admin.id).order_by(HabitLog.completed_at).all()
+        assert {log.habit_id for log in logs} == {habit.id}
+        assert logs[0].completed_at == datetime(2024, 3, 1, 8, 30)
+        assert logs[0].notes == 'tab\there'
+        assert JournalEntry.query.filter_by(user_id=test_admin.id).one().content == 'Line one\nLine "two"'
+        assert Habit.query.filter_by(user_id=test_admin.id, name='Read').one().is_active is False
+        
+        state = db.session.get(HabitStreak, habit.id)
+        assert state is not None and not state.is_stale
+        assert state.longest_streak == 5
+        assert StreakService.get_streak_info(habit)['longest'] == 5
+    
+    def test_json_reader_streams_any_layout(self, app, source, test_admin, monkeypatch):
+        monkeypatch.setattr(import_service, 'JSON_READ_SIZE', 7)
+        compact = json.dumps(ExportService.export_all_user_data(source), separators=(',', ':'))
+        
+        report = ImportService.import_json(test_admin.id, io.StringIO(compact))
+        
+        assert report['error_count'] == 0
+        assert _counts(test_admin.id) == _counts(source)
+        
+        with pytest.raises(ValueError):
+            ImportService.import_json(test_admin.id, io.StringIO(compact[:-40]))
+    
+    def test_csv_import_reports_invalid_rows(self, app, source, test_admin):
+        logs = ExportService.export_habit_logs_csv(source) + 'x,missing-habit,2024-01-01T00:00:00,1,\n'
+        moods = 'ID,Date,Mood,Notes,Triggers\n1,2024-01-01,good,,\n2,2024-01-02,elated,,\n3,nope,bad,,\n'
+        files = {
+            'habit_logs_2024-03-09.csv': io.StringIO(logs),
+            'habits_2024-03-09.csv': io.StringIO(ExportService.export_habits_csv(source)),
+            'mood_2024-03-09.csv': io.StringIO(moods),
+        }
+        
+        report = ImportService.import_csv(test_admin.id, files)
+        
+        assert report['imported'] == {'habits': 2, 'habit_logs': 5, 'mood_entries': 1}
+        assert report['error_count'] == 3
+        assert report['errors'][0] == 'habit_logs[5]: habit_id does not match an imported habit'
+        assert 'mood must be one of' in report['errors'][1]
+        assert report['errors'][2] == 'mood_entries[2]: date is not an ISO date'
+        assert HabitLog.query.filter_by(user_id=test_admin.id).count() == 5
+    
+    def test_dry_run_saves_nothing(self, app, source, test_admin):
+        report = ImportService.import_json(test_admin.id, _export(source), dry_run=True, chunk_size=2)
+        
+        assert report['imported']['habit_logs'] == 5
+        assert _counts(test_admin.id) == [0] * 7
+        assert HabitStreak.query.count() == 0
+    
+    def test_archive_and_cli(self, app, runner, source, test_admin, tmp_path):
+        app.config['EXPORT_STORAGE_DIR'] = str(tmp_path)
+        job = ExportJobService.start(source)
+        
+        with open(ExportJobService.path_for(job), 'rb') as fp:
+            report = ImportService.import_archive(test_admin.id, fp)
+        assert report['skipped'] == {}
+        assert _counts(test_admin.id) == _counts(source)
+        
+        result = runner.invoke(args=['import-data', test_admin.email, ExportJobService.path_for(job), '--dry-run'])
+        assert result.exit_code == 0, result.output
+        assert "'habit_logs': 5" in result.output
+        assert 'dry run' in result.output
+        assert runner.invoke(args=['import-data', 'nobody@example.com', ExportJobService.path_for(job)]).exit_code == 1
@@ -0,0 +1,123 @@
+import pytest
+from datetime import date, datetime, timezone, timedelta
+from app.services import LeaderboardService, HabitService, RelapseService
+from app.models import HabitLog
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    # Exercise the SQL fallback regardless of whether a Redis server is running.
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+
+
+class TestLeaderboardService:
+    
+    def test_bucket_keys(self):
+        day = date(2026, 10, 18)
+        assert LeaderboardService.board_key('completions', 'week', day) == 'leaderboard:completions:week:2026-W42'
+        assert LeaderboardService.board_key('completions', 'month', day) == 'leaderboard:completions:month:2026-10'
+        assert LeaderboardService.board_key('points', 'week', day) == 'leaderboard:points'
+    
+    def test_top_and_rank_from_database(self, app, redis_down, test_user, test_habit, test_admin):
+        other = HabitService.create_habit(test_admin.id, 'Walk')
+        for _ in range(2):
+            HabitService.complete_habit(other.id, test_admin.id)
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        
+        top = LeaderboardService.top('completions')
+        
+        assert [(entry['username'], entry['score'], entry['rank']) for entry in top] == [
+            ('admin', 2, 1), ('testuser', 1, 2)
+        ]
+        assert LeaderboardService.rank('completions', test_user.id) == 2
+        assert LeaderboardService.rank('completions', test_user.id, 'week') == 2
+    
+    def test_rank_beyond_top_n(self, app, redis_down, test_user, test_habit, test_admin):
+        other = HabitService.create_habit(test_admin.id, 'Walk')
+        HabitService.complete_habit(other.id, test_admin.id)
+        HabitService.complete_habit(other.id, test_admin.id)
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        
+        assert [entry['username'] for entry in LeaderboardService.top('completions', limit=1)] == ['admin']
+        assert LeaderboardService.rank('completions', test_user.id) == 2
+    
+    def test_sobriety_orders_by_latest_relapse(self, app, redis_down, test_user, test_admin):
+        now = datetime.now(timezone.utc)
+        RelapseService.create_relapse(test_user.id, now - timedelta(days=40), 'stress', 5)
+        RelapseService.create_relapse(test_user.id, now - timedelta(days=3), 'stress', 5)
+        RelapseService.create_relapse(test_admin.id, now - timedelta(days=10), 'stress', 5)
+        
+        top = LeaderboardService.top('sobriety')
+        
+        assert [(entry['username'], entry['score']) for entry in top] == [('admin', 10), ('testuser', 3)]
+        assert LeaderboardService.rank('sobriety', test_user.id) == 2
+    
+    def test_week_excludes_earlier_completions(self, app, redis_down, test_user, test_habit):
+        db.session.add(HabitLog(
+            habit_id=test_habit.id,
+            user_id=test_user.id,
+            completed_at=datetime.now(timezone.utc) - timedelta(days=40)
+        ))
+        db.session.commit()
+        
+        assert LeaderboardService.rank('completions', test_user.id) == 1
+        assert LeaderboardService.rank('completions', test_user.id, 'week') is None
+    
+    def test_first_read_builds_the_boards(self, app, redis_server, test_user, test_habit):
+        from app.services.leaderboard_service import BUILT_KEY
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        
+        assert LeaderboardService.rank('completions', test_user.id) == 1
+        assert redis_server.exists(BUILT_KEY)
+        assert redis_server.zscore(LeaderboardService.board_key('completions'), test_user.id) == 1
+    
+    def test_reads_fall_back_to_sql_while_another_worker_builds(self, app, redis_server, test_user, test_habit):
+        from app.services.leaderboard_service import BUILT_KEY, REBUILD_LOCK_KEY
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        redis_server.set(REBUILD_LOCK_KEY, 1)
+        
+        assert LeaderboardService.rank('completions', test_user.id) == 1
+        assert [entry['user_id'] for entry in LeaderboardService.top('completions')] == [test_user.id]
+        assert not redis_server.exists(BUILT_KEY)
+    
+    def test_sql_ranks_match_redis_ranks(self, app, redis_server, query_counter, test_user, test_admin):
+        from app.models import User
+        from app.services.leaderboard_service import BOARD_TIMEFRAMES
+        users = [test_user, test_admin] + [
+            User(email=f'u{i}@example.com', username=f'u{i}', password_hash='x', points=i % 2 * 10)
+            for i in range(4)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        now = datetime.now(timezone.utc)
+        for i, user in enumerate(users[:4]):
+            habit = HabitService.create_habit(user.id, 'Walk')
+            for _ in range(i % 2 + 1):
+                HabitService.complete_habit(habit.id, user.id)
+            RelapseService.create_relapse(user.id, now - timedelta(days=i % 2), 'stress', 5)
+        user_ids = [user.id for user in users]
+        
+        sql = {
+            (board, timeframe, user_id): LeaderboardService._rank_from_db(board, timeframe, user_id)
+            for board, timeframe in BOARD_TIMEFRAMES for user_id in user_ids
+        }
+        query_counter.clear()
+        LeaderboardService._rank_from_db('completions', 'all', user_ids[0])
+        assert len(query_counter) == 2
+        
+        assert LeaderboardService.rebuild()
+        for (board, timeframe, user_id), rank in sql.items():
+            assert LeaderboardService.rank(board, user_id, timeframe) == rank, (board, timeframe)
+        assert [row[0] for row in LeaderboardService._top_from_db('points', 'all', 3)] == \
+            [entry['user_id'] for entry in LeaderboardService.top('points', limit=3)]
+    
+    def test_deleted_users_leave_the_boards(self, app, redis_server, test_user, test_habit):
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        LeaderboardService.rebuild()
+        
+        LeaderboardService.remove_user(test_user.id)
+        
+        assert LeaderboardService.rank('completions', test_user.id) is None
+        assert LeaderboardService.rank('completions', test_user.id, 'week') is None
@@ -0,0 +1,59 @@
+import pytest
+from app.services import LikeService
+from app.models.social import CommunityPost, CommunityPostLike
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture
+def post(app, test_user):
+    post = CommunityPost(user_id=test_user.id, content='Day 30!')
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+class TestLikeService:
+    
+    def test_apply_collapses_toggles_and_moves_counter(self, app, post, test_user, test_admin):
+        LikeService._apply([
+            {'post': post.id, 'user': test_user.id, 'liked': 1},
+            {'post': post.id, 'user': test_admin.id, 'liked': 1},
+            {'post': post.id, 'user': test_admin.id, 'liked': 0},
+            {'post': post.id, 'user': test_admin.id, 'liked': 1},
+            {'post': 'deleted-post', 'user': test_user.id, 'liked': 1},
+            {'post': post.id, 'user': 'deleted-user', 'liked': 1},
+        ])
+        db.session.refresh(post)
+        
+        assert post.likes_count == 2
+        assert CommunityPostLike.query.filter_by(post_id=post.id).count() == 2
+        
+        LikeService._apply([{'post': post.id, 'user': test_user.id, 'liked': 0}])
+        db.session.refresh(post)
+        
+        assert post.likes_count == 1
+        assert CommunityPostLike.query.filter_by(user_id=test_user.id).count() == 0
+    
+    def test_replayed_batch_is_idempotent(self, app, post, test_user):
+        batch = [{'post': post.id, 'user': test_user.id, 'liked': 1}]
+        LikeService._apply(batch)
+        LikeService._apply(batch)
+        db.session.refresh(post)
+        
+        assert post.likes_count == 1
+    
+    def test_toggle_falls_back_to_database(self, app, monkeypatch, post, test_user):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        
+        assert LikeService.toggle(test_user.id, post.id) == (True, 1)
+        assert LikeService.toggle(test_user.id, post.id) == (False, 0)
+        assert LikeService.toggle(test_user.id, 'missing') is None
+    
+    def test_redis_toggle_rejects_unapproved_posts(self, app, post, test_user, redis_server):
+        hidden = CommunityPost(user_id=test_user.id, content='Pending', is_approved=False)
+        db.session.add(hidden)
+        db.session.commit()
+        
+        assert LikeService.toggle(test_user.id, hidden.id) is None
+        assert LikeService.toggle(test_user.id, post.id) == (True, 1)
@@ -0,0 +1,84 @@
+import pytest
+from app.services.notification_service import NotificationService
+from app.models import User, Notification, Broadcast
+from app import db
+
+
+@pytest.fixture
+def members(app, test_user):
+    users = [
+        User(email=f'member{i}@example.com', username=f'member{i}', password_hash='x')
+        for i in range(6)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return [test_user] + users
+
+
+class TestNotificationService:
+    
+    def test_fanout_delivers_in_chunks(self, app, members):
+        app.config['BROADCAST_CHUNK_SIZE'] = 3
+        broadcast = NotificationService.start_broadcast('Hello', 'Welcome aboard')
+        
+        db.session.refresh(broadcast)
+        assert (broadcast.status, broadcast.delivered, broadcast.total) == ('done', 7, 7)
+        assert Notification.query.filter_by(broadcast_id=broadcast.id).count() == 7
+    
+    def test_interrupted_fanout_resumes_from_checkpoint(self, app, members):
+        broadcast = Broadcast(title='Later', message='Soon', status='failed')
+        db.session.add(broadcast)
+        db.session.commit()
+        broadcast.total = 7
+        ordered = sorted(user.id for user in members)
+        for user_id in ordered[:4]:
+            db.session.add(Notification(user_id=user_id, title='Later', message='Soon', broadcast_id=broadcast.id))
+        broadcast.delivered, broadcast.last_user_id = 4, ordered[3]
+        db.session.commit()
+        
+        assert NotificationService.resume_broadcasts() == 0
+        assert NotificationService.resume_broadcasts(retry_failed=True) == 1
+        
+        delivered = Notification.query.filter_by(broadcast_id=broadcast.id)
+        assert sorted(notification.user_id for notification in delivered) == ordered
+        assert db.session.get(Broadcast, broadcast.id).delivered == 7
+    
+    def test_shared_broadcast_is_read_per_user(self, app, members, test_user):
+        broadcast = NotificationService.start_broadcast('Shared', 'One row', shared=True)
+        other = members[1]
+        
+        assert Notification.query.count() == 0
+        assert NotificationService.unread_count(test_user.id) == 1
+        assert [item.id for item in NotificationService.get_inbox(test_user.id)] == [broadcast.id]
+        
+        NotificationService.mark_read(test_user.id, broadcast.id)
+        assert NotificationService.unread_count(test_user.id) == 0
+        assert NotificationService.get_inbox(test_user.id)[0].is_read
+        assert NotificationService.unread_count(other.id) == 1
+        
+        NotificationService.mark_all_read(other.id)
+        NotificationService.mark_all_read(other.id)
+        assert NotificationService.unread_count(other.id) == 0
+    
+    def test_unread_deltas_apply_only_after_commit(self, app, test_user):
+        NotificationService.create(test_user.id, 'One', 'First')
+        NotificationService.mark_all_read(test_user.id)
+        NotificationService.create(test_user.id, 'Two', 'Second')
+        assert db.session.info['unread_deltas'] == {test_user.id: 1}
+        
+        db.session.commit()
+        assert 'unread_deltas' not in db.session.info
+        NotificationService.create(test_user.id, 'Three', 'Third')
+        db.session.rollback()
+        assert 'unread_deltas' not in db.session.info
+        assert NotificationService.unread_count(test_user.id) == 1
+    
+    def test_stream_falls_back_to_reconnecting_without_redis(self, app, authenticated_client, monkeypatch, test_user):
+        from app.utils import cache
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        NotificationService.create(test_user.id, 'Hi', 'There')
+        db.session.commit()
+        
+        response = authenticated_client.get('/partner/notifications/stream')
+        assert response.mimetype == 'text/event-stream'
+        assert response.get_data(as_text=True) == 'event: unread\ndata: {"count": 1}\n\nretry: 30000\n\n'
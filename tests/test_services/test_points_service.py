@@ -0,0 +1,53 @@
+import pytest
+from app.services.points_service import PointsService
+from app.services.achievement_service import AchievementService
+from app.models import User, PointsLedgerEntry
+from app.utils import cache
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def redis_down(monkeypatch):
+    monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+
+
+class TestPointsService:
+    
+    def test_award_appends_ledger_and_increments_total(self, app, test_user):
+        test_user.points = 10
+        db.session.commit()
+        
+        assert PointsService.award(test_user.id, 5, 'post', 'p1') == 15
+        assert PointsService.award(test_user.id, -3, 'adjustment') == 12
+        
+        assert db.session.get(User, test_user.id).points == 12
+        ledger = PointsLedgerEntry.query.filter_by(user_id=test_user.id).all()
+        assert sorted(entry.amount for entry in ledger) == [-3, 5]
+    
+    def test_award_many_batches_inserts(self, app, test_user, test_admin):
+        awards = [(test_user.id, 1, 'achievement', None)] * 5 + [(test_admin.id, 4, 'achievement', None)]
+        
+        assert PointsService.award_many(awards, chunk_size=2) == {test_user.id: 5, test_admin.id: 4}
+        assert PointsLedgerEntry.query.count() == 6
+        assert db.session.get(User, test_user.id).points == 5
+        assert db.session.get(User, test_admin.id).points == 4
+    
+    def test_comment_awards_points_through_ledger(self, app, authenticated_client, test_user):
+        from app.models.social import CommunityPost
+        post = CommunityPost(user_id=test_user.id, content='Hello')
+        db.session.add(post)
+        db.session.commit()
+        
+        authenticated_client.post(f'/community/post/{post.id}/comment', data={'content': 'Hi'})
+        
+        assert db.session.get(User, test_user.id).points == 2
+        assert [entry.reason for entry in PointsLedgerEntry.query.filter_by(user_id=test_user.id)] == ['comment']
+    
+    def test_achievement_points_are_summed_in_sql(self, app, test_user):
+        first = AchievementService.create_achievement('A', 'a', 'streak', 1, points=10)
+        second = AchievementService.create_achievement('B', 'b', 'streak', 2, points=15)
+        AchievementService.award_achievement(test_user.id, first.id)
+        AchievementService.award_achievement(test_user.id, second.id)
+        
+        assert AchievementService.get_user_points(test_user.id) == 25
+        assert AchievementService.get_user_points('nobody') == 0
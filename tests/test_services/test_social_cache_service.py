@@ -0,0 +1,61 @@
+import pytest
+from app.services.social_cache_service import warm_posts, _load_likers
+from app.models.social import CommunityPost, CommunityPostLike
+from app.utils import cache
+from app import db
+
+
+class TestSocialCacheService:
+    
+    def test_load_likers_includes_posts_without_likes(self, app, test_user, test_admin):
+        liked = CommunityPost(user_id=test_user.id, content='Liked')
+        quiet = CommunityPost(user_id=test_user.id, content='Quiet')
+        db.session.add_all([liked, quiet])
+        db.session.commit()
+        db.session.add(CommunityPostLike(post_id=liked.id, user_id=test_admin.id))
+        db.session.commit()
+        
+        assert _load_likers([liked.id, quiet.id, 'missing']) == {
+            liked.id: [test_admin.id],
+            quiet.id: [],
+        }
+    
+    def test_nothing_is_warm_without_redis(self, app, monkeypatch, test_user):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        post = CommunityPost(user_id=test_user.id, content='Cold')
+        db.session.add(post)
+        db.session.commit()
+        
+        assert warm_posts([post.id]) == set()
+    
+    def test_feed_reads_likes_from_database_when_cold(self, app, authenticated_client, monkeypatch, test_user):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        post = CommunityPost(user_id=test_user.id, content='Cold feed post')
+        db.session.add(post)
+        db.session.commit()
+        db.session.add(CommunityPostLike(post_id=post.id, user_id=test_user.id))
+        db.session.commit()
+        
+        response = authenticated_client.get(f'/community/post/{post.id}')
+        assert response.status_code == 200
+        assert b'bi-heart-fill text-danger' in response.data
+    
+    def test_warm_feed_reads_redis_in_one_round_trip(self, app, authenticated_client, monkeypatch, test_user, test_admin, redis_server):
+        posts = [CommunityPost(user_id=test_admin.id, content=f'Post {i}') for i in range(3)]
+        db.session.add_all(posts)
+        db.session.commit()
+        db.session.add(CommunityPostLike(post_id=posts[0].id, user_id=test_user.id))
+        db.session.commit()
+        assert authenticated_client.get('/community/').status_code == 200
+        
+        # The timeline's EXISTS and slice, then one pipeline for the posts and
+        # their like and comment state.
+        round_trips = []
+        pipeline, execute_command = redis_server.pipeline, redis_server.execute_command
+        monkeypatch.setattr(redis_server, 'pipeline', lambda *a, **kw: round_trips.append(a) or pipeline(*a, **kw))
+        monkeypatch.setattr(redis_server, 'execute_command', lambda *a, **kw: round_trips.append(a) or execute_command(*a, **kw))
+        response = authenticated_client.get('/community/')
+        
+        assert response.status_code == 200
+        assert b'bi-heart-fill text-danger' in response.data
+        assert len(round_trips) == 3
@@ -73,3 +73,130 @@ class TestStreakService:
         
         assert 'current' in info
         assert 'longest' in info
+    
+    def test_complete_habit_advances_materialized_state(self, app, test_user, test_habit):
+        from app.services import HabitService
+        from app.models import HabitStreak
+        
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        
+        state = db.session.get(HabitStreak, test_habit.id)
+        assert state.current_streak == 1
+        assert state.longest_streak == 1
+        assert state.last_completed_on == datetime.now(timezone.utc).date()
+    
+    def test_backdated_log_marks_state_stale(self, app, test_user, test_habit):
+        from app.services import HabitService
+        from app.models import HabitStreak
+        
+        HabitService.complete_habit(test_habit.id, test_user.id)
+        db.session.add(HabitLog(
+            habit_id=test_habit.id,
+            user_id=test_user.id,
+            completed_at=datetime.now(timezone.utc) - timedelta(days=1)
+        ))
+        db.session.commit()
+        
+        assert db.session.get(HabitStreak, test_habit.id).is_stale is True
+        assert StreakService.calculate_current_streak(test_habit) == 2
+    
+    def test_broken_streak_reads_as_zero(self, app, test_user, test_habit):
+        old = datetime.now(timezone.utc) - timedelta(days=10)
+        for i in range(3):
+            db.session.add(HabitLog(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                completed_at=old + timedelta(days=i)
+            ))
+        db.session.commit()
+        
+        info = StreakService.get_streak_info(test_habit)
+        assert info['current'] == 0
+        assert info['longest'] == 3
+    
+    def test_weekly_streak_counts_weeks(self, app, test_user):
+        from app.services import HabitService
+        habit = HabitService.create_habit(test_user.id, 'Long run', frequency='weekly')
+        now = datetime.now(timezone.utc)
+        for weeks_ago in (0, 0, 1, 2):
+            db.session.add(HabitLog(
+                habit_id=habit.id,
+                user_id=test_user.id,
+                completed_at=now - timedelta(weeks=weeks_ago)
+            ))
+        db.session.commit()
+        
+        assert StreakService.calculate_current_streak(habit) == 3
+    
+    def test_read_path_rebuild_does_not_commit_callers_work(self, app, test_user, test_habit):
+        from app.models import Habit, HabitStreak
+        habit_id = test_habit.id
+        test_habit.name = 'Renamed'
+        
+        assert StreakService.get_streak_info(test_habit) == {'current': 0, 'longest': 0}
+        db.session.rollback()
+        
+        assert db.session.get(Habit, habit_id).name == 'Exercise'
+        assert HabitStreak.query.count() == 0
+    
+    def test_read_path_rebuild_is_saved_on_its_own(self, app, test_user, test_habit):
+        from app.models import HabitStreak
+        habit_id = test_habit.id
+        db.session.add(HabitLog(habit_id=habit_id, user_id=test_user.id, completed_at=datetime.now(timezone.utc)))
+        db.session.commit()
+        
+        assert StreakService.get_streak_info(test_habit) == {'current': 1, 'longest': 1}
+        db.session.rollback()
+        
+        state = db.session.get(HabitStreak, habit_id)
+        assert state.current_streak == 1
+        assert state.is_stale is False
+    
+    def test_completion_upserts_a_row_another_request_created(self, app, test_user, test_habit):
+        from app.services import HabitService
+        from app.models import HabitStreak
+        habit_id = test_habit.id
+        # Committed by a concurrent first completion after this session last looked.
+        with db.engine.begin() as connection:
+            connection.execute(HabitStreak.__table__.insert().values(
+                habit_id=habit_id, frequency='daily', current_streak=0, longest_streak=0,
+                is_stale=True, updated_at=datetime.now(timezone.utc),
+            ))
+        
+        HabitService.complete_habit(habit_id, test_user.id)
+        
+        assert HabitStreak.query.count() == 1
+        assert db.session.get(HabitStreak, habit_id).current_streak == 1
+    
+    def test_rebuild_all_streaks(self, app, test_user, test_habit):
+        from app.models import HabitStreak
+        today = datetime.now(timezone.utc)
+        for i in range(4):
+            db.session.add(HabitLog(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                completed_at=today - timedelta(days=i)
+            ))
+        db.session.commit()
+        
+        assert StreakService.rebuild_all_streaks(batch_size=1) == 1
+        assert db.session.get(HabitStreak, test_habit.id).current_streak == 4
+    
+    def test_get_streak_info_bulk(self, app, test_user, test_habit):
+        from app.services import HabitService
+        other = HabitService.create_habit(test_user.id, 'Read', frequency='daily')
+        today = datetime.now(timezone.utc)
+        for i in range(2):
+            db.session.add(HabitLog(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                completed_at=today - timedelta(days=i)
+            ))
+        db.session.commit()
+        
+        info = StreakService.get_streak_info_bulk([test_habit, other])
+        
+        assert info[test_habit.id] == {'current': 2, 'longest': 2}
+        assert info[other.id] == {'current': 0, 'longest': 0}
+        assert info[test_habit.id] == StreakService.get_streak_info(test_habit)
@@ -0,0 +1,203 @@
+import json
+import pytest
+from app.utils import cache
+
+
+class TestStampedeProtection:
+    
+    def test_fresh_entry_is_not_refreshed_early(self):
+        entry = ['value', 0.5, 1000.0]
+        assert not cache._should_refresh(entry, now=900.0, rand=0.5)
+    
+    def test_slow_entry_refreshes_close_to_expiry(self):
+        # delta * -log(0.01) ~= 4.6 * delta seconds ahead of expiry
+        entry = ['value', 2.0, 1000.0]
+        assert cache._should_refresh(entry, now=995.0, rand=0.01)
+        assert not cache._should_refresh(entry, now=980.0, rand=0.01)
+    
+    def test_expired_entry_is_always_refreshed(self):
+        entry = ['value', 0.0, 1000.0]
+        assert cache._should_refresh(entry, now=1000.0, rand=0.99)
+    
+    def test_recomputes_without_redis(self, app, monkeypatch):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        calls = []
+        
+        @cache.cached(timeout=60, key_prefix='stampede-probe')
+        def probe():
+            calls.append(1)
+            return len(calls)
+        
+        assert probe() == 1
+        assert probe() == 2
+        assert cache._acquire_lock('stampede-probe') is None
+
+
+class TestViewKeys:
+    
+    @pytest.fixture
+    def local_only(self, app, monkeypatch):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+        cache._local.configure(16, 30)
+        yield
+        cache._local.configure(app.config['CACHE_L1_MAXSIZE'], app.config['CACHE_L1_TTL'])
+    
+    def test_query_args_are_part_of_the_key(self, app, local_only):
+        calls = []
+        
+        @cache.cached(timeout=60, key_prefix='view-probe', query_args=('timeframe',))
+        def fragment():
+            calls.append(1)
+            return len(calls)
+        
+        with app.test_request_context('/?timeframe=week'):
+            assert fragment() == 1
+            assert fragment() == 1
+        with app.test_request_context('/?timeframe=month&page=2'):
+            assert fragment() == 2
+        with app.test_request_context('/?timeframe=week&page=3'):
+            assert fragment() == 1
+    
+    def test_per_user_entries_are_tagged(self, app, local_only, test_user, test_admin):
+        from flask_login import login_user
+        calls = []
+        
+        @cache.cached(timeout=60, key_prefix='viewer-probe', per_user=True)
+        def fragment():
+            calls.append(1)
+            return len(calls)
+        
+        with app.test_request_context():
+            login_user(test_user)
+            assert fragment() == 1
+        with app.test_request_context():
+            login_user(test_admin)
+            assert fragment() == 2
+        
+        cache.delete_user_cache(test_user.id, 'viewer-probe')
+        with app.test_request_context():
+            login_user(test_user)
+            assert fragment() == 3
+        with app.test_request_context():
+            login_user(test_admin)
+            assert fragment() == 2
+
+
+class TestTagInvalidation:
+    
+    def test_invalidating_a_tag_drops_only_its_entries(self, app, redis_server):
+        calls = []
+        
+        @cache.cached(timeout=60, key_prefix='tag-probe', tags=('habits',))
+        def tagged(name):
+            calls.append(name)
+            return len(calls)
+        
+        assert tagged('a') == 1
+        assert tagged('b') == 2
+        assert tagged('a') == 1
+        
+        cache.invalidate_tags('other')
+        assert tagged('a') == 1
+        
+        cache.invalidate_tags('habits')
+        assert tagged('a') == 3
+        assert tagged('b') == 4
+        assert redis_server.smembers(cache._tag_key('habits')) != set()
+    
+    def test_user_cached_extra_tags_are_per_user(self, app, redis_server):
+        calls = []
+        
+        @cache.user_cached(timeout=60, key_prefix='owner-probe', tags=('dashboard',))
+        def summary(user_id):
+            calls.append(user_id)
+            return len(calls)
+        
+        assert summary('u1') == 1
+        assert summary('u2') == 2
+        
+        cache.delete_user_cache('u1', 'dashboard')
+        
+        assert summary('u1') == 3
+        assert summary('u2') == 2
+    
+    def test_invalidations_reach_other_workers(self, app, redis_server):
+        cache._local.configure(16, 30)
+        try:
+            calls = []
+            
+            @cache.user_cached(timeout=60, key_prefix='worker-probe')
+            def probe(user_id):
+                calls.append(user_id)
+                return len(calls)
+            
+            pubsub = redis_server.pubsub()
+            pubsub.subscribe(cache.INVALIDATION_CHANNEL)
+            assert pubsub.get_message(timeout=1)['type'] == 'subscribe'
+            assert probe('u1') == 1
+            cache.delete_user_cache('u1', 'worker-probe')
+            message = pubsub.get_message(timeout=1)
+            assert json.loads(message['data'])['tags'] == ['worker-probe:u1']
+            assert probe('u1') == 2
+            
+            # Another worker invalidated the entry: Redis no longer has it and
+            # only the broadcast can clear this worker's L1 copy.
+            redis_server.flushdb()
+            cache._apply_invalidation({'origin': cache._origin(), 'tags': ['worker-probe:u1']})
+            assert probe('u1') == 2
+            cache._apply_invalidation({'origin': 'another-worker', 'tags': ['worker-probe:u1']})
+            assert probe('u1') == 3
+        finally:
+            cache._local.configure(app.config['CACHE_L1_MAXSIZE'], app.config['CACHE_L1_TTL'])
+
+
+class _StopListening(BaseException):
+    pass
+
+
+class TestInvalidationListener:
+    
+    def test_l1_is_cleared_once_on_resubscribe_not_per_retry(self, app, monkeypatch):
+        events = []
+        
+        class PubSub:
+            def __init__(self, up):
+                self.up = up
+            
+            def subscribe(self, channel):
+                if not self.up:
+                    raise ConnectionError('Redis down')
+            
+            def listen(self):
+                raise _StopListening
+        
+        attempts = iter([False, False, False, True])
+        monkeypatch.setattr(cache, 'redis_client', type('Client', (), {
+            'pubsub': lambda self, **kw: PubSub(next(attempts)),
+        })())
+        monkeypatch.setattr(cache.time, 'sleep', lambda seconds: events.append('retry'))
+        monkeypatch.setattr(cache._local, 'clear', lambda: events.append('clear'))
+        
+        with pytest.raises(_StopListening):
+            cache._listen()
+        
+        assert events == ['retry', 'retry', 'retry', 'clear']
+    
+    def test_listener_starts_only_where_enabled(self, app, monkeypatch):
+        started = []
+        monkeypatch.setattr(cache.threading, 'Thread', lambda **kw: type('T', (), {
+            'start': lambda self: started.append(kw['name']),
+        })())
+        cache._local.configure(16, 30)
+        try:
+            monkeypatch.setitem(cache._subscriber, 'pid', None)
+            monkeypatch.setitem(cache._subscriber, 'enabled', False)
+            cache._ensure_subscriber()
+            assert started == []
+            
+            monkeypatch.setitem(cache._subscriber, 'pid', None)
+            monkeypatch.setitem(cache._subscriber, 'enabled', True)
+            cache._ensure_subscriber()
+            assert started == ['cache-invalidation']
+        finally:
+            cache._local.configure(app.config['CACHE_L1_MAXSIZE'], app.config['CACHE_L1_TTL'])
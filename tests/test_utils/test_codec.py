@@ -0,0 +1,42 @@
+import pickle
+import pytest
+from datetime import date, datetime
+from app.utils import codec
+from app.utils.codec import encode, decode, register_serializer, StaleCacheEntry
+
+
+class TestCacheCodec:
+    
+    def test_round_trips_registered_models(self, app, test_habit):
+        from app.services import HabitService
+        habits = HabitService.get_user_habits(test_habit.user_id)
+        
+        restored = decode(encode(habits))
+        
+        assert restored[0].id == test_habit.id
+        assert restored[0].name == 'Exercise'
+        assert isinstance(restored[0].created_at, datetime)
+        assert not hasattr(restored[0], 'logs')
+    
+    def test_round_trips_plain_values(self):
+        value = {'day': date(2024, 1, 2), 'counts': [1, 2, 3], 'label': None}
+        assert decode(encode(value)) == value
+    
+    def test_rejects_unregistered_types(self):
+        with pytest.raises(TypeError):
+            encode(object())
+    
+    def test_rejects_stale_serializer_version(self, app, test_habit):
+        from app.models import Habit
+        payload = encode([test_habit])
+        name, version, fields = codec._serializers[Habit]
+        register_serializer(Habit, fields, version=version + 1)
+        try:
+            with pytest.raises(StaleCacheEntry):
+                decode(payload)
+        finally:
+            register_serializer(Habit, fields, version=version)
+    
+    def test_rejects_legacy_pickle_payloads(self):
+        with pytest.raises(StaleCacheEntry):
+            decode(pickle.dumps([1, 2, 3]))
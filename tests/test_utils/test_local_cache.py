@@ -0,0 +1,68 @@
+import time
+import pytest
+from app.utils.local_cache import LocalCache
+
+
+class TestLocalCache:
+    
+    def test_evicts_least_recently_used(self):
+        local = LocalCache(maxsize=2, ttl=30)
+        local.set('a', b'1')
+        local.set('b', b'2')
+        local.get('a')
+        local.set('c', b'3')
+        
+        assert local.get('a') == b'1'
+        assert local.get('b') is None
+        assert len(local) == 2
+    
+    def test_entries_expire(self):
+        local = LocalCache(maxsize=4, ttl=30)
+        local.set('a', b'1', ttl=0.01)
+        time.sleep(0.02)
+        assert local.get('a') is None
+    
+    def test_ttl_is_capped(self):
+        local = LocalCache(maxsize=4, ttl=0.01)
+        local.set('a', b'1', ttl=300)
+        time.sleep(0.02)
+        assert local.get('a') is None
+    
+    def test_invalidate_tags(self):
+        local = LocalCache(maxsize=4, ttl=30)
+        local.set('a', b'1', tags=('habit:u1',))
+        local.set('b', b'2', tags=('habit:u2',))
+        local.invalidate_tags('habit:u1')
+        
+        assert local.get('a') is None
+        assert local.get('b') == b'2'
+    
+    def test_disabled_when_maxsize_is_zero(self):
+        local = LocalCache(maxsize=0)
+        local.set('a', b'1')
+        assert local.get('a') is None
+
+
+class TestTwoTierCache:
+    
+    @pytest.fixture
+    def local_tier(self, app):
+        from app.utils import cache
+        cache._local.configure(16, 30)
+        yield cache
+        cache._local.configure(app.config['CACHE_L1_MAXSIZE'], app.config['CACHE_L1_TTL'])
+    
+    def test_user_cached_hits_local_tier(self, local_tier):
+        calls = []
+        
+        @local_tier.user_cached(timeout=60, key_prefix='probe')
+        def probe(user_id):
+            calls.append(user_id)
+            return len(calls)
+        
+        assert probe('u1') == 1
+        assert probe('u1') == 1
+        assert local_tier.cache_stats()['l1_hits'] >= 1
+        
+        local_tier.delete_user_cache('u1', 'probe')
+        assert probe('u1') == 2
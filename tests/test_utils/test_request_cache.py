@@ -0,0 +1,96 @@
+import pytest
+from app.utils import cache
+from app.utils.cache import RequestCache, LikeCache, CommentCache
+
+
+class RecordingRedis:
+    """Just enough of a Redis client to count pipelined round-trips."""
+
+    def __init__(self):
+        self.sets = {}
+        self.strings = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+
+class RecordingPipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, method):
+        return lambda *args: self.commands.append((method, args))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for method, args in self.commands:
+            if method == 'scard':
+                results.append(len(self.redis.sets.get(args[0], ())))
+            elif method == 'sismember':
+                results.append(args[1] in self.redis.sets.get(args[0], ()))
+            elif method == 'get':
+                results.append(self.redis.strings.get(args[0]))
+            elif method == 'setex':
+                self.redis.strings[args[0]] = str(args[2]).encode()
+                results.append(True)
+        return results
+
+
+@pytest.fixture
+def fake_redis(app, monkeypatch):
+    redis = RecordingRedis()
+    monkeypatch.setattr(cache, 'redis_client', redis)
+    monkeypatch.setattr(cache, '_l2_down_until', 0.0)
+    return redis
+
+
+class TestRequestCache:
+
+    def test_batch_reads_use_one_round_trip(self, app, fake_redis):
+        fake_redis.sets['post:p1:likes'] = {'u1', 'u2'}
+        fake_redis.strings['post:p2:comments'] = b'4'
+
+        with app.test_request_context():
+            assert LikeCache.get_counts(['p1', 'p2']) == {'p1': 2, 'p2': 0}
+            assert LikeCache.are_liked('u1', ['p1', 'p2']) == {'p1'}
+            assert CommentCache.get_counts(['p1', 'p2']) == {'p1': None, 'p2': 4}
+            assert fake_redis.round_trips == 3
+
+            # Single-item reads are served from the request memo
+            assert LikeCache.get_count('p1') == 2
+            assert LikeCache.is_liked('u1', 'p1')
+            assert CommentCache.get_count('p2') == 4
+            assert fake_redis.round_trips == 3
+
+    def test_writes_are_deferred_to_teardown(self, app, fake_redis):
+        with app.test_request_context():
+            CommentCache.set_count('p1', 7)
+            CommentCache.set_count('p2', 0)
+            assert fake_redis.strings == {}
+            assert CommentCache.get_count('p1') == 7
+            app.do_teardown_request()
+
+        assert fake_redis.strings == {'post:p1:comments': b'7', 'post:p2:comments': b'0'}
+        assert fake_redis.round_trips == 1
+
+    def test_memo_is_per_request(self, app, fake_redis):
+        with app.test_request_context():
+            first = RequestCache.current()
+            assert RequestCache.current() is first
+
+        with app.test_request_context():
+            assert RequestCache.current() is not first
+
+    def test_redis_down_returns_defaults(self, app, monkeypatch):
+        monkeypatch.setattr(cache, '_l2_down_until', float('inf'))
+
+        with app.test_request_context():
+            assert LikeCache.get_counts(['p1']) == {'p1': 0}
+            assert LikeCache.are_liked('u1', ['p1']) == set()
+            assert CommentCache.get_counts(['p1']) == {'p1': None}
+            CommentCache.set_count('p1', 3)
+            app.do_teardown_request()